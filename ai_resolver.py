@@ -0,0 +1,114 @@
+"""
+Concurrent AI conflict resolution.
+
+Gemini calls block for the whole generation, so conflicted files are fanned
+out over a thread pool. A token bucket caps the request rate across all
+workers, failed calls are retried with exponential backoff, and results are
+handed back to the calling thread as they complete so they can be written
+and staged without waiting for the slowest file.
+"""
+
+import math
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+class TokenBucket:
+    """Token-bucket rate limiter shared by worker threads"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def estimate_tokens(text):
+    """Rough prompt token count (about four characters per token)"""
+    return len(text) // 4 + 1
+
+
+def strip_code_fence(text):
+    """Remove a Markdown code fence the model may have wrapped around its answer"""
+    lines = text.strip('\n').split('\n')
+    if len(lines) >= 2 and lines[0].startswith('```') and lines[-1].strip() == '```':
+        lines = lines[1:-1]
+    return '\n'.join(lines)
+
+
+def call_with_retry(fn, retries=3, backoff=1.0, limiter=None):
+    """Call fn(), retrying failures with exponential backoff and jitter"""
+    for attempt in range(retries + 1):
+        if limiter:
+            limiter.acquire()
+        try:
+            return fn()
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(backoff * (2 ** attempt) * (1 + random.random()))
+
+
+def resolve_concurrently(items, resolve, on_result, concurrency=4, rate_limit=None, retries=3, backoff=1.0,
+                         unit='files'):
+    """Run resolve(item) for every item on a thread pool.
+
+    on_result(item, result) is called in the calling thread as each item
+    completes; result is None if every attempt failed. Progress with
+    throughput and latency percentiles is printed along the way. Returns the
+    list of per-item latencies in seconds.
+    """
+    items = list(items)
+    limiter = TokenBucket(rate_limit) if rate_limit else None
+    latencies = []
+    started = time.monotonic()
+
+    def timed(item):
+        start = time.monotonic()
+        try:
+            result = call_with_retry(lambda: resolve(item), retries, backoff, limiter)
+        except Exception as e:
+            print(f"Error getting response from Gemini for {item}: {e}")
+            result = None
+        return result, time.monotonic() - start
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = {pool.submit(timed, item): item for item in items}
+        for done, future in enumerate(as_completed(futures), 1):
+            item = futures[future]
+            result, latency = future.result()
+            latencies.append(latency)
+            on_result(item, result)
+            elapsed = time.monotonic() - started
+            status = "ok" if result is not None else "failed"
+            print(
+                f"[{done}/{len(items)}] {item}: {status} in {latency:.1f}s "
+                f"({done / elapsed:.2f} {unit}/s, p50 {percentile(latencies, 50):.1f}s, "
+                f"p95 {percentile(latencies, 95):.1f}s)"
+            )
+
+    return latencies
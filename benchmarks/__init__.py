@@ -0,0 +1,7 @@
+"""
+Reproducible benchmarks for GitHelper and GitHubAssistant.
+
+Synthetic git repositories, a fake Gemini model and a stub GitHub server
+make every run offline and deterministic apart from timing. Run
+`python -m benchmarks.run` from the repository root.
+"""
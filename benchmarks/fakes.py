@@ -0,0 +1,184 @@
+"""
+Offline stand-ins for Gemini and the GitHub API.
+
+FakeGenerativeModel answers GitHelper's conflict prompts after a fixed
+latency. It keeps "our" side of the conflict, so its resolutions are well
+formed. It also supports `stream=True`. StubGitHubServer is a local HTTP
+server for the endpoints GitHubAssistant uses: paginated `/user/repos`
+(with `since`/`sort=updated`), `/repos/{owner}/{repo}` with ETags and 304
+answers, and aliased GraphQL repository queries. It sends rate-limit
+headers and counts the requests it serves.
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+
+_OURS_BLOCK = re.compile(r'OUR version[^\n]*\n\s*```\n(.*?)\n\s*```', re.S)
+_CODE_BLOCK = re.compile(r'```\n(.*?)\n\s*```', re.S)
+_CONFLICT = re.compile(r'^<<<<<<<[^\n]*\n(.*?)^=======\n.*?^>>>>>>>[^\n]*\n', re.S | re.M)
+
+
+def fake_answer(prompt):
+    """Resolve a GitHelper conflict prompt by keeping our side"""
+    match = _OURS_BLOCK.search(prompt)
+    if match:
+        return match.group(1).lstrip(' ') + '\n'
+    match = _CODE_BLOCK.search(prompt)
+    content = match.group(1).lstrip(' ') + '\n' if match else ''
+    return _CONFLICT.sub(lambda m: m.group(1), content)
+
+
+class FakeGenerativeModel:
+    """Drop-in for genai.GenerativeModel with a tunable latency"""
+
+    def __init__(self, latency=0.05, first_token_latency=None, chunk_size=64, model_name='models/fake-gemini'):
+        self.latency = latency
+        self.first_token_latency = latency / 4 if first_token_latency is None else first_token_latency
+        self.chunk_size = chunk_size
+        self.model_name = model_name
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        with self._lock:
+            self.calls += 1
+        answer = fake_answer(prompt)
+        if not stream:
+            time.sleep(self.latency)
+            return SimpleNamespace(text=answer)
+        return self._stream(answer)
+
+    def _stream(self, answer):
+        chunks = [answer[i:i + self.chunk_size] for i in range(0, len(answer), self.chunk_size)] or ['']
+        time.sleep(self.first_token_latency)
+        pause = max(0.0, self.latency - self.first_token_latency) / len(chunks)
+        for i, chunk in enumerate(chunks):
+            if i:
+                time.sleep(pause)
+            yield SimpleNamespace(text=chunk)
+
+
+def make_repos(count, owner='bench'):
+    """Deterministic repository objects shaped like the REST API's"""
+    languages = ['Python', 'Go', 'Rust', 'TypeScript', None]
+    return [{
+        'name': f'repo{i}',
+        'full_name': f'{owner}/repo{i}',
+        'description': f'Synthetic repository number {i}' if i % 3 else None,
+        'stargazers_count': (i * 37) % 1000,
+        'forks_count': (i * 11) % 100,
+        'language': languages[i % len(languages)],
+        'pushed_at': f'2026-{1 + i % 12:02d}-{1 + i % 28:02d}T00:00:00Z',
+        'updated_at': f'2026-{1 + i % 12:02d}-{1 + i % 28:02d}T12:00:00Z',
+    } for i in range(count)]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, payload=None, headers=None):
+        body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        self.server.count_request()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('X-RateLimit-Remaining', '5000')
+        self.send_header('X-RateLimit-Reset', str(int(time.time()) + 3600))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        if url.path == '/user/repos':
+            self._list_repos(query)
+        elif url.path.startswith('/repos/'):
+            self._get_repo(url.path[len('/repos/'):])
+        else:
+            self._send(404, {'message': 'Not Found'})
+
+    def _list_repos(self, query):
+        repos = self.server.repos
+        if query.get('sort') == 'updated':
+            repos = sorted(repos, key=lambda repo: repo['updated_at'], reverse=query.get('direction') != 'asc')
+        if 'since' in query:
+            repos = [repo for repo in repos if repo['updated_at'] >= query['since']]
+        per_page = int(query.get('per_page', 30))
+        page = int(query.get('page', 1))
+        headers = {}
+        if page * per_page < len(repos):
+            next_query = dict(query, page=page + 1, per_page=per_page)
+            next_url = f"http://{self.headers['Host']}/user/repos?" + '&'.join(f'{k}={v}' for k, v in next_query.items())
+            headers['Link'] = f'<{next_url}>; rel="next"'
+        self._send(200, repos[(page - 1) * per_page:page * per_page], headers)
+
+    def _get_repo(self, full_name):
+        repo = self.server.repos_by_name.get(full_name)
+        if repo is None:
+            self._send(404, {'message': 'Not Found'})
+            return
+        etag = '"' + hashlib.sha1(json.dumps(repo, sort_keys=True).encode('utf-8')).hexdigest() + '"'
+        if self.headers.get('If-None-Match') == etag:
+            self._send(304, headers={'ETag': etag})
+        else:
+            self._send(200, repo, {'ETag': etag})
+
+    def do_POST(self):
+        if urlparse(self.path).path != '/graphql':
+            self._send(404, {'message': 'Not Found'})
+            return
+        query = json.loads(self.rfile.read(int(self.headers['Content-Length'])))['query']
+        data, errors = {}, []
+        for alias, owner, name in re.findall(r'(\w+): repository\(owner: "([^"]*)", name: "([^"]*)"\)', query):
+            repo = self.server.repos_by_name.get(f'{owner}/{name}')
+            if repo is None:
+                data[alias] = None
+                errors.append({'path': [alias], 'message': f"Could not resolve to a Repository with the name '{owner}/{name}'."})
+                continue
+            data[alias] = {
+                'name': repo['name'], 'nameWithOwner': repo['full_name'], 'description': repo['description'],
+                'stargazerCount': repo['stargazers_count'], 'forkCount': repo['forks_count'],
+                'primaryLanguage': {'name': repo['language']} if repo['language'] else None,
+                'pushedAt': repo['pushed_at'],
+            }
+        self._send(200, {'data': data, 'errors': errors} if errors else {'data': data})
+
+
+class StubGitHubServer(ThreadingHTTPServer):
+    """Local GitHub API stand-in serving a fixed set of repositories; use as a context manager"""
+
+    daemon_threads = True
+
+    def __init__(self, repos):
+        super().__init__(('127.0.0.1', 0), _Handler)
+        self.repos = repos
+        self.repos_by_name = {repo['full_name']: repo for repo in repos}
+        self.requests_served = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+    def count_request(self):
+        with self._lock:
+            self.requests_served += 1
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
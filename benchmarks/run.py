@@ -0,0 +1,175 @@
+"""
+Run the benchmarks and compare them against a stored baseline.
+
+    python -m benchmarks.run                      # run everything, compare with baseline.json
+    python -m benchmarks.run -s merge_in_memory   # run selected scenarios
+    python -m benchmarks.run --set branches=8 --set ai_latency=0.2
+    python -m benchmarks.run --update-baseline    # record the current numbers as the baseline
+
+Every scenario runs in its own Python process inside a fresh temporary
+directory, so peak RSS and process counts are not polluted by earlier
+scenarios. The run fails (exit status 1) when a scenario does not succeed
+or a metric is worse than the baseline by more than its tolerance.
+Wall times depend on the machine, so record a baseline on the machine
+that runs the comparison.
+"""
+
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.scenarios import DEFAULT_CONFIG, SCENARIOS
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Metric -> allowed relative regression; counts are deterministic and must not grow at all
+TOLERANCES = {
+    'wall_seconds': 0.30,
+    'peak_rss_mb': 0.20,
+    'megabytes_per_second': 0.30,
+    'hunks_per_second': 0.30,
+    'subprocesses': 0.0,
+    'ai_calls': 0.0,
+    'tokens_sent': 0.0,
+    'http_requests': 0.0,
+}
+# Changes smaller than this are noise whatever the relative change
+ABSOLUTE_SLACK = {'wall_seconds': 0.05, 'peak_rss_mb': 5.0}
+HIGHER_IS_BETTER = {'megabytes_per_second', 'hunks_per_second'}
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in megabytes"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_child(name, config):
+    """Run one scenario in this process (inside a temporary directory) and print its metrics as JSON"""
+    workdir = tempfile.mkdtemp(prefix=f'githelper-bench-{name}-')
+    try:
+        os.chdir(workdir)
+        metrics = SCENARIOS[name](config)
+    finally:
+        os.chdir(REPO_ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+    metrics['peak_rss_mb'] = peak_rss_mb()
+    print(json.dumps(metrics))
+
+
+def run_scenario(name, config, repeat=1):
+    """Run a scenario in fresh processes and keep the fastest of repeat runs"""
+    best = None
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.run', '--child', name, '--config', json.dumps(config)],
+            cwd=REPO_ROOT, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            return {'success': False, 'error': result.stderr.strip().splitlines()[-1:] or ['failed']}
+        metrics = json.loads(result.stdout.strip().splitlines()[-1])
+        if best is None or metrics['wall_seconds'] < best['wall_seconds']:
+            best = metrics
+    return best
+
+
+def compare(name, metrics, baseline):
+    """Return (metric, baseline, current, change, ok) rows comparing a scenario with its baseline"""
+    rows = []
+    for metric, tolerance in TOLERANCES.items():
+        if metric not in metrics or metric not in baseline:
+            continue
+        old, new = baseline[metric], metrics[metric]
+        change = (new - old) / old if old else (0.0 if new == old else float('inf'))
+        worse = -change if metric in HIGHER_IS_BETTER else change
+        ok = worse <= tolerance or abs(new - old) <= ABSOLUTE_SLACK.get(metric, 0)
+        rows.append((metric, old, new, change, ok))
+    return rows
+
+
+def _format_value(value):
+    return f'{value:.3f}' if isinstance(value, float) else str(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='GitHelper / GitHubAssistant benchmarks')
+    parser.add_argument('-s', '--scenario', action='append', choices=sorted(SCENARIOS),
+                        help='Scenario to run (repeatable; default: all)')
+    parser.add_argument('--set', action='append', default=[], metavar='KEY=VALUE',
+                        help=f'Override a config value ({", ".join(DEFAULT_CONFIG)})')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per scenario; the fastest is kept')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='Baseline JSON to compare against')
+    parser.add_argument('--update-baseline', action='store_true', help='Store the results as the new baseline')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--config', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, json.loads(args.config))
+        return 0
+
+    config = dict(DEFAULT_CONFIG)
+    for item in args.set:
+        key, _, value = item.partition('=')
+        if key not in config:
+            parser.error(f'unknown config key: {key}')
+        config[key] = type(config[key])(value)
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.update_baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        if baseline.get('config') != config:
+            print('Config differs from the baseline; results are reported but not compared.')
+            baseline = None
+
+    results = {}
+    failed = False
+    for name in args.scenario or list(SCENARIOS):
+        start = time.perf_counter()
+        metrics = run_scenario(name, config, args.repeat)
+        results[name] = metrics
+        print(f'\n{name} ({time.perf_counter() - start:.1f}s)')
+        if not metrics.get('success'):
+            print(f"  FAILED {metrics.get('error', '')}")
+            failed = True
+            continue
+        if baseline is None or name not in baseline['scenarios']:
+            for metric, value in metrics.items():
+                if metric != 'success':
+                    print(f'  {metric:<22} {_format_value(value):>12}')
+            continue
+        for metric, old, new, change, ok in compare(name, metrics, baseline['scenarios'][name]):
+            status = 'ok' if ok else 'REGRESSION'
+            print(f'  {metric:<22} {_format_value(old):>12} -> {_format_value(new):>12} {change:>+8.1%}  {status}')
+            failed = failed or not ok
+
+    if args.update_baseline:
+        if failed:
+            print('\nNot updating the baseline: some scenarios failed.')
+            return 1
+        stored = {'config': config, 'scenarios': results}
+        if os.path.exists(args.baseline) and args.scenario:
+            with open(args.baseline, 'r') as f:
+                previous = json.load(f)
+            if previous.get('config') == config:
+                stored['scenarios'] = {**previous['scenarios'], **results}
+        with open(args.baseline, 'w') as f:
+            json.dump(stored, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'\nBaseline written to {args.baseline}')
+    elif failed:
+        print('\nBenchmarks FAILED: see the regressions above.')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""
+Benchmark scenarios.
+
+Each scenario takes its config dict, runs in the current directory (a fresh
+temporary directory provided by the runner) and returns its metrics. The
+runner starts one process per scenario, so peak RSS measures that scenario
+alone.
+"""
+
+import contextlib
+import os
+import time
+
+from benchmarks.fakes import FakeGenerativeModel, StubGitHubServer, make_repos
+from benchmarks.synthetic import make_conflicted_file, make_lockfile_repo, make_synthetic_repo
+
+DEFAULT_CONFIG = {
+    'branches': 4,
+    'files': 60,
+    'file_lines': 200,
+    'conflict_density': 0.2,
+    'ai_latency': 0.05,
+    'seed': 0,
+    'parse_hunks': 2000,
+    'parse_lines_between': 100,
+    'policy_hunks': 5000,
+    'github_repos': 1000,
+    'github_lookups': 300,
+}
+
+
+def _merge(config, **merge_options):
+    from git_helper import GitHelper
+
+    branches = make_synthetic_repo(os.getcwd(), config['branches'], config['files'], config['file_lines'],
+                                   config['conflict_density'], config['seed'])
+    ai_mode = merge_options.pop('ai_mode', 'file')
+    helper = GitHelper(gemini_api_key='benchmark', ai_mode=ai_mode, use_resolution_cache=False)
+    helper.model = FakeGenerativeModel(config['ai_latency'])
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        success = helper.multi_branch_merge(branches, 'main', use_ai=True, **merge_options)
+    return {
+        'wall_seconds': time.perf_counter() - start,
+        'subprocesses': helper.backend.process_count,
+        'ai_calls': helper.model.calls,
+        'tokens_sent': helper.ai_prompt_tokens,
+        'success': bool(success),
+    }
+
+
+def merge_working_tree(config):
+    """multi_branch_merge with AI resolution, merging in the working tree"""
+    return _merge(config)
+
+
+def merge_hunk_mode(config):
+    """multi_branch_merge sending only conflict hunks to the model"""
+    return _merge(config, ai_mode='hunk')
+
+
+def merge_in_memory(config):
+    """multi_branch_merge computing merges with git merge-tree"""
+    return _merge(config, in_memory=True)
+
+
+def merge_parallel(config):
+    """multi_branch_merge in parallel worktrees, then combined"""
+    return _merge(config, parallel=True)
+
+
+def conflict_matrix(config):
+    """Pairwise conflict prediction between all branches"""
+    from conflict_matrix import build_conflict_matrix
+    from git_helper import GitHelper
+
+    branches = make_synthetic_repo(os.getcwd(), config['branches'], config['files'], config['file_lines'],
+                                   config['conflict_density'], config['seed'])
+    helper = GitHelper()
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stderr(devnull):
+        matrix = build_conflict_matrix(helper, branches, 'main', use_cache=False)
+    return {
+        'wall_seconds': time.perf_counter() - start,
+        'subprocesses': helper.backend.process_count,
+        'success': matrix is not None and not matrix['errors'],
+    }
+
+
+def conflict_parse(config):
+    """Streaming rewrite of one large conflicted file (diff3 style)"""
+    from conflict_stream import rewrite_conflict_file
+
+    make_conflicted_file('conflicted.txt', config['parse_hunks'], config['parse_lines_between'], diff3=True)
+    size = os.path.getsize('conflicted.txt')
+    start = time.perf_counter()
+    resolved = rewrite_conflict_file('conflicted.txt', lambda index, hunk: hunk['ours'] + hunk['theirs'])
+    wall = time.perf_counter() - start
+    return {
+        'wall_seconds': wall,
+        'megabytes_per_second': size / wall / 1e6,
+        'success': resolved == config['parse_hunks'],
+    }
+
+
+def policy_resolve(config):
+    """Headless merge of a generated lockfile with a union resolution policy"""
+    from git_helper import GitHelper
+    from resolution_policy import ResolutionPolicy
+
+    branches = make_lockfile_repo(os.getcwd(), config['policy_hunks'])
+    policy = ResolutionPolicy([{'paths': ['*.lock'], 'strategy': 'union'}])
+    helper = GitHelper(use_resolution_cache=False, resolution_policy=policy)
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        success = helper.multi_branch_merge(branches, 'main')
+    summary = policy.report.summary()
+    return {
+        'wall_seconds': time.perf_counter() - start,
+        'hunks_per_second': summary['hunks_per_second'],
+        'subprocesses': helper.backend.process_count,
+        'success': bool(success) and summary['hunks'] == config['policy_hunks'],
+    }
+
+
+def github_api(config):
+    """Repository listing, batched REST lookups and GraphQL lookups against the stub server"""
+    from github_assistant import GitHubAssistant
+
+    repos = make_repos(config['github_repos'])
+    names = [repo['full_name'] for repo in repos[:config['github_lookups']]]
+    with StubGitHubServer(repos) as server:
+        assistant = GitHubAssistant(github_api_url=server.url, cache_path=os.path.abspath('http-cache.sqlite'),
+                                    index_path=os.path.abspath('repo-index.sqlite'))
+        assistant.github_token = 'benchmark'
+        start = time.perf_counter()
+        listed = sum(1 for _ in assistant.iter_user_repos())
+        rest = [r for r in assistant.get_repos_info(names) if 'info' in r]
+        graphql = [r for r in assistant.get_repos_info(names, use_graphql=True) if 'info' in r]
+        synced = assistant.sync_repo_index()
+        wall = time.perf_counter() - start
+        assistant.get_client().close()
+        return {
+            'wall_seconds': wall,
+            'http_requests': server.requests_served,
+            'success': listed == len(repos) and len(rest) == len(graphql) == len(names) and synced is not None,
+        }
+
+
+SCENARIOS = {
+    'merge_working_tree': merge_working_tree,
+    'merge_hunk_mode': merge_hunk_mode,
+    'merge_in_memory': merge_in_memory,
+    'merge_parallel': merge_parallel,
+    'conflict_matrix': conflict_matrix,
+    'conflict_parse': conflict_parse,
+    'policy_resolve': policy_resolve,
+    'github_api': github_api,
+}
@@ -0,0 +1,113 @@
+"""
+Synthetic git repositories and conflicted files for the benchmarks.
+
+A repository gets a base commit of `files` text files with `file_lines`
+lines each, plus `branches` branches forked from it. A `conflict_density`
+fraction of the files is edited on the same line by every branch, so these
+files conflict pairwise. Every branch also edits files of its own that merge
+cleanly. The same seed always produces the same repository.
+"""
+
+import os
+import random
+import subprocess
+
+BRANCH_PREFIX = 'bench/b'
+
+
+def _git(repo, *args):
+    subprocess.run(['git', *args], cwd=repo, check=True, capture_output=True)
+
+
+def _file_path(repo, index):
+    return os.path.join(repo, 'src', f'file_{index:04d}.txt')
+
+
+def _write_lines(path, lines):
+    with open(path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+def _read_lines(path):
+    with open(path, 'r') as f:
+        return f.read().split('\n')[:-1]
+
+
+def make_synthetic_repo(repo, branches=4, files=50, file_lines=200, conflict_density=0.2, seed=0):
+    """Create a repository at repo and return the names of its branches (the base branch is 'main')"""
+    rng = random.Random(seed)
+    os.makedirs(os.path.join(repo, 'src'))
+    _git(repo, 'init', '-q', '-b', 'main')
+    _git(repo, 'config', 'user.email', 'bench@example.com')
+    _git(repo, 'config', 'user.name', 'Benchmark')
+    _git(repo, 'config', 'commit.gpgsign', 'false')
+
+    for index in range(files):
+        _write_lines(_file_path(repo, index), [f'line {line} of file {index}' for line in range(file_lines)])
+    _git(repo, 'add', '-A')
+    _git(repo, 'commit', '-q', '-m', 'base')
+
+    conflicting = set(rng.sample(range(files), round(files * conflict_density)))
+    clean = [index for index in range(files) if index not in conflicting]
+    conflict_lines = {index: rng.randrange(file_lines) for index in conflicting}
+
+    names = []
+    for branch in range(branches):
+        name = f'{BRANCH_PREFIX}{branch}'
+        _git(repo, 'checkout', '-q', '-b', name, 'main')
+        edits = [(index, conflict_lines[index]) for index in sorted(conflicting)]
+        # Files no other branch touches, so they merge cleanly
+        edits += [(index, rng.randrange(file_lines)) for index in clean[branch::branches]]
+        for index, line in edits:
+            path = _file_path(repo, index)
+            lines = _read_lines(path)
+            lines[line] = f'line {line} of file {index} changed on {name}'
+            _write_lines(path, lines)
+        _git(repo, 'commit', '-q', '-a', '-m', f'changes on {name}')
+        names.append(name)
+    _git(repo, 'checkout', '-q', 'main')
+    return names
+
+
+def make_lockfile_repo(repo, hunks=5000, lines_between=10):
+    """Create a repository whose two branches change the same lines of a generated lockfile.
+
+    Merging both gives one conflict hunk every lines_between lines. Returns the branch names.
+    """
+    os.makedirs(repo, exist_ok=True)
+    _git(repo, 'init', '-q', '-b', 'main')
+    _git(repo, 'config', 'user.email', 'bench@example.com')
+    _git(repo, 'config', 'user.name', 'Benchmark')
+    _git(repo, 'config', 'commit.gpgsign', 'false')
+    path = os.path.join(repo, 'deps.lock')
+    lines = [f'package-{line} 1.0.0' for line in range(hunks * lines_between)]
+    _write_lines(path, lines)
+    _git(repo, 'add', '-A')
+    _git(repo, 'commit', '-q', '-m', 'base')
+
+    names = []
+    for branch in range(2):
+        name = f'{BRANCH_PREFIX}{branch}'
+        _git(repo, 'checkout', '-q', '-b', name, 'main')
+        _write_lines(path, [f'package-{line} 1.{branch + 1}.0' if line % lines_between == 0 else text
+                            for line, text in enumerate(lines)])
+        _git(repo, 'commit', '-q', '-a', '-m', f'update on {name}')
+        names.append(name)
+    _git(repo, 'checkout', '-q', 'main')
+    return names
+
+
+def make_conflicted_file(path, hunks=500, lines_between=100, hunk_lines=5, diff3=False):
+    """Write a file with conflict markers: hunks conflicts separated by lines_between plain lines"""
+    with open(path, 'w') as f:
+        for hunk in range(hunks):
+            for line in range(lines_between):
+                f.write(f'context line {line} before hunk {hunk}\n')
+            f.write('<<<<<<< HEAD\n')
+            f.writelines(f'ours {hunk}.{line}\n' for line in range(hunk_lines))
+            if diff3:
+                f.write('||||||| base\n')
+                f.writelines(f'base {hunk}.{line}\n' for line in range(hunk_lines))
+            f.write('=======\n')
+            f.writelines(f'theirs {hunk}.{line}\n' for line in range(hunk_lines))
+            f.write('>>>>>>> feature\n')
@@ -0,0 +1,262 @@
+"""
+Branch inventory for choosing what to merge.
+
+Every branch is listed with its last commit, how far it is ahead of and
+behind a base branch, and optionally how much it changed since the merge
+base. Names, tips and commit metadata of all branches come from one
+`git for-each-ref` call. On Git 2.41 and later the same call also reports
+ahead/behind counts through `%(ahead-behind:<base>)`.
+
+Older versions get the counts from a single history walk instead. `git
+rev-list --parents` lists every commit that is not shared by all branches
+(the history below their octopus merge base is skipped). Each commit then
+carries a bitmask of the branches that reach it. Counting the masks gives
+ahead/behind for every branch at once, and the same pass finds each
+branch's merge base with the base. The change summary feeds all
+(branch, merge base) pairs to one `git diff-tree --stdin`. An inventory
+therefore costs a fixed number of git processes however many branches it
+covers.
+"""
+
+import fnmatch
+import json
+import re
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+SORT_KEYS = ('date', 'name', 'ahead', 'behind')
+
+_FIELDS = ('refname', 'refname:short', 'objectname', 'committerdate:unix', 'authorname', 'upstream:short',
+           'contents:subject')
+_COMMIT_LINE = re.compile(r'^[0-9a-f]{40,64}$')
+
+# None until the first inventory finds out whether git knows %(ahead-behind:...)
+_ahead_behind_atom = None
+
+
+@dataclass
+class BranchInfo:
+    """A local or remote-tracking branch and its last commit"""
+    name: str
+    ref: str
+    commit: str
+    date: int
+    author: str
+    subject: str
+    upstream: str = ''
+    remote: bool = False
+    ahead: Optional[int] = None
+    behind: Optional[int] = None
+    files_changed: Optional[int] = None
+    insertions: Optional[int] = None
+    deletions: Optional[int] = None
+
+
+def _for_each_ref(backend, refs, base, merged):
+    """Run the single for-each-ref call; returns (stdout, whether ahead/behind is included)"""
+    global _ahead_behind_atom
+    fields = list(_FIELDS)
+    use_atom = base is not None and _ahead_behind_atom is not False
+    if use_atom:
+        fields.append(f'ahead-behind:{base}')
+    args = ['for-each-ref', '--format=' + '%00'.join(f'%({field})' for field in fields)]
+    if merged is not None and base is not None:
+        args.append(f"--{'' if merged else 'no-'}merged={base}")
+    result = backend.run(args + refs, check=False)
+    if result.returncode != 0 and use_atom and 'ahead-behind' in result.stderr:
+        _ahead_behind_atom = False
+        return _for_each_ref(backend, refs, base, merged)
+    if result.returncode != 0:
+        return None, False
+    if use_atom:
+        _ahead_behind_atom = True
+    return result.stdout, use_atom
+
+
+def _octopus_bases(backend, commits):
+    """Best common ancestors of all commits; everything below them is shared by every branch"""
+    result = backend.run(['merge-base', '--octopus', '--all'] + commits, check=False)
+    return result.stdout.split() if result.returncode == 0 else []
+
+
+def _walk_history(backend, base_commit, tips):
+    """Ahead/behind counts and a merge base with base_commit for every tip, from one rev-list walk.
+
+    Returns ({tip: (ahead, behind)}, {tip: merge base or None}).
+    """
+    tips = list(dict.fromkeys(tips))
+    # Bit 0 is the base; tip i gets bit i + 1
+    mask = {base_commit: 1}
+    for i, tip in enumerate(tips):
+        mask[tip] = mask.get(tip, 0) | 1 << (i + 1)
+    revs = list(mask) + ['^' + commit for commit in _octopus_bases(backend, list(mask))]
+    result = backend.run(['rev-list', '--topo-order', '--parents', '--stdin'], input='\n'.join(revs) + '\n',
+                         check=False)
+    if result.returncode != 0:
+        return None, None
+
+    masks = Counter()
+    covered = {}
+    merge_bases = {}
+
+    def visit(commit, commit_mask):
+        # A commit reached from the base and a tip is their merge base unless a child already was
+        common = commit_mask & ~1 if commit_mask & 1 else 0
+        new = common & ~covered.pop(commit, 0)
+        while new:
+            bit = new & -new
+            merge_bases.setdefault(bit.bit_length() - 2, commit)
+            new ^= bit
+        return common
+
+    # Children come before their parents, so a commit's mask is complete when it is reached
+    for line in result.stdout.splitlines():
+        commit, *parents = line.split()
+        commit_mask = mask.pop(commit, 0)
+        masks[commit_mask] += 1
+        common = visit(commit, commit_mask)
+        for parent in parents:
+            mask[parent] = mask.get(parent, 0) | commit_mask
+            if common:
+                covered[parent] = covered.get(parent, 0) | common
+    # What is left are the octopus bases at the bottom of the walk
+    for commit, commit_mask in mask.items():
+        visit(commit, commit_mask)
+
+    ahead = [0] * len(tips)
+    behind = [0] * len(tips)
+    all_tips = (1 << (len(tips) + 1)) - 2
+    for commit_mask, count in masks.items():
+        # Commits of the base missing from a tip count as behind, commits only on tips as ahead
+        bits = all_tips & ~commit_mask if commit_mask & 1 else commit_mask
+        target = behind if commit_mask & 1 else ahead
+        while bits:
+            bit = bits & -bits
+            target[bit.bit_length() - 2] += count
+            bits ^= bit
+    counts = {tip: (ahead[i], behind[i]) for i, tip in enumerate(tips)}
+    return counts, {tip: merge_bases.get(i) for i, tip in enumerate(tips)}
+
+
+def _change_stats(backend, merge_bases):
+    """(files, insertions, deletions) of every tip since its merge base, from one diff-tree call"""
+    pairs = [(tip, merge_base) for tip, merge_base in merge_bases.items() if merge_base]
+    stats = {tip: (0, 0, 0) for tip, _ in pairs}
+    if not pairs:
+        return stats
+    result = backend.run(['diff-tree', '--stdin', '-r', '--numstat'],
+                         input=''.join(f"{tip} {merge_base}\n" for tip, merge_base in pairs), check=False)
+    if result.returncode != 0:
+        return {}
+    current = None
+    for line in result.stdout.splitlines():
+        if _COMMIT_LINE.match(line):
+            current = line
+            continue
+        if current is None or '\t' not in line:
+            continue
+        added, deleted, _ = line.split('\t', 2)
+        files, insertions, deletions = stats[current]
+        # Binary files show '-' instead of line counts
+        stats[current] = (files + 1, insertions + (int(added) if added != '-' else 0),
+                          deletions + (int(deleted) if deleted != '-' else 0))
+    return stats
+
+
+def list_branches(backend, base=None, include_remotes=False, pattern=None, merged=None, sort='date',
+                  limit=None, with_changes=False):
+    """List branches as BranchInfo, newest commit first unless sort says otherwise.
+
+    base is the branch (or commit) ahead/behind and changes are measured against; without
+    it only the commit metadata is filled in. pattern is a glob on the short branch name,
+    merged keeps only branches merged (True) or not merged (False) into base, and sort is
+    one of SORT_KEYS. Returns None if git fails.
+    """
+    refs = ['refs/heads'] + (['refs/remotes'] if include_remotes else [])
+    output, has_counts = _for_each_ref(backend, refs, base, merged)
+    if output is None:
+        return None
+
+    branches = []
+    for line in output.splitlines():
+        values = line.split('\0')
+        ref, name, commit, date, author, upstream, subject = values[:7]
+        # refs/remotes/<remote>/HEAD only points at another remote-tracking branch
+        if ref.startswith('refs/remotes/') and ref.endswith('/HEAD'):
+            continue
+        if pattern and not fnmatch.fnmatchcase(name, pattern):
+            continue
+        branch = BranchInfo(name, ref, commit, int(date or 0), author, subject, upstream,
+                            remote=ref.startswith('refs/remotes/'))
+        if has_counts and len(values) > 7 and values[7]:
+            ahead, behind = values[7].split()
+            branch.ahead, branch.behind = int(ahead), int(behind)
+        branches.append(branch)
+
+    # Every branch needs its counts before it can be ranked by them; otherwise only the shown ones
+    if not (sort in ('ahead', 'behind') and not has_counts):
+        branches = sort_branches(branches, sort)[:limit or None]
+    if base is not None and branches and (with_changes or not has_counts):
+        base_info = backend.object_info([f"{base}^{{commit}}"])[0]
+        counts, merge_bases = None, None
+        if base_info:
+            counts, merge_bases = _walk_history(backend, base_info[0], [b.commit for b in branches])
+        if counts is not None:
+            stats = _change_stats(backend, merge_bases) if with_changes else {}
+            for branch in branches:
+                if not has_counts:
+                    branch.ahead, branch.behind = counts[branch.commit]
+                if branch.commit in stats:
+                    branch.files_changed, branch.insertions, branch.deletions = stats[branch.commit]
+    branches = sort_branches(branches, sort)
+    return branches[:limit] if limit else branches
+
+
+def sort_branches(branches, sort='date'):
+    """Sort by 'date' (newest first), 'name', 'ahead' or 'behind' (most first)"""
+    if sort == 'name':
+        return sorted(branches, key=lambda b: b.name)
+    if sort in ('ahead', 'behind'):
+        return sorted(branches, key=lambda b: (-(getattr(b, sort) or 0), -b.date))
+    return sorted(branches, key=lambda b: -b.date)
+
+
+def _age(timestamp, now=None):
+    seconds = max(0, (now or time.time()) - timestamp)
+    for unit, size in (('y', 365 * 86400), ('w', 7 * 86400), ('d', 86400), ('h', 3600), ('m', 60)):
+        if seconds >= size:
+            return f"{int(seconds // size)}{unit} ago"
+    return "just now"
+
+
+def format_branch_table(branches, numbered=False):
+    """Render an inventory as a text table"""
+    show_counts = any(branch.ahead is not None for branch in branches)
+    show_changes = any(branch.files_changed is not None for branch in branches)
+    width = max([len(branch.name) for branch in branches] + [6])
+    header = ['    ' if numbered else '', f"{'branch':<{width}}", f"{'updated':>8}"]
+    if show_counts:
+        header.append(f"{'ahead/behind':>12}")
+    if show_changes:
+        header.append(f"{'changes':<24}")
+    header.append('last commit')
+    lines = [' '.join(column for column in header if column)]
+    for index, branch in enumerate(branches, 1):
+        columns = [f"{index:>3}." if numbered else '', f"{branch.name:<{width}}", f"{_age(branch.date):>8}"]
+        if show_counts:
+            counts = f"+{branch.ahead}/-{branch.behind}" if branch.ahead is not None else '?'
+            columns.append(f"{counts:>12}")
+        if show_changes:
+            changes = (f"{branch.files_changed} files +{branch.insertions}/-{branch.deletions}"
+                       if branch.files_changed is not None else '?')
+            columns.append(f"{changes:<24}")
+        columns.append(branch.subject[:60])
+        lines.append(' '.join(column for column in columns if column))
+    return '\n'.join(lines)
+
+
+def format_branch_json(branches):
+    """Render an inventory as JSON"""
+    return json.dumps([asdict(branch) for branch in branches], indent=2)
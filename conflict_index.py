@@ -0,0 +1,138 @@
+"""
+Structured index of merge conflicts read straight from the index stages.
+
+`git ls-files -u -z` lists every unmerged path with its stage entries
+(1 = base, 2 = ours, 3 = theirs). Only the first BINARY_SNIFF_BYTES of the
+content conflicts' blobs are read up front, through the backend's
+persistent `git cat-file --batch` process in one batch, to tell binary
+files from text. Whole blobs are loaded with load_blobs only by resolvers
+that write or send a whole side (binary, delete and mode conflicts, and
+AI prompts built from the real merge base). Text conflicts resolved hunk
+by hunk are streamed from the working tree, so large conflicted files
+never have to fit in memory. Building the index costs a fixed number of
+git invocations no matter how many paths conflict.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+BINARY_SNIFF_BYTES = 8000
+GITLINK_MODE = '160000'
+
+# Which stages are present -> kind of conflict
+KINDS = {
+    (1, 2, 3): 'content',
+    (2, 3): 'add/add',
+    (1, 2): 'modify/delete',
+    (1, 3): 'delete/modify',
+    (2,): 'added-by-us',
+    (3,): 'added-by-them',
+    (1,): 'delete/delete',
+}
+
+
+@dataclass
+class StageEntry:
+    """One side of a conflict as recorded in the index"""
+    mode: str
+    oid: str
+    content: Optional[bytes] = None
+
+
+@dataclass
+class ConflictRecord:
+    """A conflicted path with its base, ours and theirs stage entries (None when a side is absent)"""
+    path: str
+    kind: str
+    base: Optional[StageEntry] = None
+    ours: Optional[StageEntry] = None
+    theirs: Optional[StageEntry] = None
+    # Set from a bounded read of the blobs when the index is built; None means judge by loaded content
+    binary: Optional[bool] = None
+
+    @property
+    def is_binary(self):
+        """True if any side looks binary (a NUL byte near the start, like git's own check)"""
+        if self.binary is not None:
+            return self.binary
+        return any(
+            entry.content is not None and b'\0' in entry.content[:BINARY_SNIFF_BYTES]
+            for entry in (self.base, self.ours, self.theirs) if entry
+        )
+
+    @property
+    def is_text_conflict(self):
+        """True for conflicts that have conflict markers to resolve line by line"""
+        return self.kind in ('content', 'add/add') and not self.is_binary
+
+    def text(self, side):
+        """Decoded content of 'base', 'ours' or 'theirs', or None if that side is absent"""
+        entry = getattr(self, side)
+        if entry is None or entry.content is None:
+            return None
+        return entry.content.decode('utf-8', 'surrogateescape')
+
+
+def parse_unmerged_entries(output):
+    """Parse `git ls-files -u -z` output into ConflictRecords (without blob contents)"""
+    stages = {}
+    for item in output.split('\0'):
+        if not item:
+            continue
+        info, path = item.split('\t', 1)
+        mode, oid, stage = info.split(' ')
+        stages.setdefault(path, {})[int(stage)] = StageEntry(mode, oid)
+
+    records = []
+    for path, entries in stages.items():
+        kind = KINDS[tuple(sorted(entries))]
+        base, ours, theirs = entries.get(1), entries.get(2), entries.get(3)
+        if kind == 'content' and ours.mode != theirs.mode and (
+            ours.oid == theirs.oid or base.oid in (ours.oid, theirs.oid)
+        ):
+            kind = 'mode'
+        records.append(ConflictRecord(path, kind, base, ours, theirs))
+    return records
+
+
+def _blob_entries(records):
+    return [
+        entry for record in records
+        for entry in (record.base, record.ours, record.theirs)
+        if entry and entry.mode != GITLINK_MODE
+    ]
+
+
+def _detect_binaries(backend, records):
+    """Set record.binary for content and add/add conflicts from one bounded read of their blobs"""
+    records = [record for record in records if record.kind in ('content', 'add/add')]
+    entries = _blob_entries(records)
+    prefixes = dict(zip((entry.oid for entry in entries),
+                        backend.read_objects([entry.oid for entry in entries], limit=BINARY_SNIFF_BYTES)))
+    for record in records:
+        record.binary = any(prefixes.get(entry.oid) and b'\0' in prefixes[entry.oid]
+                            for entry in _blob_entries([record]))
+
+
+def load_blobs(backend, records):
+    """Read the whole blobs of the given records that are not loaded yet, in one batch"""
+    entries = [entry for entry in _blob_entries(records) if entry.content is None]
+    for entry, content in zip(entries, backend.read_objects([entry.oid for entry in entries])):
+        entry.content = content
+    return records
+
+
+def build_conflict_index(backend, load_contents=False, sniff_binaries=True):
+    """List every conflicted path of the current merge as a ConflictRecord.
+
+    With sniff_binaries, binary content conflicts are detected from the first
+    BINARY_SNIFF_BYTES of each blob. With load_contents, the whole blobs of
+    all stages are fetched as well, in a single batched object read;
+    otherwise use load_blobs on the records that need them.
+    """
+    records = parse_unmerged_entries(backend.run(['ls-files', '-u', '-z']).stdout)
+    if sniff_binaries:
+        _detect_binaries(backend, records)
+    if load_contents:
+        load_blobs(backend, records)
+    return records
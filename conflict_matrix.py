@@ -0,0 +1,170 @@
+"""
+Pairwise conflict prediction for a set of branches.
+
+Every pair of branches, and every branch against the base, is merged in
+memory with `git merge-tree` across a process pool. Results are cached in
+.git/githelper per pair of commit SHAs, so after one branch moves only the
+pairs involving that branch are recomputed. A pair whose merge fails is
+reported as an error, never as clean, and is not cached.
+"""
+
+import json
+import os
+import sys
+import concurrent.futures
+
+from git_backend import SubprocessBackend
+
+CACHE_FILE = 'conflict-matrix.json'
+MAX_CACHE_ENTRIES = 20000
+
+
+def _predict_conflicts(repo_path, ours, theirs):
+    """Merge two commits in memory and return the conflicting paths (runs in a worker process)"""
+    return SubprocessBackend(repo_path).merge_tree(ours, theirs)[1]
+
+
+def _pair_key(commit_a, commit_b):
+    # A merge conflicts in the same paths whichever side is "ours"
+    return ':'.join(sorted((commit_a, commit_b)))
+
+
+def load_cache(cache_path):
+    """Load cached pair results, or an empty cache if there is none"""
+    try:
+        with open(cache_path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(cache_path, cache):
+    """Save pair results, dropping the oldest entries beyond MAX_CACHE_ENTRIES"""
+    keys = list(cache)[-MAX_CACHE_ENTRIES:]
+    tmp_path = cache_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({key: cache[key] for key in keys}, f)
+    os.replace(tmp_path, cache_path)
+
+
+def build_conflict_matrix(git_helper, branches, base_branch=None, jobs=None, use_cache=True):
+    """Predict the conflicting paths for every pair of branches.
+
+    Returns a dict with the branch labels, their commit SHAs and a symmetric
+    `conflicts` mapping label -> label -> [paths], or None on error. Pairs that
+    could not be merged map to None in `conflicts` and are listed in `errors`.
+    """
+    if not base_branch:
+        base_branch = git_helper.get_current_branch()
+        if not base_branch:
+            print("Failed to determine the current branch.")
+            return None
+
+    labels = list(dict.fromkeys([base_branch] + list(branches)))
+    commits = git_helper.resolve_commits(labels)
+    missing = [label for label, commit in zip(labels, commits) if commit is None]
+    if missing:
+        print(f"Unknown branches: {', '.join(missing)}")
+        return None
+    commit_of = dict(zip(labels, commits))
+
+    state_dir = git_helper.get_state_dir()
+    cache_path = os.path.join(state_dir, CACHE_FILE) if state_dir else None
+    cache = load_cache(cache_path) if use_cache and cache_path else {}
+
+    pairs = [(a, b) for i, a in enumerate(labels) for b in labels[i + 1:]]
+    todo = {}
+    failed = {}
+    cached = 0
+    for a, b in pairs:
+        key = _pair_key(commit_of[a], commit_of[b])
+        if commit_of[a] == commit_of[b]:
+            cache[key] = []
+        elif key in cache:
+            cache[key] = cache.pop(key)  # mark as recently used
+            cached += 1
+        else:
+            todo[key] = (commit_of[a], commit_of[b])
+
+    if todo:
+        print(f"Merging {len(todo)} branch pairs in memory ({cached} cached)...", file=sys.stderr)
+        # Attribute access keeps multiprocessing out of startup until a matrix is actually built
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = {
+                pool.submit(_predict_conflicts, git_helper.repo_path, ours, theirs): key
+                for key, (ours, theirs) in todo.items()
+            }
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    cache[futures[future]] = future.result()
+                except Exception as e:
+                    failed[futures[future]] = str(e) or type(e).__name__
+                    print(f"Error predicting conflicts for {futures[future]}: {e}", file=sys.stderr)
+
+    if use_cache and cache_path:
+        save_cache(cache_path, cache)
+
+    conflicts = {a: {b: [] for b in labels} for a in labels}
+    errors = []
+    for a, b in pairs:
+        key = _pair_key(commit_of[a], commit_of[b])
+        if key in failed:
+            conflicts[a][b] = conflicts[b][a] = None
+            errors.append({'branches': [a, b], 'error': failed[key]})
+        else:
+            conflicts[a][b] = conflicts[b][a] = cache[key]
+
+    return {
+        'base': base_branch,
+        'branches': labels,
+        'commits': commit_of,
+        'conflicts': conflicts,
+        'computed': len(todo) - len(failed),
+        'cached': cached,
+        'errors': errors
+    }
+
+
+def format_matrix_table(matrix):
+    """Render a conflict matrix as a table of conflicting-file counts plus the conflicting pairs"""
+    labels = matrix['branches']
+    conflicts = matrix['conflicts']
+    width = max(len(label) for label in labels)
+
+    lines = ["Conflict matrix (number of conflicting files, '.' = clean, 'error' = merge failed):", '']
+    lines.append(' ' * (width + 6) + ''.join(f"{f'[{i}]':>6}" for i in range(len(labels))))
+    for i, a in enumerate(labels):
+        cells = []
+        for b in labels:
+            if a == b:
+                cells.append(f"{'-':>6}")
+            elif conflicts[a][b] is None:
+                cells.append(f"{'error':>6}")
+            else:
+                count = len(conflicts[a][b])
+                cells.append(f"{count if count else '.':>6}")
+        lines.append(f"{f'[{i}]':<5} {a:<{width}}" + ''.join(cells))
+
+    lines.append('')
+    conflicting = [
+        (a, b) for i, a in enumerate(labels) for b in labels[i + 1:] if conflicts[a][b]
+    ]
+    if conflicting:
+        lines.append("Conflicting pairs:")
+        for a, b in conflicting:
+            lines.append(f"  {a} <-> {b}: {', '.join(conflicts[a][b])}")
+    elif not matrix['errors']:
+        lines.append("No conflicts predicted between any pair of branches.")
+    if matrix['errors']:
+        lines.append("Pairs that could not be merged:")
+        for error in matrix['errors']:
+            a, b = error['branches']
+            lines.append(f"  {a} <-> {b}: {error['error']}")
+    failed = f", {len(matrix['errors'])} failed" if matrix['errors'] else ''
+    lines.append(f"\n{matrix['computed']} pairs computed, {matrix['cached']} taken from cache{failed}.")
+    return '\n'.join(lines)
+
+
+def format_matrix_json(matrix):
+    """Render a conflict matrix as JSON"""
+    return json.dumps(matrix, indent=2)
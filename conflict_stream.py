@@ -0,0 +1,137 @@
+"""
+Streaming, memory-bounded conflict parsing and rewriting.
+
+Conflicted files are memory-mapped and scanned for conflict markers with a
+regex, so the text between hunks is never decoded or split into lines; it
+is copied to the output in fixed-size chunks. Hunks are yielded lazily and
+the resolved file is written to a temporary file next to the original in
+one pass, then renamed into place atomically. diff3-style base sections
+(`|||||||`) are recognized and kept apart from "ours" and "theirs".
+"""
+
+import mmap
+import os
+import re
+import shutil
+import tempfile
+
+COPY_CHUNK_BYTES = 1024 * 1024
+
+_HUNK_START = re.compile(rb'^<<<<<<<', re.M)
+
+
+def _decode(line):
+    # surrogateescape lets bytes that aren't valid UTF-8 survive the round trip
+    return line.rstrip(b'\n').decode('utf-8', 'surrogateescape')
+
+
+def _encode(line):
+    return line.encode('utf-8', 'surrogateescape')
+
+
+class ConflictFile:
+    """A memory-mapped conflicted file that yields its text ranges and conflict hunks lazily"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        self._map = None
+
+    def __enter__(self):
+        self._file = open(self.path, 'rb')
+        if os.fstat(self._file.fileno()).st_size:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            if hasattr(self._map, 'madvise'):
+                self._map.madvise(mmap.MADV_SEQUENTIAL)
+        return self
+
+    def __exit__(self, *exc):
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+    def _read_line(self, pos):
+        end = self._map.find(b'\n', pos)
+        end = len(self._map) if end == -1 else end + 1
+        return self._map[pos:end], end
+
+    def _parse_hunk(self, start):
+        """Parse the hunk starting at byte offset start; None if its end marker is missing"""
+        hunk = {'ours': [], 'base': None, 'theirs': [], 'start': start}
+        section = 'ours'
+        _, pos = self._read_line(start)
+        while pos < len(self._map):
+            line, next_pos = self._read_line(pos)
+            if line.startswith(b'|||||||') and section == 'ours':
+                section = 'base'
+                hunk['base'] = []
+            elif line.startswith(b'=======') and section != 'theirs':
+                section = 'theirs'
+            elif line.startswith(b'>>>>>>>'):
+                hunk['end'] = next_pos
+                hunk['newline'] = line.endswith(b'\n')
+                return hunk
+            else:
+                hunk[section].append(_decode(line))
+            pos = next_pos
+        return None
+
+    def regions(self):
+        """Yield ('text', start, end) byte ranges and ('hunk', hunk) conflicts in file order"""
+        if self._map is None:
+            return
+        pos = 0
+        size = len(self._map)
+        while pos < size:
+            match = _HUNK_START.search(self._map, pos)
+            hunk = self._parse_hunk(match.start()) if match else None
+            if hunk is None:
+                yield ('text', pos, size)
+                return
+            if hunk['start'] > pos:
+                yield ('text', pos, hunk['start'])
+            yield ('hunk', hunk)
+            pos = hunk['end']
+
+    def copy_range(self, out, start, end):
+        """Copy a byte range of the file to out in bounded chunks"""
+        while start < end:
+            chunk_end = min(end, start + COPY_CHUNK_BYTES)
+            out.write(self._map[start:chunk_end])
+            start = chunk_end
+
+
+def rewrite_conflict_file(path, resolve_hunk):
+    """Replace every conflict hunk of a file with resolve_hunk(index, hunk) in one streaming pass.
+
+    resolve_hunk returns the list of resolved lines, or None to give up, in
+    which case the original file is left untouched. The result is written to a
+    temporary file and renamed over the original atomically. Returns the
+    number of hunks resolved, or None if resolution was abandoned.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.githelper-')
+    try:
+        with os.fdopen(fd, 'wb') as out, ConflictFile(path) as conflict_file:
+            count = 0
+            for region in conflict_file.regions():
+                if region[0] == 'text':
+                    conflict_file.copy_range(out, region[1], region[2])
+                    continue
+                hunk = region[1]
+                lines = resolve_hunk(count, hunk)
+                if lines is None:
+                    os.unlink(tmp_path)
+                    return None
+                if lines:
+                    out.write(b'\n'.join(_encode(line) for line in lines))
+                    if hunk['newline']:
+                        out.write(b'\n')
+                count += 1
+        shutil.copymode(path, tmp_path)
+        os.replace(tmp_path, path)
+        return count
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
@@ -0,0 +1,148 @@
+"""
+Streaming Gemini calls with optional on-disk memoization.
+
+`generate_text` wraps `GenerativeModel.generate_content`. With streaming on,
+chunks are handed to a callback as they arrive, and the time to first
+token and the total latency are recorded. A GeminiMemo can be attached to
+answer repeated prompts from disk. Its key covers the model name, the
+prompt and the generation config, so a different model or temperature
+never reuses an answer. Entries expire after a TTL, and the store is
+bounded in size with least recently used entries evicted first. The memo
+is shared by GitHubAssistant and GitHelper.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from ai_resolver import estimate_tokens
+from http_cache import DEFAULT_CACHE_PATH, ResponseCache
+from tracing import span
+
+DEFAULT_MEMO_PATH = os.path.join(os.path.dirname(DEFAULT_CACHE_PATH), 'gemini-memo.sqlite')
+DEFAULT_MEMO_TTL = 7 * 24 * 3600
+DEFAULT_MEMO_MAX_BYTES = 50 * 1024 * 1024
+
+
+def model_name(model):
+    """Name of a GenerativeModel, as used in memo keys and cache sources"""
+    return getattr(model, 'model_name', 'gemini-pro')
+
+
+def memo_key(model, prompt, generation_config=None):
+    """Memo key of a prompt sent to a model with a generation config"""
+    config = json.dumps(generation_config or {}, sort_keys=True, default=str)
+    digest = hashlib.sha256(f"{model}\0{config}\0{prompt}".encode('utf-8', 'surrogateescape')).hexdigest()
+    return f"gemini:{digest}"
+
+
+@dataclass
+class Generation:
+    """The text of a Gemini answer and how long it took"""
+    text: str
+    cached: bool = False
+    first_token_seconds: Optional[float] = None
+    total_seconds: float = 0.0
+
+    def first_token_label(self):
+        """Describe the first-token latency, or say the stream yielded no tokens"""
+        if self.first_token_seconds is None:
+            return "no tokens"
+        return f"first token {self.first_token_seconds:.1f}s"
+
+
+class GeminiMemo:
+    """TTL- and size-bounded store of Gemini answers, keyed by memo_key"""
+
+    def __init__(self, path=DEFAULT_MEMO_PATH, ttl=DEFAULT_MEMO_TTL, max_bytes=DEFAULT_MEMO_MAX_BYTES):
+        self.ttl = ttl
+        self._store = ResponseCache(path, max_bytes)
+        self._counters = {'hits': 0, 'misses': 0}
+        self._lock = threading.Lock()
+
+    def _count(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def get(self, key):
+        """Return the memoized answer for a key, or None if it is missing or expired"""
+        entry = self._store.get(key)
+        if entry is None or time.time() - entry['fetched_at'] >= self.ttl:
+            self._count('misses')
+            return None
+        self._count('hits')
+        return entry['body'].decode('utf-8', 'surrogateescape')
+
+    def put(self, key, text):
+        self._store.put(key, text.encode('utf-8', 'surrogateescape'))
+
+    def clear(self):
+        self._store.clear()
+
+    def stats(self):
+        """Hit/miss counters of this session plus the size of the store"""
+        with self._lock:
+            counters = dict(self._counters)
+        lookups = counters['hits'] + counters['misses']
+        return {**counters, 'hit_ratio': counters['hits'] / lookups if lookups else 0.0, **self._store.stats()}
+
+    def close(self):
+        self._store.close()
+
+
+def generate_text(model, prompt, stream=False, on_text=None, memo=None, generation_config=None,
+                  request_options=None):
+    """Ask a model for an answer and return it as a Generation (raises on failure).
+
+    With stream, the answer is requested with stream=True and on_text is
+    called with every chunk as it arrives; otherwise on_text gets the whole
+    answer at once. A memo hit is returned without calling the model.
+    """
+    with span('generate_content', 'ai', model=model_name(model), stream=stream) as trace:
+        generation = _generate_text(model, prompt, stream, on_text, memo, generation_config, request_options)
+        trace.set(cached=generation.cached, prompt_tokens=0 if generation.cached else estimate_tokens(prompt),
+                  response_chars=len(generation.text))
+        if generation.first_token_seconds is not None:
+            trace.set(first_token_seconds=generation.first_token_seconds)
+        return generation
+
+
+def _generate_text(model, prompt, stream, on_text, memo, generation_config, request_options):
+    start = time.perf_counter()
+    key = memo_key(model_name(model), prompt, generation_config) if memo else None
+    if memo:
+        text = memo.get(key)
+        if text is not None:
+            if on_text:
+                on_text(text)
+            return Generation(text, cached=True, total_seconds=time.perf_counter() - start)
+
+    kwargs = {}
+    if generation_config:
+        kwargs['generation_config'] = generation_config
+    if request_options:
+        kwargs['request_options'] = request_options
+
+    first_token = None
+    if stream:
+        parts = []
+        for chunk in model.generate_content(prompt, stream=True, **kwargs):
+            if first_token is None:
+                first_token = time.perf_counter() - start
+            parts.append(chunk.text)
+            if on_text:
+                on_text(chunk.text)
+        text = ''.join(parts)
+    else:
+        text = model.generate_content(prompt, **kwargs).text
+        first_token = time.perf_counter() - start
+        if on_text:
+            on_text(text)
+
+    if memo:
+        memo.put(key, text)
+    return Generation(text, first_token_seconds=first_token, total_seconds=time.perf_counter() - start)
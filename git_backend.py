@@ -0,0 +1,204 @@
+"""
+Git process backends used by GitHelper.
+
+A backend owns every git process GitHelper starts. The default
+SubprocessBackend runs git with argv lists (never through a shell), keeps
+long-lived `git cat-file --batch` / `--batch-check` processes for object
+reads and counts how many processes it has spawned.
+"""
+
+import abc
+import subprocess
+import sys
+import threading
+
+from tracing import span
+
+# Read size when skipping the part of an object beyond a read limit
+SKIP_CHUNK_BYTES = 1 << 16
+
+
+class GitBackend(abc.ABC):
+    """Interface for running git commands in a repository"""
+
+    def __init__(self, repo_path):
+        self.repo_path = repo_path
+        self.process_count = 0
+
+    @abc.abstractmethod
+    def run(self, args, input=None, check=True, capture_output=True):
+        """Run `git <args>` and return a subprocess.CompletedProcess"""
+
+    @abc.abstractmethod
+    def object_info(self, specs):
+        """Return (oid, type, size) for each object spec, or None if it is missing"""
+
+    @abc.abstractmethod
+    def read_objects(self, specs, limit=None):
+        """Return the raw bytes of each object spec, or None if it is missing.
+
+        With limit, only the first limit bytes of each object are returned.
+        """
+
+    def add_paths(self, paths):
+        """Stage several paths with a single git invocation"""
+        if not paths:
+            return True
+        data = '\0'.join(paths) + '\0'
+        self.run(['add', '--pathspec-from-file=-', '--pathspec-file-nul'], input=data)
+        return True
+
+    def merge_tree(self, ours, theirs):
+        """Merge two commits with `git merge-tree --write-tree` without touching the working tree.
+
+        Returns (tree_oid, conflicted_paths). Raises CalledProcessError if git fails.
+        """
+        result = self.run(
+            ['merge-tree', '--write-tree', '--name-only', '-z', '--no-messages', ours, theirs],
+            check=False
+        )
+        # Exit status 1 means the merge has conflicts; anything else non-zero is a real error
+        if result.returncode not in (0, 1):
+            raise subprocess.CalledProcessError(result.returncode, result.args, result.stdout, result.stderr)
+        fields = [f for f in result.stdout.split('\0\0', 1)[0].split('\0') if f]
+        return fields[0], list(dict.fromkeys(fields[1:]))
+
+    def close(self):
+        """Release any long-lived processes held by the backend"""
+
+
+class CatFileBatch:
+    """A long-lived `git cat-file --batch` (or `--batch-check`) process"""
+
+    def __init__(self, backend, check_only=False):
+        self.check_only = check_only
+        mode = '--batch-check' if check_only else '--batch'
+        backend._count_process()
+        self._proc = subprocess.Popen(
+            ['git', 'cat-file', mode],
+            cwd=backend.repo_path,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL
+        )
+        self._lock = threading.Lock()
+
+    def query(self, specs, limit=None):
+        """Look up several object specs, pipelining requests through one process.
+
+        With limit, at most limit bytes of each object are kept and the rest is skipped
+        in chunks, so large blobs can be sniffed without holding them in memory.
+        """
+        specs = list(specs)
+        if not specs:
+            return []
+
+        # Feed requests from a separate thread so a large batch can't deadlock
+        # on a full stdout pipe while we are still writing stdin.
+        def feed():
+            for spec in specs:
+                self._proc.stdin.write(spec.encode('utf-8') + b'\n')
+            self._proc.stdin.flush()
+
+        with self._lock, span('git cat-file', 'git', objects=len(specs)) as trace:
+            writer = threading.Thread(target=feed, daemon=True)
+            writer.start()
+            results = [self._read_one(limit) for _ in specs]
+            writer.join()
+            if not self.check_only:
+                trace.set(bytes_out=sum(len(data) for data in results if data is not None))
+        return results
+
+    def _read_one(self, limit=None):
+        header = self._proc.stdout.readline().decode('utf-8').rstrip('\n')
+        if not header or header.endswith(' missing') or header.endswith(' ambiguous'):
+            return None
+        oid, obj_type, size = header.split(' ')
+        size = int(size)
+        if self.check_only:
+            return (oid, obj_type, size)
+        data = self._proc.stdout.read(size if limit is None else min(size, limit))
+        remaining = size - len(data)
+        while remaining > 0:
+            skipped = len(self._proc.stdout.read(min(remaining, SKIP_CHUNK_BYTES)))
+            if not skipped:
+                break
+            remaining -= skipped
+        self._proc.stdout.read(1)  # trailing LF
+        return data
+
+    def close(self):
+        if self._proc.poll() is None:
+            self._proc.stdin.close()
+            self._proc.wait()
+
+
+class SubprocessBackend(GitBackend):
+    """Runs git as argv-list subprocesses and counts every process spawned"""
+
+    def __init__(self, repo_path, relay_output=False):
+        super().__init__(repo_path)
+        self._count_lock = threading.Lock()
+        # Guards starting and closing the cat-file processes, which concurrent resolvers share
+        self._batch_lock = threading.Lock()
+        self._batch = None
+        self._batch_check = None
+        # Write what git would print to the terminal through sys.stdout/sys.stderr instead, for
+        # processes whose sys.stdout is not the terminal (the helper daemon)
+        self.relay_output = relay_output
+
+    def _count_process(self):
+        with self._count_lock:
+            self.process_count += 1
+
+    def run(self, args, input=None, check=True, capture_output=True):
+        self._count_process()
+        relay = self.relay_output and not capture_output
+        with span(f'git {args[0]}', 'git', argv=' '.join(args)) as trace:
+            try:
+                result = subprocess.run(
+                    ['git'] + list(args),
+                    cwd=self.repo_path,
+                    input=input,
+                    check=check,
+                    text=True,
+                    capture_output=capture_output or relay
+                )
+            except subprocess.CalledProcessError as e:
+                trace.set(exit_status=e.returncode)
+                if relay:
+                    self._relay(e)
+                raise
+            if relay:
+                self._relay(result)
+            trace.set(exit_status=result.returncode, bytes_in=len(input or ''), bytes_out=len(result.stdout or ''))
+            return result
+
+    def _relay(self, result):
+        sys.stdout.write(result.stdout or '')
+        sys.stderr.write(result.stderr or '')
+        # Callers asked for uncaptured output and must not see it twice
+        result.stdout = result.stderr = None
+
+    def object_info(self, specs):
+        with self._batch_lock:
+            if self._batch_check is None:
+                self._batch_check = CatFileBatch(self, check_only=True)
+            batch = self._batch_check
+        return batch.query(specs)
+
+    def read_objects(self, specs, limit=None):
+        with self._batch_lock:
+            if self._batch is None:
+                self._batch = CatFileBatch(self)
+            batch = self._batch
+        return batch.query(specs, limit)
+
+    def close(self):
+        with self._batch_lock:
+            batches = self._batch, self._batch_check
+            self._batch = None
+            self._batch_check = None
+        for batch in batches:
+            if batch is not None:
+                batch.close()
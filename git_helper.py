@@ -1,34 +1,109 @@
 #!/usr/bin/env python3
 import os
 import sys
+import copy
+import shutil
 import subprocess
 import argparse
 import tempfile
+import json
 import re
-import google.generativeai as genai
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from app import load_api_keys
+from startup import lazy_import, profile_startup, DEFAULT_STARTUP_BUDGET_MS
+import tracing
+from tracing import span
+from git_backend import SubprocessBackend
+from conflict_matrix import build_conflict_matrix, format_matrix_table, format_matrix_json
+from branch_inventory import list_branches, format_branch_table, format_branch_json, SORT_KEYS
+from merge_order import plan_merge_order, format_merge_plan
+from merge_journal import MergeJournal, journal_path
+from multi_repo import load_manifest, merge_repos, format_repo_summary, PROMPT_MODES
+from ai_resolver import resolve_concurrently, percentile, estimate_tokens, strip_code_fence
+from conflict_index import build_conflict_index, load_blobs
+from conflict_stream import rewrite_conflict_file
+from gemini_memo import GeminiMemo, generate_text, model_name, DEFAULT_MEMO_TTL
+from resolution_policy import ResolutionPolicy, HUNK_STRATEGIES, conflict_kind
+from resolution_cache import ResolutionCache, hunk_key, file_key, record_key, CACHE_FILE as RESOLUTION_CACHE_FILE
+
+# The Gemini SDK takes most of a second to import; only load it once AI is actually used
+genai = lazy_import('google.generativeai')
 
 class GitHelper:
-    def __init__(self, gemini_api_key=None):
-        self.repo_path = os.getcwd()
+    def __init__(self, gemini_api_key=None, backend=None, ai_concurrency=4, ai_rate_limit=None,
+                 ai_retries=3, ai_timeout=120, ai_mode='file', ai_context_lines=3,
+                 use_resolution_cache=True, verify_cached=False, ai_stream=False, ai_memo=None,
+                 repo_path=None, resolution_policy=None):
+        self.repo_path = repo_path or os.getcwd()
         self.gemini_api_key = gemini_api_key
+        self.backend = backend or SubprocessBackend(self.repo_path)
+        
+        # AI resolution fans out over a thread pool; rate limit is in requests per second
+        self.ai_concurrency = ai_concurrency
+        self.ai_rate_limit = ai_rate_limit
+        self.ai_retries = ai_retries
+        self.ai_timeout = ai_timeout
+        
+        # 'file' sends whole conflicted files to Gemini, 'hunk' only the conflict regions plus context
+        self.ai_mode = ai_mode
+        self.ai_context_lines = ai_context_lines
+        self.ai_prompt_tokens = 0
+        self.ai_tokens_saved = 0
+        self._ai_stats_lock = threading.Lock()
+        
+        # Stream single-file answers as they are generated; ai_memo (a GeminiMemo) answers repeated prompts
+        self.ai_stream = ai_stream
+        self.ai_memo = ai_memo
+        
+        # Resolutions are remembered per conflict hunk, like git rerere
+        self.use_resolution_cache = use_resolution_cache
+        self.verify_cached = verify_cached
+        self._resolution_cache = None
+        
+        # A ResolutionPolicy resolves every conflict without prompting (for CI)
+        self.resolution_policy = resolution_policy
+        
+        # The Gemini model is created on first use
+        self._model = None
+        self._model_lock = threading.Lock()
+        
+        # Interactive prompts are serialized when several merges run at once; label names the merge.
+        # The lock is reentrant because hunk prompts are asked while a file's manual resolution holds it.
+        # prompt_handler replaces input() for every question, e.g. to route prompts to another process
+        self._prompt_lock = threading.RLock()
+        self.merge_label = None
+        self.prompt_handler = None
+        
+        # Journal of the running merge-multi (a MergeJournal) and how the last merge's conflicts were resolved
+        self.journal = None
+        self.last_resolutions = {}
         
-        # Initialize Gemini if API key is provided
-        if self.gemini_api_key:
-            genai.configure(api_key=self.gemini_api_key)
-            self.model = genai.GenerativeModel('gemini-pro')
+        # Outcome of the last multi_branch_merge: temp branch, final commit and result per branch
+        self.last_merge = None
     
-    def _run_git_command(self, command, capture_output=True):
-        """Run a git command and return its output"""
+    @property
+    def model(self):
+        """The Gemini model, configured and created the first time AI is used"""
+        with self._model_lock:
+            if self._model is None:
+                genai.configure(api_key=self.gemini_api_key)
+                self._model = genai.GenerativeModel('gemini-pro')
+            return self._model
+    
+    @model.setter
+    def model(self, model):
+        self._model = model
+    
+    def ask(self, prompt=''):
+        """Ask the user a question and return the answer (through prompt_handler if one is set)"""
+        return (self.prompt_handler or input)(prompt)
+    
+    def _run_git_command(self, args, capture_output=True, input=None):
+        """Run a git command (argv list without the leading 'git') and return its output"""
         try:
-            result = subprocess.run(
-                command, 
-                cwd=self.repo_path, 
-                check=True, 
-                text=True, 
-                shell=True, 
-                capture_output=capture_output
-            )
+            result = self.backend.run(args, input=input, capture_output=capture_output)
             return result.stdout.strip() if capture_output else True
         except subprocess.CalledProcessError as e:
             print(f"Error executing git command: {e}")
@@ -40,44 +115,51 @@ class GitHelper:
     
     def get_current_branch(self):
         """Get the name of the current branch"""
-        return self._run_git_command("git rev-parse --abbrev-ref HEAD")
+        return self._run_git_command(['rev-parse', '--abbrev-ref', 'HEAD'])
     
     def get_all_branches(self):
         """Get a list of all branches in the repository"""
-        branches = self._run_git_command("git branch")
+        branches = self._run_git_command(['for-each-ref', '--format=%(refname:short)', 'refs/heads'])
         if branches:
-            # Parse branch names from the output
-            return [b.strip('* ') for b in branches.split('\n')]
+            return branches.split('\n')
         return []
     
+    def get_branch_inventory(self, base=None, **options):
+        """List branches with their last commit and ahead/behind counts against base (default: current branch)
+        
+        options are passed to branch_inventory.list_branches (include_remotes, pattern, merged,
+        sort, limit, with_changes). Returns a list of BranchInfo, or None if git fails.
+        """
+        base = base or self.get_current_branch()
+        return list_branches(self.backend, base, **options)
+    
     def checkout_branch(self, branch_name):
         """Checkout to a specific branch"""
-        return self._run_git_command(f"git checkout {branch_name}", capture_output=False)
+        return self._run_git_command(['checkout', branch_name], capture_output=False)
     
     def create_temp_branch(self, base_branch, temp_branch_name):
-        """Create a temporary branch from the base branch"""
-        self.checkout_branch(base_branch)
-        return self._run_git_command(f"git checkout -b {temp_branch_name}", capture_output=False)
+        """Create (or reset) a temporary branch at the base branch or commit and check it out"""
+        return self._run_git_command(['checkout', '-B', temp_branch_name, base_branch], capture_output=False)
     
     def merge_branch(self, branch_name):
         """Merge a branch into the current branch"""
-        return self._run_git_command(f"git merge --no-commit --no-ff {branch_name}")
+        return self._run_git_command(['merge', '--no-commit', '--no-ff', branch_name])
     
     def abort_merge(self):
         """Abort the current merge operation"""
-        return self._run_git_command("git merge --abort", capture_output=False)
+        return self._run_git_command(['merge', '--abort'], capture_output=False)
     
     def get_merge_conflicts(self):
         """Get a list of files with merge conflicts"""
-        status = self._run_git_command("git status --porcelain")
-        if not status:
+        return [record.path for record in self.get_conflict_index(sniff_binaries=False)]
+    
+    def get_conflict_index(self, load_contents=False, sniff_binaries=True):
+        """Get a ConflictRecord for every conflicted path; blobs are loaded lazily unless load_contents"""
+        try:
+            return build_conflict_index(self.backend, load_contents, sniff_binaries)
+        except subprocess.CalledProcessError as e:
+            print(f"Error reading the conflict index: {e}")
             return []
-        
-        conflict_files = []
-        for line in status.split('\n'):
-            if line.startswith('UU '):
-                conflict_files.append(line[3:])
-        return conflict_files
     
     def get_file_content(self, file_path):
         """Get the content of a file"""
@@ -88,6 +170,16 @@ class GitHelper:
             print(f"Error reading file {file_path}: {e}")
             return None
     
+    def write_file_bytes(self, file_path, data):
+        """Write raw bytes to a file"""
+        try:
+            with open(os.path.join(self.repo_path, file_path), 'wb') as f:
+                f.write(data)
+            return True
+        except Exception as e:
+            print(f"Error writing to file {file_path}: {e}")
+            return False
+    
     def write_file_content(self, file_path, content):
         """Write content to a file"""
         try:
@@ -100,11 +192,98 @@ class GitHelper:
     
     def add_file(self, file_path):
         """Add a file to git staging"""
-        return self._run_git_command(f"git add {file_path}", capture_output=False)
+        return self.add_files([file_path])
+    
+    def add_files(self, file_paths):
+        """Add several files to git staging with a single git invocation"""
+        try:
+            return self.backend.add_paths(file_paths)
+        except subprocess.CalledProcessError as e:
+            print(f"Error staging files: {e}")
+            if e.stderr:
+                print(f"Error: {e.stderr}")
+            return None
     
     def commit_changes(self, message):
         """Commit changes with a message"""
-        return self._run_git_command(f'git commit -m "{message}"', capture_output=False)
+        return self._run_git_command(['commit', '-m', message], capture_output=False)
+    
+    def get_state_dir(self):
+        """Directory inside .git where GitHelper keeps its caches and journals"""
+        # The common dir is shared by all worktrees, so parallel merges share caches and journals
+        git_dir = self._run_git_command(['rev-parse', '--path-format=absolute', '--git-common-dir'])
+        if not git_dir:
+            return None
+        state_dir = os.path.join(git_dir, 'githelper')
+        os.makedirs(state_dir, exist_ok=True)
+        return state_dir
+    
+    def get_resolution_cache(self):
+        """The on-disk resolution cache, or None if it is disabled"""
+        if not self.use_resolution_cache:
+            return None
+        if self._resolution_cache is None:
+            state_dir = self.get_state_dir()
+            if not state_dir:
+                return None
+            self._resolution_cache = ResolutionCache(os.path.join(state_dir, RESOLUTION_CACHE_FILE))
+        return self._resolution_cache
+    
+    def _cached_resolution(self, key, label, alternatives=()):
+        """Look up a cached resolution, asking for confirmation first when verify_cached is set"""
+        cache = self.get_resolution_cache()
+        entry = cache.get(key, *alternatives) if cache else None
+        if entry is None:
+            return None
+        
+        resolution = entry['resolution']
+        if self.verify_cached:
+            # Keep the preview and its question together when several merges run at once
+            with self._prompt_lock:
+                print(f"\nCached resolution for {label} (from {entry['source']}):")
+                print(resolution if isinstance(resolution, str) else '\n'.join(resolution))
+                if self.ask("Apply cached resolution? (y/n): ").lower() != 'y':
+                    return None
+        print(f"Applied cached resolution for {label} (from {entry['source']})")
+        return resolution
+    
+    def _remember_resolution(self, key, resolution, source):
+        """Store a resolution in the cache so the same conflict is never resolved twice"""
+        cache = self.get_resolution_cache()
+        if cache:
+            cache.put(key, resolution, source)
+    
+    def _ai_source(self):
+        return f"ai:{model_name(self.model)}"
+    
+    def _resolve_from_cache(self, file_path, file_content, record=None):
+        """Resolve a whole file from the cache, either as a file or hunk by hunk; None if anything is missing"""
+        cache = self.get_resolution_cache()
+        if not cache:
+            return None
+        keys = [record_key(record)] if record else []
+        keys.append(file_key(file_content))
+        if not any(key in cache for key in keys):
+            conflicts = self.extract_conflict_sections(file_content)
+            hunk_keys = [hunk_key(c['ours'], c['theirs'], c.get('base')) for c in conflicts]
+            if conflicts and all(key in cache for key in hunk_keys):
+                replacements = [self._cached_resolution(key, f"{file_path} hunk {i + 1}")
+                                for i, key in enumerate(hunk_keys)]
+                if any(replacement is None for replacement in replacements):
+                    return None
+                return self.splice_resolutions(file_content, conflicts, replacements)
+        # One hit or one miss for the file, whichever of its keys is cached
+        return self._cached_resolution(keys[0], file_path, keys[1:])
+    
+    def resolve_commits(self, revisions):
+        """Resolve revisions to commit SHAs in one batch (None for revisions that don't exist)"""
+        infos = self.backend.object_info([f"{rev}^{{commit}}" for rev in revisions])
+        return [info[0] if info else None for info in infos]
+    
+    def find_missing_revisions(self, revisions):
+        """Return the revisions that don't resolve to a commit, checked in one batch"""
+        commits = self.resolve_commits(revisions)
+        return [rev for rev, commit in zip(revisions, commits) if commit is None]
     
     def resolve_conflict_with_ai(self, file_path, file_content):
         """Use Gemini AI to resolve merge conflicts in a file"""
@@ -112,7 +291,38 @@ class GitHelper:
             print("Gemini API key not provided. Cannot use AI to resolve conflicts.")
             return None
         
-        prompt = f"""
+        try:
+            if not self.ai_stream:
+                return self._generate_ai_resolution(file_content)
+            return self._stream_resolution(file_path, self._build_file_prompt(file_content))
+        except Exception as e:
+            print(f"Error getting response from Gemini: {e}")
+            return None
+    
+    def _generate(self, prompt, stream=False, on_text=None):
+        """Send a prompt to Gemini (or answer it from the memo) and return the Generation"""
+        generation = generate_text(self.model, prompt, stream=stream, on_text=on_text, memo=self.ai_memo,
+                                   request_options={'timeout': self.ai_timeout})
+        if not generation.cached:
+            with self._ai_stats_lock:
+                self.ai_prompt_tokens += estimate_tokens(prompt)
+        return generation
+    
+    def _ask_model(self, prompt):
+        """Send a prompt to Gemini and return the response text (raises on failure)"""
+        return self._generate(prompt).text
+    
+    def _stream_resolution(self, file_path, prompt):
+        """Print Gemini's resolution of a file as it is generated and return it (raises on failure)"""
+        print(f"\nGemini resolution for {file_path}:")
+        generation = self._generate(prompt, stream=True, on_text=lambda text: print(text, end='', flush=True))
+        source = "memoized" if generation.cached else generation.first_token_label()
+        print(f"\n({source}, total {generation.total_seconds:.1f}s)")
+        return generation.text
+    
+    def _build_file_prompt(self, file_content):
+        """Prompt asking Gemini to resolve every conflict in a whole file"""
+        return f"""
         I have a merge conflict in a Git file. Please help me resolve it by analyzing the conflict markers and providing a clean, resolved version.
         
         Here's the file with conflicts:
@@ -124,28 +334,222 @@ class GitHelper:
         Please provide ONLY the resolved content without any explanations or conflict markers (<<<<<<< HEAD, =======, >>>>>>> branch).
         Make sure to preserve the functionality from both versions when possible.
         """
+    
+    def _build_hunk_prompt(self, file_path, lines, conflict):
+        """Prompt asking Gemini to resolve a single conflict region given some surrounding context"""
+        before = lines[max(0, conflict['start_line'] - self.ai_context_lines):conflict['start_line']]
+        after = lines[conflict['end_line'] + 1:conflict['end_line'] + 1 + self.ai_context_lines]
+        return f"""
+        I have a merge conflict in the Git file {file_path}. Please resolve this single conflicting region.
         
-        try:
-            response = self.model.generate_content(prompt)
-            return response.text
-        except Exception as e:
-            print(f"Error getting response from Gemini: {e}")
-            return None
+        Lines before the conflict (for context only):
+        ```
+        {chr(10).join(before)}
+        ```
+        
+        OUR version (current branch):
+        ```
+        {chr(10).join(conflict['ours'])}
+        ```
+        
+        THEIR version (branch being merged):
+        ```
+        {chr(10).join(conflict['theirs'])}
+        ```
+        
+        Lines after the conflict (for context only):
+        ```
+        {chr(10).join(after)}
+        ```
+        
+        Please provide ONLY the resolved lines that replace the conflicting region, without the context lines, explanations or conflict markers.
+        Make sure to preserve the functionality from both versions when possible.
+        """
+    
+    def _build_three_way_prompt(self, record):
+        """Prompt asking Gemini to merge the base, our and their versions of a file from the index"""
+        load_blobs(self.backend, [record])
+        base = record.text('base')
+        return f"""
+        I have a merge conflict in the Git file {record.path}. Please merge the versions below into a clean, resolved version.
+        
+        Common ancestor (base) version:
+        ```
+        {base if base is not None else '(the file did not exist in the common ancestor)'}
+        ```
+        
+        OUR version (current branch):
+        ```
+        {record.text('ours')}
+        ```
+        
+        THEIR version (branch being merged):
+        ```
+        {record.text('theirs')}
+        ```
+        
+        Please provide ONLY the merged content without any explanations or conflict markers.
+        Make sure to preserve the changes each side made relative to the base when possible.
+        """
+    
+    def _generate_ai_resolution(self, file_content):
+        """Ask Gemini for the resolved version of a conflicted file (raises on failure)"""
+        return self._ask_model(self._build_file_prompt(file_content))
+    
+    def resolve_files_with_ai(self, file_contents, records=None):
+        """Resolve several conflicted files with Gemini concurrently.
+        
+        file_contents maps paths to their content with conflict markers. When
+        records (path -> ConflictRecord) are given, whole-file prompts are built
+        from the base/ours/theirs blobs in the index instead of the markers.
+        Each file is written back and staged as soon as its resolution arrives.
+        Returns the list of files that were resolved.
+        """
+        if self.ai_mode == 'hunk':
+            return self._resolve_hunks_with_ai(file_contents)
+        
+        records = records or {}
+        resolved_files = []
+        file_contents = dict(file_contents)
+        for file_path, file_content in list(file_contents.items()):
+            cached = self._resolve_from_cache(file_path, file_content, records.get(file_path))
+            if cached is not None and self.write_file_content(file_path, cached):
+                del file_contents[file_path]
+                if self.add_file(file_path) is not None:
+                    resolved_files.append(file_path)
+        if not file_contents:
+            return resolved_files
+        
+        def resolve(file_path):
+            if file_path in records:
+                prompt = self._build_three_way_prompt(records[file_path])
+            else:
+                prompt = self._build_file_prompt(file_contents[file_path])
+            if self.ai_stream:
+                return self._stream_resolution(file_path, prompt)
+            return self._ask_model(prompt)
+        
+        def on_result(file_path, resolved_content):
+            if resolved_content:
+                # The prompts fence every side, so answers often come fenced too; keep the file's final newline
+                final_newline = '\n' if file_contents[file_path].endswith('\n') else ''
+                resolved_content = strip_code_fence(resolved_content) + final_newline
+            if resolved_content and self.write_file_content(file_path, resolved_content):
+                key = record_key(records[file_path]) if file_path in records else file_key(file_contents[file_path])
+                self._remember_resolution(key, resolved_content, self._ai_source())
+                if self.add_file(file_path) is not None:
+                    resolved_files.append(file_path)
+        
+        # Streamed answers are printed as they arrive, so they are generated one at a time
+        concurrency = 1 if self.ai_stream else self.ai_concurrency
+        print(f"Using AI to resolve conflicts in {len(file_contents)} files ({concurrency} at a time)...")
+        latencies = resolve_concurrently(
+            list(file_contents),
+            resolve,
+            on_result,
+            concurrency=concurrency,
+            rate_limit=self.ai_rate_limit,
+            retries=self.ai_retries
+        )
+        if latencies:
+            print(f"AI resolved {len(resolved_files)}/{len(file_contents)} files "
+                  f"(p50 {percentile(latencies, 50):.1f}s, p95 {percentile(latencies, 95):.1f}s)")
+        return resolved_files
+    
+    def _resolve_hunks_with_ai(self, file_contents):
+        """Resolve every conflict hunk independently and in parallel, splicing the answers back per file.
+        
+        Only the conflict regions plus ai_context_lines of context are sent, so prompt size
+        follows the size of the conflicts rather than the size of the files.
+        """
+        conflicts = {}
+        prompts = {}
+        for file_path, file_content in file_contents.items():
+            conflicts[file_path] = self.extract_conflict_sections(file_content)
+            lines = file_content.split('\n')
+            for i, conflict in enumerate(conflicts[file_path]):
+                prompts[f"{file_path} hunk {i + 1}"] = (file_path, i, self._build_hunk_prompt(file_path, lines, conflict))
+        
+        answers = {file_path: [None] * len(file_conflicts) for file_path, file_conflicts in conflicts.items()}
+        pending = {file_path: len(file_conflicts) for file_path, file_conflicts in conflicts.items()}
+        resolved_files = []
+        
+        def finish(file_path):
+            if all(answer is not None for answer in answers[file_path]):
+                resolved_content = self.splice_resolutions(
+                    file_contents[file_path], conflicts[file_path], answers[file_path]
+                )
+                if self.write_file_content(file_path, resolved_content) and self.add_file(file_path) is not None:
+                    resolved_files.append(file_path)
+        
+        def on_result(hunk, text):
+            file_path, i, _ = prompts[hunk]
+            if text is not None:
+                text = strip_code_fence(text)
+                answers[file_path][i] = text.split('\n') if text else []
+                conflict = conflicts[file_path][i]
+                key = hunk_key(conflict['ours'], conflict['theirs'], conflict.get('base'))
+                self._remember_resolution(key, answers[file_path][i], self._ai_source())
+            pending[file_path] -= 1
+            if pending[file_path] == 0:
+                finish(file_path)
+        
+        # Hunks seen before are answered from the cache and never reach Gemini
+        for hunk, (file_path, i, _) in list(prompts.items()):
+            conflict = conflicts[file_path][i]
+            cached = self._cached_resolution(hunk_key(conflict['ours'], conflict['theirs'], conflict.get('base')), hunk)
+            if cached is not None:
+                answers[file_path][i] = cached
+                pending[file_path] -= 1
+                del prompts[hunk]
+        for file_path in file_contents:
+            if pending[file_path] == 0:
+                finish(file_path)
+        
+        print(f"Using AI to resolve {len(prompts)} conflict hunks in {len(file_contents)} files "
+              f"({self.ai_concurrency} at a time)...")
+        tokens_before = self.ai_prompt_tokens
+        latencies = resolve_concurrently(
+            list(prompts),
+            lambda hunk: self._ask_model(prompts[hunk][2]),
+            on_result,
+            concurrency=self.ai_concurrency,
+            rate_limit=self.ai_rate_limit,
+            retries=self.ai_retries,
+            unit='hunks'
+        )
+        
+        whole_file_tokens = sum(estimate_tokens(self._build_file_prompt(c)) for c in file_contents.values())
+        hunk_tokens = sum(estimate_tokens(prompt) for _, _, prompt in prompts.values())
+        self.ai_tokens_saved += max(0, whole_file_tokens - hunk_tokens)
+        if latencies:
+            print(f"AI resolved {len(resolved_files)}/{len(file_contents)} files "
+                  f"(p50 {percentile(latencies, 50):.1f}s, p95 {percentile(latencies, 95):.1f}s)")
+            print(f"Sent ~{self.ai_prompt_tokens - tokens_before} prompt tokens; whole-file prompts "
+                  f"would have used ~{whole_file_tokens}")
+        return resolved_files
     
     def extract_conflict_sections(self, content):
-        """Extract the conflicting sections from the file content"""
+        """Extract the conflicting sections from the file content
+        
+        diff3-style base sections (between ||||||| and =======) go to 'base';
+        'base' is None when the markers have no base section.
+        """
         conflicts = []
         lines = content.split('\n')
         in_conflict = False
-        current_conflict = {'ours': [], 'theirs': [], 'start_line': 0, 'end_line': 0}
+        current_conflict = {'ours': [], 'base': None, 'theirs': [], 'start_line': 0, 'end_line': 0}
         current_section = 'ours'
         
         for i, line in enumerate(lines):
             if line.startswith('<<<<<<<'):
                 in_conflict = True
-                current_conflict = {'ours': [], 'theirs': [], 'start_line': i, 'end_line': 0}
+                current_conflict = {'ours': [], 'base': None, 'theirs': [], 'start_line': i, 'end_line': 0}
                 current_section = 'ours'
-            elif in_conflict and line.startswith('======='):
+            elif in_conflict and current_section == 'ours' and line.startswith('|||||||'):
+                current_section = 'base'
+                current_conflict['base'] = []
+            elif in_conflict and current_section != 'theirs' and line.startswith('======='):
                 current_section = 'theirs'
             elif in_conflict and line.startswith('>>>>>>>'):
                 in_conflict = False
@@ -156,48 +560,15 @@ class GitHelper:
         
         return conflicts
     
-    def resolve_conflict_manually(self, file_path, file_content):
-        """Manually resolve conflicts by showing both versions and letting the user choose"""
-        conflicts = self.extract_conflict_sections(file_content)
-        if not conflicts:
-            print(f"No conflict markers found in {file_path}")
-            return file_content
-        
+    def splice_resolutions(self, file_content, conflicts, replacements):
+        """Replace each conflict section (markers included) with its resolved lines"""
         resolved_lines = file_content.split('\n')
         offset = 0  # Offset to account for removed conflict markers
         
-        for conflict in conflicts:
-            print(f"\nConflict in {file_path}:")
-            print("\nOUR version (current branch):")
-            print('\n'.join(conflict['ours']))
-            print("\nTHEIR version (branch being merged):")
-            print('\n'.join(conflict['theirs']))
-            
-            choice = input("\nChoose resolution:\n1. Keep our version\n2. Keep their version\n3. Keep both versions\n4. Enter custom resolution\nChoice (1/2/3/4): ")
-            
+        for conflict, replacement in zip(conflicts, replacements):
             # Calculate the number of lines in the conflict section including markers
             conflict_length = conflict['end_line'] - conflict['start_line'] + 1
             
-            # Prepare the replacement content based on user choice
-            if choice == '1':
-                replacement = conflict['ours']
-            elif choice == '2':
-                replacement = conflict['theirs']
-            elif choice == '3':
-                replacement = conflict['ours'] + conflict['theirs']
-            elif choice == '4':
-                print("Enter your custom resolution (end with a line containing only 'END'):")
-                custom_lines = []
-                while True:
-                    line = input()
-                    if line == 'END':
-                        break
-                    custom_lines.append(line)
-                replacement = custom_lines
-            else:
-                print("Invalid choice. Keeping both versions.")
-                replacement = conflict['ours'] + conflict['theirs']
-            
             # Replace the conflict section in the resolved_lines
             resolved_lines[conflict['start_line'] - offset:conflict['end_line'] + 1 - offset] = replacement
             
@@ -206,8 +577,633 @@ class GitHelper:
         
         return '\n'.join(resolved_lines)
     
-    def multi_branch_merge(self, branches, base_branch=None, use_ai=False):
-        """Merge multiple branches together and resolve conflicts"""
+    def _choose_hunk_resolution(self, file_path, index, conflict):
+        """Resolve one conflict hunk from the cache or by asking the user; returns the resolved lines"""
+        key = hunk_key(conflict['ours'], conflict['theirs'], conflict.get('base'))
+        cached = self._cached_resolution(key, f"{file_path} hunk {index + 1}")
+        if cached is not None:
+            return cached
+        
+        print(f"\nConflict in {file_path}:")
+        print("\nOUR version (current branch):")
+        print('\n'.join(conflict['ours']))
+        if conflict.get('base') is not None:
+            print("\nBASE version (common ancestor):")
+            print('\n'.join(conflict['base']))
+        print("\nTHEIR version (branch being merged):")
+        print('\n'.join(conflict['theirs']))
+        
+        choice = self.ask("\nChoose resolution:\n1. Keep our version\n2. Keep their version\n3. Keep both versions\n4. Enter custom resolution\nChoice (1/2/3/4): ")
+        # Only an explicit choice is applied and cached, so a typo is never replayed on later runs
+        while choice not in ('1', '2', '3', '4'):
+            choice = self.ask("Invalid choice. Choice (1/2/3/4): ")
+        
+        # Prepare the replacement content based on user choice
+        if choice == '1':
+            replacement = conflict['ours']
+        elif choice == '2':
+            replacement = conflict['theirs']
+        elif choice == '3':
+            replacement = conflict['ours'] + conflict['theirs']
+        else:
+            print("Enter your custom resolution (end with a line containing only 'END'):")
+            custom_lines = []
+            while True:
+                line = self.ask()
+                if line == 'END':
+                    break
+                custom_lines.append(line)
+            replacement = custom_lines
+        
+        self._remember_resolution(key, replacement, 'manual')
+        return replacement
+    
+    def resolve_conflict_manually(self, file_path, file_content):
+        """Manually resolve conflicts by showing both versions and letting the user choose"""
+        conflicts = self.extract_conflict_sections(file_content)
+        if not conflicts:
+            print(f"No conflict markers found in {file_path}")
+            return file_content
+        
+        replacements = [self._choose_hunk_resolution(file_path, i, conflict) for i, conflict in enumerate(conflicts)]
+        return self.splice_resolutions(file_content, conflicts, replacements)
+    
+    def resolve_file_manually(self, file_path):
+        """Manually resolve the conflicts of a file on disk without loading it into memory
+        
+        The file is memory-mapped, hunks are parsed lazily and the resolved
+        output is streamed to a temporary file that atomically replaces it.
+        """
+        try:
+            count = rewrite_conflict_file(
+                os.path.join(self.repo_path, file_path),
+                lambda index, hunk: self._choose_hunk_resolution(file_path, index, hunk)
+            )
+        except OSError as e:
+            print(f"Error rewriting file {file_path}: {e}")
+            return False
+        if count == 0:
+            print(f"No conflict markers found in {file_path}")
+        return count is not None
+    
+    def resolve_whole_file_conflict(self, record):
+        """Resolve a conflict that has no markers to merge (binary, delete or mode conflicts)
+        
+        The chosen side is written from the blobs in the conflict index. Returns
+        True once the working tree holds the resolution, ready to be staged.
+        """
+        path = record.path
+        if record.kind in ('added-by-us', 'added-by-them'):
+            print(f"Keeping {path} ({record.kind})")
+            return True
+        if record.kind == 'delete/delete':
+            return self._remove_working_file(path)
+        load_blobs(self.backend, [record])
+        
+        if record.kind in ('modify/delete', 'delete/modify'):
+            survivor = record.ours if record.kind == 'modify/delete' else record.theirs
+            deleted_by = 'their' if record.kind == 'modify/delete' else 'our'
+            print(f"\n{path} was deleted on {deleted_by} side and modified on the other.")
+            choice = self.ask("Choose resolution:\n1. Keep the modified file\n2. Delete the file\nChoice (1/2): ")
+            if choice == '1':
+                return self.write_file_bytes(path, survivor.content)
+            if choice == '2':
+                return self._remove_working_file(path)
+            print("Invalid choice.")
+            return False
+        
+        if record.kind == 'mode':
+            print(f"\n{path} has conflicting file modes: ours {record.ours.mode}, theirs {record.theirs.mode}.")
+            choice = self.ask("Choose resolution:\n1. Keep our mode\n2. Keep their mode\nChoice (1/2): ")
+            if choice not in ('1', '2'):
+                print("Invalid choice.")
+                return False
+            # The side whose content differs from the base carries the content change
+            content_side = record.theirs if record.ours.oid == record.base.oid else record.ours
+            mode = record.ours.mode if choice == '1' else record.theirs.mode
+            if not self.write_file_bytes(path, content_side.content):
+                return False
+            os.chmod(os.path.join(self.repo_path, path), 0o755 if mode == '100755' else 0o644)
+            return True
+        
+        print(f"\n{path} is a binary file and cannot be merged line by line.")
+        choice = self.ask("Choose resolution:\n1. Keep our version\n2. Keep their version\nChoice (1/2): ")
+        if choice not in ('1', '2'):
+            print("Invalid choice.")
+            return False
+        return self.write_file_bytes(path, (record.ours if choice == '1' else record.theirs).content)
+    
+    def _remove_working_file(self, file_path):
+        """Delete a file from the working tree so that staging it records the deletion"""
+        try:
+            os.remove(os.path.join(self.repo_path, file_path))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Error deleting file {file_path}: {e}")
+            return False
+        return True
+    
+    def merge_tree(self, ours, theirs):
+        """Merge two commits without touching the index or working tree.
+        
+        Returns (tree_oid, conflicted_paths), or None if git could not perform the merge.
+        """
+        try:
+            return self.backend.merge_tree(ours, theirs)
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f"Error executing git merge-tree: {e}")
+            if getattr(e, 'stderr', None):
+                print(f"Error: {e.stderr}")
+            return None
+    
+    def get_changed_paths(self, base, branch):
+        """Get the set of paths a branch changed since its merge base with base"""
+        paths = self._run_git_command(['diff', '--name-only', '-z', f"{base}...{branch}"])
+        if paths is None:
+            return None
+        return set(p for p in paths.split('\0') if p)
+    
+    def octopus_merge(self, branches):
+        """Merge several branches into HEAD with a single octopus merge commit"""
+        names = ', '.join(f"'{b}'" for b in branches)
+        if self._run_git_command(['merge', '--no-ff', '-m', f"Merge branches {names} without conflicts"] + list(branches)) is None:
+            self._run_git_command(['reset', '--merge'], capture_output=False)
+            return False
+        return True
+    
+    def plan_merge_order(self, base_branch, branches):
+        """Order branches to minimize expected conflicts based on the paths each one changes"""
+        path_sets = {}
+        for branch in branches:
+            paths = self.get_changed_paths(base_branch, branch)
+            if paths is None:
+                return None
+            path_sets[branch] = paths
+        return plan_merge_order(path_sets)
+    
+    def commit_tree(self, tree, parents, message):
+        """Create a commit object for a tree without touching any ref"""
+        args = ['commit-tree', tree]
+        for parent in parents:
+            args += ['-p', parent]
+        return self._run_git_command(args + ['-m', message])
+    
+    def _resolve_conflicts(self, records, use_ai, label=None):
+        """Resolve every conflict of the current merge and stage the results
+        
+        Text conflicts go to the AI (concurrently, staged as they arrive) or to the
+        streaming manual resolver; binary, delete and mode conflicts are resolved
+        from the index blobs. Everything not resolved by the AI is staged in one batch.
+        With a resolution policy, the policy decides instead and nothing is asked.
+        The resolution cache is saved even when resolving is interrupted part way,
+        so a resumed run does not ask for what was already answered.
+        """
+        try:
+            if self.resolution_policy:
+                return self._resolve_with_policy(records, label)
+            return self._resolve_with_prompts(records, use_ai)
+        finally:
+            cache = self.get_resolution_cache()
+            if cache:
+                cache.save()
+    
+    def _resolve_with_prompts(self, records, use_ai):
+        """Resolve the conflicts with the AI, then ask about whatever is left"""
+        text_records = {record.path: record for record in records if record.is_text_conflict}
+        ai_resolved = set()
+        if use_ai and self.gemini_api_key and text_records:
+            file_contents = {}
+            for file_path in text_records:
+                file_content = self.get_file_content(file_path)
+                if file_content:
+                    file_contents[file_path] = file_content
+            with span("resolve with AI", 'ai', files=len(file_contents)):
+                ai_resolved = set(self.resolve_files_with_ai(file_contents, text_records))
+            self.last_resolutions.update((file_path, 'ai') for file_path in ai_resolved)
+        
+        resolved_files = []
+        success = True
+        for record in records:
+            file_path = record.path
+            if file_path in ai_resolved:
+                continue
+            # Mostly time spent waiting for the user to choose
+            with self._prompt_lock, span("resolve", 'user', path=file_path, kind=record.kind):
+                if self.merge_label:
+                    print(f"\n[{self.merge_label}] Resolving {file_path}")
+                if file_path in text_records:
+                    if use_ai and self.gemini_api_key:
+                        print(f"AI failed to resolve conflicts in {file_path}. Falling back to manual resolution.")
+                    resolved = self.resolve_file_manually(file_path)
+                else:
+                    resolved = self.resolve_whole_file_conflict(record)
+            
+            if resolved:
+                resolved_files.append(file_path)
+                self.last_resolutions[file_path] = 'manual'
+                print(f"Resolved conflicts in {file_path}")
+            else:
+                print(f"Failed to resolve conflicts in {file_path}")
+                success = False
+        
+        if success and self.add_files(resolved_files) is None:
+            success = False
+        return success
+    
+    def _resolve_with_policy(self, records, label=None):
+        """Resolve every conflict of the current merge as the resolution policy says, without prompting.
+        
+        ours, theirs and union rewrite text conflicts hunk by hunk in one streaming pass;
+        ours and theirs take a whole side for the other kinds. Files for the AI are resolved
+        together, and cache-only files must be fully covered by the resolution cache. Every
+        decision is added to the policy's report. Returns True if every conflict was resolved.
+        """
+        policy = self.resolution_policy
+        resolved_files = []
+        ai_records = {}
+        success = True
+        
+        def finish(record, kind, strategy, rule, resolved, hunks=0, start=None, detail=None):
+            nonlocal success
+            seconds = time.perf_counter() - start if start else 0.0
+            policy.report.add(label, record.path, kind, strategy, rule, resolved, hunks, seconds, detail)
+            if resolved:
+                self.last_resolutions[record.path] = f"policy:{strategy}"
+            else:
+                print(f"Policy could not resolve {record.path} ({kind}, {strategy}){': ' + detail if detail else ''}")
+                success = False
+        
+        with span("resolve with policy", 'merge', files=len(records)):
+            for record in records:
+                kind = conflict_kind(record)
+                strategy, rule = policy.strategy_for(record.path, kind)
+                start = time.perf_counter()
+                if strategy in HUNK_STRATEGIES and record.is_text_conflict:
+                    try:
+                        hunks = rewrite_conflict_file(os.path.join(self.repo_path, record.path),
+                                                      lambda index, hunk: HUNK_STRATEGIES[strategy](hunk))
+                    except OSError as e:
+                        finish(record, kind, strategy, rule, False, start=start, detail=str(e))
+                        continue
+                    resolved_files.append(record.path)
+                    finish(record, kind, strategy, rule, True, hunks, start)
+                elif strategy in ('ours', 'theirs'):
+                    resolved = self._take_side(record, strategy)
+                    if resolved:
+                        resolved_files.append(record.path)
+                    finish(record, kind, strategy, rule, resolved, start=start)
+                elif strategy == 'cache-only' and record.is_text_conflict:
+                    file_content = self.get_file_content(record.path)
+                    cached = self._resolve_from_cache(record.path, file_content, record) if file_content else None
+                    resolved = cached is not None and self.write_file_content(record.path, cached)
+                    if resolved:
+                        resolved_files.append(record.path)
+                    finish(record, kind, strategy, rule, resolved, start=start,
+                           detail=None if resolved else "not in the resolution cache")
+                elif strategy == 'ai' and record.is_text_conflict and self.gemini_api_key:
+                    ai_records[record.path] = (record, kind, rule)
+                elif strategy == 'fail':
+                    finish(record, kind, strategy, rule, False, detail="the policy requires manual resolution")
+                elif strategy == 'ai' and record.is_text_conflict:
+                    finish(record, kind, strategy, rule, False, detail="no Gemini API key")
+                else:
+                    finish(record, kind, strategy, rule, False, detail=f"does not apply to {kind} conflicts")
+            
+            if ai_records:
+                start = time.perf_counter()
+                file_contents = {}
+                for file_path in ai_records:
+                    file_content = self.get_file_content(file_path)
+                    if file_content:
+                        file_contents[file_path] = file_content
+                ai_resolved = set(self.resolve_files_with_ai(file_contents, {p: r[0] for p, r in ai_records.items()}))
+                for file_path, (record, kind, rule) in ai_records.items():
+                    finish(record, kind, 'ai', rule, file_path in ai_resolved, start=start)
+        
+        if success and self.add_files(resolved_files) is None:
+            success = False
+        return success
+    
+    def _take_side(self, record, side):
+        """Resolve a conflict by taking 'ours' or 'theirs' whole from the index; a missing side deletes the file"""
+        entry = getattr(record, side)
+        if entry is None:
+            return self._remove_working_file(record.path)
+        load_blobs(self.backend, [record])
+        content = entry.content
+        if record.kind == 'mode':
+            # The side whose content differs from the base carries the content change
+            content = (record.theirs if record.ours.oid == record.base.oid else record.ours).content
+        if not self.write_file_bytes(record.path, content):
+            return False
+        os.chmod(os.path.join(self.repo_path, record.path), 0o755 if entry.mode == '100755' else 0o644)
+        return True
+    
+    def _merge_in_working_tree(self, branch, use_ai, label=None):
+        """Merge a branch into HEAD in the working tree, resolving any conflicts.
+        
+        label describes what is merged in the commit message (default: the branch).
+        Returns (success, result description).
+        """
+        label = label or f"branch '{branch}'"
+        self.last_resolutions = {}
+        merge_result = self.merge_branch(branch)
+        
+        if merge_result is not None:
+            # Successful merge without conflicts
+            self.commit_changes(f"Merge {label} without conflicts")
+            return True, "Merged successfully without conflicts"
+        
+        records = self.get_conflict_index()
+        if not records:
+            print("Unexpected error during merge.")
+            self.abort_merge()
+            return False, "Failed to merge"
+        
+        print(f"Conflicts detected in {len(records)} files:")
+        for record in records:
+            print(f"  - {record.path} ({record.kind})")
+        
+        if self._resolve_conflicts(records, use_ai, label):
+            if self.commit_changes(f"Merge {label} with resolved conflicts"):
+                return True, "Merged with resolved conflicts"
+        
+        self.abort_merge()
+        return False, "Failed to resolve conflicts"
+    
+    def _merge_in_memory(self, branches, base_commit, temp_branch, use_ai, dry_run):
+        """Chain merges with merge-tree/commit-tree, only touching the working tree when needed.
+        
+        Clean merges never leave the object database. In a dry run conflicting branches are
+        reported and skipped; otherwise they are resolved on a detached checkout of the merge
+        chain so far. Returns (merge_results, success, final_commit).
+        """
+        commits = self.resolve_commits(branches)
+        current = base_commit
+        merge_results = {}
+        success = True
+        
+        for branch, branch_commit in zip(branches, commits):
+            print(f"\nMerging branch: {branch}")
+            with span("merge", 'merge', branch=branch, in_memory=True) as trace:
+                ok, merge_results[branch], current = self._merge_branch_in_memory(
+                    branch, branch_commit, current, use_ai, dry_run
+                )
+                trace.set(result=merge_results[branch])
+            success = success and ok
+        
+        if not dry_run:
+            self._run_git_command(['checkout', '-B', temp_branch, current], capture_output=False)
+        
+        return merge_results, success, current
+    
+    def _merge_branch_in_memory(self, branch, branch_commit, current, use_ai, dry_run, label=None):
+        """Merge one branch onto the commit current. Returns (success, result description, new current commit)"""
+        label = label or f"branch '{branch}'"
+        self.last_resolutions = {}
+        if not dry_run:
+            step = self._journaled_step(branch, current, [branch_commit])
+            if step:
+                return True, step['result'], step['commit']
+        
+        merged = self.merge_tree(current, branch_commit)
+        if merged is None:
+            return False, "Failed to merge", current
+        
+        tree, conflict_files = merged
+        if not conflict_files:
+            commit = self.commit_tree(tree, [current, branch_commit], f"Merge {label} without conflicts")
+            if commit:
+                result = "Merged successfully without conflicts"
+                if not dry_run:
+                    self._record_step(branch, current, [branch_commit], commit, result)
+                return True, result, commit
+            return False, "Failed to merge", current
+        
+        print(f"Conflicts detected in {len(conflict_files)} files:")
+        for file_path in conflict_files:
+            print(f"  - {file_path}")
+        
+        if dry_run:
+            return False, f"Would conflict in {', '.join(conflict_files)}", current
+        
+        if not self._run_git_command(['checkout', '--quiet', '--detach', current], capture_output=False):
+            return False, "Failed to merge", current
+        
+        ok, result = self._merge_in_working_tree(branch_commit, use_ai, label)
+        if ok:
+            commit = self._run_git_command(['rev-parse', 'HEAD'])
+            if commit:
+                self._record_step(branch, current, [branch_commit], commit, result, self.last_resolutions)
+                current = commit
+        return ok, result, current
+    
+    def _journaled_step(self, branch, parent, merged):
+        """The previous run's result of merging the commits merged onto parent, if it can be reused"""
+        step = self.journal.lookup(parent, merged) if self.journal else None
+        # The result may have been garbage collected if its temp branch was deleted
+        if step is None or self.resolve_commits([step['commit']])[0] != step['commit']:
+            return None
+        self.journal.reuse(step)
+        print(f"Reusing the journaled merge of {branch} ({step['commit'][:12]})")
+        return step
+    
+    def _record_step(self, branch, parent, merged, commit, result, resolutions=None):
+        """Write a committed merge step to the journal of the running merge"""
+        if self.journal:
+            self.journal.record(branch, parent, merged, commit, result, resolutions)
+    
+    def _fork(self, repo_path, label):
+        """A GitHelper for another worktree of the same repository.
+        
+        The fork shares the Gemini model, the resolution cache, the AI memo and the
+        prompt lock, but has its own git backend and token counters.
+        """
+        helper = copy.copy(self)
+        helper.repo_path = repo_path
+        helper.backend = SubprocessBackend(repo_path)
+        helper.ai_prompt_tokens = 0
+        helper.ai_tokens_saved = 0
+        helper.merge_label = label
+        return helper
+    
+    def _merge_in_worktree(self, branch, worktree, use_ai):
+        """Merge a branch in its own worktree. Returns (success, result description, merge commit, helper)"""
+        helper = self._fork(worktree, branch)
+        try:
+            with span("merge", 'merge', branch=branch, worktree=worktree) as trace:
+                ok, result = helper._merge_in_working_tree(branch, use_ai)
+                trace.set(result=result)
+            commit = helper._run_git_command(['rev-parse', 'HEAD']) if ok else None
+            return ok and commit is not None, result, commit, helper
+        finally:
+            helper.backend.close()
+    
+    def _merge_in_parallel(self, branches, base_commit, temp_branch, use_ai, jobs=None):
+        """Merge every branch into the base in its own worktree concurrently, then combine the results.
+        
+        Each branch gets a detached worktree at the base commit, where it is merged and its
+        conflicts resolved (by the AI, or by the user one prompt at a time) while the other
+        merges proceed. The resulting merge commits are then chained onto the temp branch with
+        merge-tree, so only conflicts between branches have to be resolved again. The
+        worktrees are always removed. Returns (merge_results, success, final_commit).
+        """
+        commits = dict(zip(branches, self.resolve_commits(branches)))
+        root = tempfile.mkdtemp(prefix='githelper-worktrees-')
+        worktrees = {}
+        merge_results = {}
+        merge_commits = {}
+        try:
+            for i, branch in enumerate(branches):
+                step = self._journaled_step(branch, base_commit, [commits[branch]])
+                if step:
+                    merge_results[branch] = step['result']
+                    merge_commits[branch] = step['commit']
+                    continue
+                path = os.path.join(root, f"{i}-{re.sub(r'[^A-Za-z0-9._-]', '_', branch)}")
+                if self._run_git_command(['worktree', 'add', '--quiet', '--detach', path, base_commit]) is None:
+                    merge_results[branch] = "Failed to create worktree"
+                    continue
+                worktrees[branch] = path
+            
+            if worktrees:
+                print(f"\nMerging {len(worktrees)} branches in parallel worktrees...")
+            # Load the cache before the forks start so every fork shares the same object
+            self.get_resolution_cache()
+            with ThreadPoolExecutor(max_workers=jobs or len(worktrees) or 1) as executor:
+                futures = {executor.submit(self._merge_in_worktree, branch, path, use_ai): branch
+                           for branch, path in worktrees.items()}
+                for future in as_completed(futures):
+                    branch = futures[future]
+                    ok, merge_results[branch], commit, helper = future.result()
+                    self.backend.process_count += helper.backend.process_count
+                    with self._ai_stats_lock:
+                        self.ai_prompt_tokens += helper.ai_prompt_tokens
+                        self.ai_tokens_saved += helper.ai_tokens_saved
+                    print(f"[{branch}] {merge_results[branch]}")
+                    if ok:
+                        merge_commits[branch] = commit
+                        self._record_step(branch, base_commit, [commits[branch]], commit, merge_results[branch],
+                                          helper.last_resolutions)
+        finally:
+            for path in worktrees.values():
+                self._run_git_command(['worktree', 'remove', '--force', path])
+            self._run_git_command(['worktree', 'prune'])
+            shutil.rmtree(root, ignore_errors=True)
+        
+        # Chain the per-branch merge commits; the first one already sits on top of the base
+        success = len(merge_commits) == len(branches)
+        current = base_commit
+        for branch in branches:
+            if branch not in merge_commits:
+                continue
+            if current == base_commit:
+                current = merge_commits[branch]
+                continue
+            print(f"\nCombining parallel merge of {branch}")
+            with span("combine", 'merge', branch=branch) as trace:
+                ok, result, current = self._merge_branch_in_memory(
+                    branch, merge_commits[branch], current, use_ai, False,
+                    label=f"branch '{branch}' (parallel merge)"
+                )
+                trace.set(result=result)
+            if not ok:
+                merge_results[branch] = f"Merged in its worktree, but combining failed: {result}"
+                success = False
+            elif result != "Merged successfully without conflicts":
+                # Conflicts with the branches combined before it were resolved here, not in the worktree
+                merge_results[branch] = result
+        
+        self._run_git_command(['checkout', '-B', temp_branch, current], capture_output=False)
+        return merge_results, success, current
+    
+    def _merge_in_temp_branch(self, branches, disjoint, base_commit, temp_branch, use_ai):
+        """Merge the branches one at a time on a temp branch in the working tree.
+        
+        Fully disjoint branches go in first, together in one octopus merge when possible.
+        Journaled steps are reused without touching the working tree, and the temp branch is
+        only checked out where the first merge has to be redone. Returns (merge_results,
+        success, final_commit), or (None, False, None) if the temp branch can't be created.
+        """
+        commits = dict(zip(branches, self.resolve_commits(branches)))
+        merge_results = {}
+        success = True
+        current = base_commit
+        checked_out = None
+        
+        def check_out_temp_branch():
+            nonlocal checked_out
+            if checked_out != current:
+                if not self.create_temp_branch(current, temp_branch):
+                    return False
+                if checked_out is None:
+                    print(f"Created temporary branch: {temp_branch}")
+                checked_out = current
+            return True
+        
+        # Fully disjoint branches can usually go in together as one octopus merge
+        if len(disjoint) > 1:
+            disjoint_commits = [commits[b] for b in disjoint]
+            step = self._journaled_step(', '.join(disjoint), current, disjoint_commits)
+            if step:
+                current = step['commit']
+            else:
+                if not check_out_temp_branch():
+                    return None, False, None
+                print(f"\nOctopus merging disjoint branches: {', '.join(disjoint)}")
+                with span("octopus merge", 'merge', branches=', '.join(disjoint)):
+                    merged = self.octopus_merge(disjoint) and self.resolve_commits(['HEAD'])[0]
+                if merged:
+                    self._record_step(', '.join(disjoint), current, disjoint_commits, merged,
+                                      "Merged successfully in octopus merge")
+                    current = checked_out = merged
+            if current != base_commit:
+                for branch in disjoint:
+                    merge_results[branch] = "Merged successfully in octopus merge"
+                branches = [b for b in branches if b not in disjoint]
+            else:
+                print("Octopus merge failed. Merging these branches one at a time.")
+        
+        # Try to merge each branch
+        for branch in branches:
+            step = self._journaled_step(branch, current, [commits[branch]])
+            if step:
+                merge_results[branch] = step['result']
+                current = step['commit']
+                continue
+            if not check_out_temp_branch():
+                return None, False, None
+            print(f"\nMerging branch: {branch}")
+            with span("merge", 'merge', branch=branch) as trace:
+                ok, merge_results[branch] = self._merge_in_working_tree(branch, use_ai)
+                trace.set(result=merge_results[branch])
+            commit = self.resolve_commits(['HEAD'])[0] if ok else None
+            if commit:
+                self._record_step(branch, current, [commits[branch]], commit, merge_results[branch],
+                                  self.last_resolutions)
+                current = checked_out = commit
+            success = success and ok
+        
+        if not check_out_temp_branch():
+            return None, False, None
+        return merge_results, success, current
+    
+    def multi_branch_merge(self, branches, base_branch=None, use_ai=False, in_memory=False, dry_run=False,
+                           order='given', parallel=False, jobs=None, resume=False):
+        """Merge multiple branches together and resolve conflicts
+        
+        With in_memory, merges are computed with `git merge-tree` and the working tree is only
+        touched for conflicts and the final checkout. dry_run predicts the result without
+        changing any branch or file. order='auto' reorders the branches to minimize conflicts
+        and merges fully disjoint branches with one octopus merge. parallel merges every
+        branch into the base in its own worktree at the same time (at most jobs at once)
+        and then combines the results.
+        
+        Every committed merge step is written to a journal in .git/githelper. With resume,
+        steps of the previous run of the same merge whose base and branch commits are
+        unchanged are reused instead of merged again, and its temp branch is reused.
+        """
         if not branches or len(branches) < 2:
             print("Please provide at least two branches to merge.")
             return False
@@ -222,77 +1218,89 @@ class GitHelper:
         print(f"Base branch: {base_branch}")
         print(f"Branches to merge: {', '.join(branches)}")
         
-        # Create a temporary branch for the merge
-        temp_branch = f"temp_merge_{os.getpid()}"
-        if not self.create_temp_branch(base_branch, temp_branch):
-            print(f"Failed to create temporary branch {temp_branch}.")
+        missing = self.find_missing_revisions([base_branch] + list(branches))
+        if missing:
+            print(f"Unknown branches: {', '.join(missing)}")
             return False
         
-        print(f"Created temporary branch: {temp_branch}")
+        # A long-lived process such as the helper daemon merges many times under one PID
+        temp_branch = f"temp_merge_{os.getpid()}"
+        taken = 0
+        while self.resolve_commits([f"refs/heads/{temp_branch}"])[0]:
+            taken += 1
+            temp_branch = f"temp_merge_{os.getpid()}_{taken}"
+        self.journal = None
+        state_dir = None if dry_run else self.get_state_dir()
+        if state_dir:
+            self.journal = MergeJournal(journal_path(state_dir, base_branch, branches),
+                                        base_branch, branches, temp_branch, resume)
+            temp_branch = self.journal.temp_branch
+            if resume:
+                print(f"Resuming into {temp_branch} ({self.journal.resumable_steps} journaled merges)")
+                # An interrupted run may have left a merge in progress; only abort one it started
+                if self.resolve_commits(['MERGE_HEAD'])[0]:
+                    head = self.resolve_commits(['HEAD'])[0]
+                    if self.get_current_branch() != temp_branch and not self.journal.knows_commit(head):
+                        print("A merge that the journaled run did not start is in progress. "
+                              "Finish it with 'git commit' or run 'git merge --abort', then resume.")
+                        return False
+                    self.abort_merge()
+        branches = [b for b in branches if b != base_branch and b != temp_branch]
         
-        merge_results = {}
-        success = True
+        disjoint = []
+        if order == 'auto':
+            plan = self.plan_merge_order(base_branch, branches)
+            if plan is None:
+                print("Failed to compute the merge order.")
+                return False
+            print(format_merge_plan(plan))
+            branches = plan['order']
+            disjoint = plan['disjoint']
         
-        # Try to merge each branch
-        for branch in branches:
-            if branch == base_branch or branch == temp_branch:
-                continue
-                
-            print(f"\nMerging branch: {branch}")
-            merge_result = self.merge_branch(branch)
-            
-            if merge_result is None:  # Merge conflict
-                conflict_files = self.get_merge_conflicts()
-                if conflict_files:
-                    print(f"Conflicts detected in {len(conflict_files)} files:")
-                    for file_path in conflict_files:
-                        print(f"  - {file_path}")
-                        
-                    # Resolve conflicts
-                    for file_path in conflict_files:
-                        file_content = self.get_file_content(file_path)
-                        if file_content:
-                            if use_ai and self.gemini_api_key:
-                                print(f"Using AI to resolve conflicts in {file_path}...")
-                                resolved_content = self.resolve_conflict_with_ai(file_path, file_content)
-                                if resolved_content:
-                                    print(f"AI successfully resolved conflicts in {file_path}")
-                                else:
-                                    print(f"AI failed to resolve conflicts. Falling back to manual resolution.")
-                                    resolved_content = self.resolve_conflict_manually(file_path, file_content)
-                            else:
-                                resolved_content = self.resolve_conflict_manually(file_path, file_content)
-                            
-                            if resolved_content and self.write_file_content(file_path, resolved_content):
-                                self.add_file(file_path)
-                                print(f"Resolved conflicts in {file_path}")
-                            else:
-                                print(f"Failed to resolve conflicts in {file_path}")
-                                success = False
-                    
-                    # Commit the resolved conflicts
-                    if success:
-                        self.commit_changes(f"Merge branch '{branch}' with resolved conflicts")
-                        merge_results[branch] = "Merged with resolved conflicts"
-                    else:
-                        self.abort_merge()
-                        merge_results[branch] = "Failed to resolve conflicts"
-                else:
-                    print("Unexpected error during merge.")
-                    self.abort_merge()
-                    merge_results[branch] = "Failed to merge"
-                    success = False
-            else:
-                # Successful merge without conflicts
-                self.commit_changes(f"Merge branch '{branch}' without conflicts")
-                merge_results[branch] = "Merged successfully without conflicts"
+        base_commit = self.resolve_commits([base_branch])[0]
+        if parallel and not dry_run:
+            merge_results, success, final_commit = self._merge_in_parallel(
+                branches, base_commit, temp_branch, use_ai, jobs
+            )
+        elif in_memory or dry_run:
+            merge_results, success, final_commit = self._merge_in_memory(
+                branches, base_commit, temp_branch, use_ai, dry_run
+            )
+        else:
+            merge_results, success, final_commit = self._merge_in_temp_branch(
+                branches, disjoint, base_commit, temp_branch, use_ai
+            )
+            if merge_results is None:
+                print(f"Failed to create temporary branch {temp_branch}.")
+                return False
+        
+        if self.journal and self.journal.reused:
+            print(f"\nReused {self.journal.reused} merges from the journal of the previous run.")
+        
+        self.last_merge = {'temp_branch': temp_branch, 'commit': final_commit, 'results': merge_results}
         
         # Print merge summary
         print("\nMerge Summary:")
         for branch, result in merge_results.items():
             print(f"{branch}: {result}")
+        print(f"Git processes spawned: {self.backend.process_count}")
+        if self.ai_prompt_tokens:
+            saved = f" (saved ~{self.ai_tokens_saved} with hunk mode)" if self.ai_tokens_saved else ""
+            print(f"AI prompt tokens sent: ~{self.ai_prompt_tokens}{saved}")
+        if self.resolution_policy:
+            policy_stats = self.resolution_policy.report.summary()
+            print(f"Policy resolved {policy_stats['resolved']}/{policy_stats['files']} conflicted files "
+                  f"({policy_stats['hunks']} hunks at {policy_stats['hunks_per_second']:.0f} hunks/s)")
+        if self.ai_memo:
+            memo_stats = self.ai_memo.stats()
+            if memo_stats['hits']:
+                print(f"AI answers reused from the memo: {memo_stats['hits']}")
+        self.backend.close()
         
-        if success:
+        if dry_run:
+            print(f"\nDry run complete. No branches or files were changed.")
+            print(f"The merged result of the clean branches is commit {final_commit}.")
+        elif success:
             print(f"\nAll branches successfully merged into {temp_branch}.")
             print(f"You can now checkout to {temp_branch} to review the changes.")
             print(f"If satisfied, you can merge {temp_branch} back to {base_branch} with:")
@@ -305,7 +1313,8 @@ class GitHelper:
         
         return success
 
-def main():
+def main(argv=None, make_helper=GitHelper):
+    """Run the git_helper CLI; make_helper creates every GitHelper (the helper daemon passes warm ones)"""
     parser = argparse.ArgumentParser(description='Git Helper - A tool to help with Git operations')
     subparsers = parser.add_subparsers(dest='command', help='Command to run')
     
@@ -314,21 +1323,210 @@ def main():
     merge_parser.add_argument('branches', nargs='+', help='Branches to merge')
     merge_parser.add_argument('--base', '-b', help='Base branch to merge into (default: current branch)')
     merge_parser.add_argument('--ai', action='store_true', help='Use AI to resolve conflicts')
+    merge_parser.add_argument('--ai-concurrency', type=int, default=4, help='Number of files resolved by AI at the same time')
+    merge_parser.add_argument('--ai-rate-limit', type=float, help='Maximum AI requests per second')
+    merge_parser.add_argument('--ai-retries', type=int, default=3, help='Retries per file when an AI request fails')
+    merge_parser.add_argument('--ai-timeout', type=float, default=120, help='Timeout in seconds for each AI request')
+    merge_parser.add_argument('--ai-mode', choices=['file', 'hunk'], default='file',
+                              help='Send whole conflicted files to the AI, or only each conflict hunk with some context')
+    merge_parser.add_argument('--context-lines', type=int, default=3,
+                              help='Lines of context sent around each hunk in --ai-mode hunk')
+    merge_parser.add_argument('--ai-stream', action='store_true',
+                              help='Print each AI resolution as it is generated (resolves one file at a time)')
+    merge_parser.add_argument('--ai-memo', action='store_true',
+                              help='Reuse Gemini answers to identical prompts from an on-disk memo')
+    merge_parser.add_argument('--ai-memo-ttl', type=float, default=DEFAULT_MEMO_TTL,
+                              help='Seconds a memoized Gemini answer stays valid (default: 7 days)')
+    merge_parser.add_argument('--no-resolution-cache', action='store_true',
+                              help='Neither reuse nor remember conflict resolutions')
+    merge_parser.add_argument('--verify-cache', action='store_true',
+                              help='Show each cached resolution and ask before applying it')
+    merge_parser.add_argument('--in-memory', action='store_true',
+                              help='Compute merges with git merge-tree and only touch the working tree for conflicts')
+    merge_parser.add_argument('--parallel', action='store_true',
+                              help='Merge each branch into the base in its own git worktree concurrently, then combine the results')
+    merge_parser.add_argument('--jobs', '-j', type=int,
+                              help='Maximum number of parallel merges (default: one per branch)')
+    merge_parser.add_argument('--dry-run', action='store_true',
+                              help='Predict the merge result and conflicts without changing any branch or file')
+    merge_parser.add_argument('--order', choices=['given', 'auto'], default='given',
+                              help='Merge in the given order, or pick the order that minimizes conflicts')
+    merge_parser.add_argument('--policy', metavar='FILE',
+                              help='Resolve every conflict as a JSON policy file says, without prompting (for CI)')
+    merge_parser.add_argument('--report', metavar='FILE',
+                              help='Write a JSON report of what --policy did to each conflicted file')
+    merge_parser.add_argument('--resume', action='store_true',
+                              help='Reuse the merges of the previous run of the same merge whose base and branch are unchanged')
+    
+    # Multi-repository merge command
+    repos_parser = subparsers.add_parser('merge-multi-repos',
+                                         help='Run merge-multi in many repositories at once from a manifest')
+    repos_parser.add_argument('manifest', help='JSON manifest of repository paths and the branches to merge in each')
+    repos_parser.add_argument('--jobs', '-j', type=int, help='Number of repositories merged at once (default: CPU count)')
+    repos_parser.add_argument('--prompts', choices=PROMPT_MODES, default='defer',
+                              help='Leave conflicts that need a person unresolved (defer), or ask them here one at a time (queue)')
+    repos_parser.add_argument('--ai', action='store_true', help='Use AI to resolve conflicts')
+    repos_parser.add_argument('--ai-mode', choices=['file', 'hunk'], default='file',
+                              help='Send whole conflicted files to the AI, or only each conflict hunk with some context')
+    repos_parser.add_argument('--ai-concurrency', type=int, default=4, help='Files resolved by AI at the same time per repository')
+    repos_parser.add_argument('--policy', metavar='FILE', help='Resolve conflicts as a JSON policy file says')
+    repos_parser.add_argument('--in-memory', action='store_true',
+                              help='Compute merges with git merge-tree and only touch the working tree for conflicts')
+    repos_parser.add_argument('--order', choices=['given', 'auto'], default='given',
+                              help='Merge in the given order, or pick the order that minimizes conflicts')
+    repos_parser.add_argument('--resume', action='store_true',
+                              help='Reuse the journaled merges of the previous run in every repository')
+    repos_parser.add_argument('--report', metavar='FILE', help='Write a JSON summary of every repository')
+    
+    # Pairwise conflict prediction command
+    matrix_parser = subparsers.add_parser('conflict-matrix', help='Predict which pairs of branches conflict')
+    matrix_parser.add_argument('branches', nargs='+', help='Branches to compare')
+    matrix_parser.add_argument('--base', '-b', help='Base branch to include in the matrix (default: current branch)')
+    matrix_parser.add_argument('--format', choices=['table', 'json'], default='table', help='Output format')
+    matrix_parser.add_argument('--jobs', '-j', type=int, help='Number of worker processes (default: CPU count)')
+    matrix_parser.add_argument('--no-cache', action='store_true', help='Recompute every pair instead of using cached results')
+    
+    # Branch inventory command
+    branches_parser = subparsers.add_parser('branches', help='List branches with ahead/behind counts and last commits')
+    branches_parser.add_argument('--base', '-b', help='Branch to count ahead/behind against (default: current branch)')
+    branches_parser.add_argument('--remotes', '-r', action='store_true', help='Include remote-tracking branches')
+    branches_parser.add_argument('--pattern', help='Only branches whose name matches this glob')
+    merged_group = branches_parser.add_mutually_exclusive_group()
+    merged_group.add_argument('--merged', action='store_const', const=True, dest='merged',
+                              help='Only branches already merged into the base')
+    merged_group.add_argument('--no-merged', action='store_const', const=False, dest='merged',
+                              help='Only branches not merged into the base yet')
+    branches_parser.add_argument('--sort', choices=SORT_KEYS, default='date', help='Sort order (default: newest first)')
+    branches_parser.add_argument('--limit', '-n', type=int, help='Show at most this many branches')
+    branches_parser.add_argument('--changes', action='store_true',
+                                 help='Also count files and lines changed since the merge base')
+    branches_parser.add_argument('--format', choices=['table', 'json'], default='table', help='Output format')
+    
+    # Resolution cache command
+    cache_parser = subparsers.add_parser('cache-stats', help='Show statistics of the conflict resolution cache')
+    cache_parser.add_argument('--clear', action='store_true', help='Remove every cached resolution')
     
-    args = parser.parse_args()
+    parser.add_argument('--trace', metavar='FILE',
+                        help='Record git, Gemini and merge-step timings as Chrome trace-event JSON')
+    parser.add_argument('--metrics', metavar='FILE',
+                        help='Write a Prometheus text snapshot of the recorded timings')
+    parser.add_argument('--profile-startup', action='store_true',
+                        help='Report import time per module and fail if startup exceeds the budget')
+    parser.add_argument('--startup-budget', type=float, default=DEFAULT_STARTUP_BUDGET_MS,
+                        help=f'Startup budget in milliseconds for --profile-startup (default: {DEFAULT_STARTUP_BUDGET_MS})')
     
+    args = parser.parse_args(argv)
+    
+    if args.profile_startup:
+        sys.exit(profile_startup('git_helper', args.startup_budget))
+    if args.trace or args.metrics:
+        tracing.enable()
+    try:
+        run_command(parser, args, make_helper)
+    finally:
+        if args.trace:
+            tracing.write_chrome_trace(args.trace)
+        if args.metrics:
+            tracing.write_prometheus(args.metrics)
+
+def run_command(parser, args, make_helper=GitHelper):
+    """Run the parsed git_helper subcommand"""
     if args.command == 'merge-multi':
+        policy = None
+        if args.policy:
+            if args.verify_cache:
+                parser.error("--verify-cache asks before applying resolutions and cannot be used with --policy")
+            try:
+                policy = ResolutionPolicy.load(args.policy)
+            except (OSError, ValueError) as e:
+                parser.error(f"invalid policy file {args.policy}: {e}")
+        elif args.report:
+            parser.error("--report requires --policy")
+        
         # Try to load API keys from config
         api_keys = load_api_keys()
         gemini_key = None
         
         if api_keys and 'GEMINI_API_KEY' in api_keys:
             gemini_key = api_keys['GEMINI_API_KEY']
-        elif args.ai:
+        elif args.ai and not policy:
+            gemini_key = input("Enter your Gemini API Key: ").strip()
+        
+        git_helper = make_helper(gemini_api_key=gemini_key, ai_concurrency=args.ai_concurrency,
+                                 ai_rate_limit=args.ai_rate_limit, ai_retries=args.ai_retries,
+                                 ai_timeout=args.ai_timeout, ai_mode=args.ai_mode,
+                                 ai_context_lines=args.context_lines,
+                                 use_resolution_cache=not args.no_resolution_cache,
+                                 verify_cached=args.verify_cache, ai_stream=args.ai_stream,
+                                 ai_memo=GeminiMemo(ttl=args.ai_memo_ttl) if args.ai_memo else None,
+                                 resolution_policy=policy)
+        success = git_helper.multi_branch_merge(args.branches, args.base, args.ai,
+                                                in_memory=args.in_memory, dry_run=args.dry_run,
+                                                order=args.order, parallel=args.parallel, jobs=args.jobs,
+                                                resume=args.resume)
+        if policy and args.report:
+            policy.report.write(args.report, policy.source)
+        if policy and not success:
+            sys.exit(1)
+    elif args.command == 'merge-multi-repos':
+        try:
+            repos = load_manifest(args.manifest)
+            policy = ResolutionPolicy.load(args.policy) if args.policy else None
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+        
+        api_keys = load_api_keys()
+        gemini_key = api_keys.get('GEMINI_API_KEY') if api_keys else None
+        if args.ai and not gemini_key:
             gemini_key = input("Enter your Gemini API Key: ").strip()
         
-        git_helper = GitHelper(gemini_api_key=gemini_key)
-        git_helper.multi_branch_merge(args.branches, args.base, args.ai)
+        options = {
+            'gemini_api_key': gemini_key,
+            'use_ai': args.ai,
+            'policy': {'rules': policy.rules, 'default': policy.default, 'source': policy.source} if policy else None,
+            'helper': {'ai_mode': args.ai_mode, 'ai_concurrency': args.ai_concurrency},
+            'merge': {'in_memory': args.in_memory, 'order': args.order, 'resume': args.resume},
+        }
+        start = time.perf_counter()
+        summaries = merge_repos(repos, options, jobs=args.jobs, prompt_mode=args.prompts)
+        wall_seconds = time.perf_counter() - start
+        print(format_repo_summary(summaries, wall_seconds))
+        if args.report:
+            with open(args.report, 'w') as f:
+                json.dump({'manifest': os.path.abspath(args.manifest), 'wall_seconds': wall_seconds,
+                           'repos': summaries}, f, indent=2)
+                f.write('\n')
+        if any(summary['status'] != 'merged' for summary in summaries):
+            sys.exit(1)
+    elif args.command == 'conflict-matrix':
+        matrix = build_conflict_matrix(make_helper(), args.branches, args.base,
+                                       jobs=args.jobs, use_cache=not args.no_cache)
+        if matrix is None:
+            sys.exit(1)
+        print(format_matrix_json(matrix) if args.format == 'json' else format_matrix_table(matrix))
+        if matrix['errors']:
+            sys.exit(1)
+    elif args.command == 'branches':
+        inventory = make_helper().get_branch_inventory(
+            args.base, include_remotes=args.remotes, pattern=args.pattern, merged=args.merged,
+            sort=args.sort, limit=args.limit, with_changes=args.changes
+        )
+        if inventory is None:
+            sys.exit(1)
+        print(format_branch_json(inventory) if args.format == 'json' else format_branch_table(inventory))
+    elif args.command == 'cache-stats':
+        cache = make_helper().get_resolution_cache()
+        if cache is None:
+            sys.exit(1)
+        if args.clear:
+            cache.clear()
+            print("Resolution cache cleared.")
+        stats = cache.stats()
+        print(f"Entries: {stats['entries']}")
+        print(f"Size: {stats['bytes']} / {stats['max_bytes']} bytes")
+        print(f"Hits: {stats['hits']}, misses: {stats['misses']} (hit ratio {stats['hit_ratio']:.0%})")
+        for source, count in sorted(stats['sources'].items()):
+            print(f"  {source}: {count}")
     else:
         parser.print_help()
 
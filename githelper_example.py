@@ -4,6 +4,7 @@ Example script demonstrating how to use the GitHelper class programmatically.
 """
 
 from git_helper import GitHelper
+from branch_inventory import format_branch_table
 
 def example_merge_workflow():
     """
@@ -19,11 +20,12 @@ def example_merge_workflow():
     current_branch = git_helper.get_current_branch()
     print(f"Current branch: {current_branch}")
     
-    # Get all branches
-    all_branches = git_helper.get_all_branches()
+    # Get all branches with their last commit and how far they are ahead of/behind the current branch
+    pattern = input("Filter branches by name (glob, or press Enter for all): ").strip()
+    inventory = git_helper.get_branch_inventory(current_branch, pattern=pattern or None) or []
+    all_branches = [branch.name for branch in inventory]
     print("\nAvailable branches:")
-    for i, branch in enumerate(all_branches, 1):
-        print(f"{i}. {branch}")
+    print(format_branch_table(inventory, numbered=True))
     
     # Select branches to merge
     print("\nSelect branches to merge (comma-separated numbers, e.g., 1,3,4):")
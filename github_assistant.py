@@ -1,13 +1,75 @@
 import os
-import requests
-import google.generativeai as genai
-from app import main as get_api_keys
+import re
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from app import main as get_api_keys, load_api_keys
+from startup import lazy_import, profile_startup, DEFAULT_STARTUP_BUDGET_MS
+import tracing
+from github_client import GitHubClient, DEFAULT_API_URL, DEFAULT_PER_PAGE
+from http_cache import ResponseCache
+from repo_index import RepoIndex, SORT_ORDERS
+from gemini_memo import GeminiMemo, generate_text, DEFAULT_MEMO_TTL
+
+# The Gemini SDK and the HTTP stack are loaded on first use, not at startup
+requests = lazy_import('requests')
+genai = lazy_import('google.generativeai')
+
+GRAPHQL_BATCH_SIZE = 100  # repositories packed into one GraphQL query
+GRAPHQL_REPO_FIELDS = "name nameWithOwner description stargazerCount forkCount primaryLanguage { name } pushedAt"
+REPO_NAME_PATTERN = re.compile(r'[\w.-]+/[\w.-]+')
+
+def summarize_repo(repo):
+    """The repository fields reported by the batch mode, from a REST repository object"""
+    return {
+        'name': repo['name'],
+        'full_name': repo['full_name'],
+        'description': repo['description'],
+        'stargazers_count': repo['stargazers_count'],
+        'forks_count': repo['forks_count'],
+        'language': repo['language'],
+        'pushed_at': repo['pushed_at']
+    }
+
+def _summarize_graphql_repo(node):
+    return {
+        'name': node['name'],
+        'full_name': node['nameWithOwner'],
+        'description': node['description'],
+        'stargazers_count': node['stargazerCount'],
+        'forks_count': node['forkCount'],
+        'language': (node['primaryLanguage'] or {}).get('name'),
+        'pushed_at': node['pushedAt']
+    }
 
 class GitHubAssistant:
-    def __init__(self):
+    def __init__(self, github_api_url=None, per_page=DEFAULT_PER_PAGE, use_cache=True, cache_ttl=60, cache_path=None,
+                 pool_size=10, index_path=None, stream_gemini=True, gemini_memo=None):
         self.github_token = None
         self.gemini_key = None
-        self.github_api_url = "https://api.github.com"
+        self.github_api_url = github_api_url or os.environ.get("GITHUB_API_URL", DEFAULT_API_URL)
+        self.per_page = per_page
+        self.pool_size = pool_size
+        self.client = None
+        self._client_token = None
+        
+        # GitHub responses are cached on disk and revalidated with ETags after cache_ttl seconds
+        self.use_cache = use_cache
+        self.cache_ttl = cache_ttl
+        self.cache_path = cache_path
+        self.response_cache = None
+        
+        # Local repository index for offline search, opened on first use
+        self.index_path = index_path
+        self.repo_index = None
+        
+        # Gemini answers are streamed as they are generated; gemini_memo (a GeminiMemo) answers repeated questions
+        self.stream_gemini = stream_gemini
+        self.gemini_memo = gemini_memo
+        self.last_generation = None
+        self._model = None
         
     def setup_apis(self):
         print("\n=== GitHub & Gemini Assistant Setup ===")
@@ -15,59 +77,197 @@ class GitHubAssistant:
         api_keys = get_api_keys()
         if api_keys:
             self.github_token = api_keys.get("GITHUB_API_KEY")
-            self.gemini_key = api_keys.get("GEMINI_API_KEY")
-            
-            # Configure Gemini
-            genai.configure(api_key=self.gemini_key)
-            self.model = genai.GenerativeModel('gemini-pro')
+            # A long-lived assistant keeps its model while the key stays the same; the client checks its token itself
+            if api_keys.get("GEMINI_API_KEY") != self.gemini_key:
+                self.gemini_key = api_keys.get("GEMINI_API_KEY")
+                self.model = None  # configured with the new key on first question
             return True
         return False
 
-    def get_user_repos(self):
-        headers = {
-            "Authorization": f"token {self.github_token}",
-            "Accept": "application/vnd.github.v3+json"
-        }
-        
+    @property
+    def model(self):
+        """The Gemini model, configured and created on the first question"""
+        if self._model is None:
+            genai.configure(api_key=self.gemini_key)
+            self._model = genai.GenerativeModel('gemini-pro')
+        return self._model
+    
+    @model.setter
+    def model(self, model):
+        self._model = model
+
+    def get_client(self):
+        """The shared GitHub client, created on first use and again whenever the token changes"""
+        if self.client is None or self._client_token != self.github_token:
+            if self.use_cache and self.response_cache is None:
+                self.response_cache = ResponseCache(self.cache_path) if self.cache_path else ResponseCache()
+            self.client = GitHubClient(self.github_token, self.github_api_url, self.per_page, pool_size=self.pool_size,
+                                       cache=self.response_cache, cache_ttl=self.cache_ttl)
+            self._client_token = self.github_token
+        return self.client
+
+    def get_repo_index(self):
+        """The local repository index, opened on first use"""
+        if self.repo_index is None:
+            self.repo_index = RepoIndex(self.index_path) if self.index_path else RepoIndex()
+        return self.repo_index
+
+    def sync_repo_index(self, full=False):
+        """Pull repositories changed since the last sync into the local index"""
+        try:
+            return self.get_repo_index().sync(self.get_client(), full=full)
+        except requests.exceptions.RequestException as e:
+            print(f"Error syncing repository index: {e}")
+            return None
+
+    def search_repos(self, text=None, language=None, min_stars=None, sort='stars', limit=50):
+        """Search the local repository index without touching the network"""
+        return self.get_repo_index().search(text, language, min_stars, sort, limit)
+
+    def get_api_stats(self):
+        """Cache hit ratio, request counts and remaining GitHub quota"""
+        return self.get_client().stats()
+
+    def iter_user_repos(self, per_page=None):
+        """Yield every repository of the user, page by page as GitHub returns them"""
+        return self.get_client().paginate("/user/repos", per_page=per_page)
+
+    def get_user_repos(self, per_page=None):
+        repos = []
         try:
-            response = requests.get(f"{self.github_api_url}/user/repos", headers=headers)
-            response.raise_for_status()
-            repos = response.json()
-            
             print("\nYour Repositories:")
-            for idx, repo in enumerate(repos, 1):
+            for idx, repo in enumerate(self.iter_user_repos(per_page), 1):
                 print(f"{idx}. {repo['name']} - {repo['description'] or 'No description'}")
+                repos.append(repo)
             return repos
         except requests.exceptions.RequestException as e:
             print(f"Error fetching repositories: {e}")
             return None
 
     def get_repo_info(self, repo_name):
-        headers = {
-            "Authorization": f"token {self.github_token}",
-            "Accept": "application/vnd.github.v3+json"
-        }
-        
         try:
-            response = requests.get(
-                f"{self.github_api_url}/repos/{repo_name}",
-                headers=headers
-            )
-            response.raise_for_status()
-            return response.json()
+            repo_info = self.get_client().get_json(f"/repos/{repo_name}")
+            if self.repo_index is not None:
+                self.repo_index.upsert([repo_info])
+            return repo_info
         except requests.exceptions.RequestException as e:
             print(f"Error fetching repository info: {e}")
             return None
 
-    def ask_gemini(self, question):
+    def _fetch_repo_summary(self, repo_name):
+        return summarize_repo(self.get_client().get_json(f"/repos/{repo_name}"))
+
+    def _fetch_repo_batch_graphql(self, repo_names):
+        """Fetch up to GRAPHQL_BATCH_SIZE repositories with one aliased GraphQL query"""
+        aliases = {f"r{i}": name for i, name in enumerate(repo_names)}
+        fields = []
+        for alias, name in aliases.items():
+            owner, repo = name.split('/', 1)
+            # JSON string literals are valid GraphQL string literals
+            fields.append(f"{alias}: repository(owner: {json.dumps(owner)}, name: {json.dumps(repo)}) "
+                          f"{{ {GRAPHQL_REPO_FIELDS} }}")
+        response = self.get_client().graphql("query { " + " ".join(fields) + " }")
+
+        errors = {}
+        for error in response.get('errors') or []:
+            path = error.get('path') or []
+            if path:
+                errors[path[0]] = error.get('message', 'unknown error')
+        data = response.get('data') or {}
+        results = []
+        for alias, name in aliases.items():
+            node = data.get(alias)
+            if node:
+                results.append({'repo': name, 'info': _summarize_graphql_repo(node)})
+            else:
+                message = errors.get(alias) or (response.get('errors') or [{}])[0].get('message', 'not found')
+                results.append({'repo': name, 'error': message})
+        return results
+
+    def get_repos_info(self, repo_names, concurrency=8, use_graphql=False):
+        """Fetch details of many repositories, yielding results in completion order.
+
+        Each result is {'repo': name, 'info': {...}} or {'repo': name, 'error':
+        message}; a failing repository never aborts the batch. REST requests
+        run on a bounded thread pool over the shared pooled session; with
+        use_graphql, up to GRAPHQL_BATCH_SIZE repositories are packed into
+        each query instead.
+        """
+        valid = []
+        for name in dict.fromkeys(name.strip() for name in repo_names):
+            if not name:
+                continue
+            if REPO_NAME_PATTERN.fullmatch(name):
+                valid.append(name)
+            else:
+                yield {'repo': name, 'error': "invalid repository name (expected owner/repo)"}
+
+        self.get_client()  # create the shared client before the workers race to do it
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            if use_graphql:
+                futures = {
+                    executor.submit(self._fetch_repo_batch_graphql, batch): batch
+                    for batch in (valid[i:i + GRAPHQL_BATCH_SIZE] for i in range(0, len(valid), GRAPHQL_BATCH_SIZE))
+                }
+            else:
+                futures = {executor.submit(self._fetch_repo_summary, name): name for name in valid}
+
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+                    names = futures[future] if use_graphql else [futures[future]]
+                    for name in names:
+                        yield {'repo': name, 'error': str(e)}
+                    continue
+                if use_graphql:
+                    yield from result
+                else:
+                    yield {'repo': futures[future], 'info': result}
+
+    def ask_gemini(self, question, on_text=None):
+        """Ask Gemini a question; on_text receives the answer chunk by chunk while it streams"""
+        self.last_generation = None
         try:
-            response = self.model.generate_content(question)
-            return response.text
+            self.last_generation = generate_text(self.model, question, stream=self.stream_gemini,
+                                                 on_text=on_text, memo=self.gemini_memo)
+            return self.last_generation.text
         except Exception as e:
             return f"Error getting response from Gemini: {e}"
 
-def main():
-    assistant = GitHubAssistant()
+def run_repos_info(args, make_assistant=GitHubAssistant):
+    """Batch mode: read owner/repo names from a file or stdin and write JSONL results to stdout"""
+    # One pooled connection per request in flight
+    assistant = make_assistant(pool_size=max(10, args.concurrency))
+    assistant.github_token = os.environ.get("GITHUB_TOKEN") or (load_api_keys() or {}).get("GITHUB_API_KEY")
+    if args.graphql and not assistant.github_token:
+        print("The GraphQL API requires a GitHub token (set GITHUB_TOKEN or run the assistant setup)", file=sys.stderr)
+        return 1
+
+    if args.file == '-':
+        names = sys.stdin.read().splitlines()
+    else:
+        with open(args.file, 'r') as f:
+            names = f.read().splitlines()
+
+    start = time.time()
+    # A warm assistant from the helper daemon has already sent requests for earlier commands
+    requests_before = assistant.get_api_stats()['requests_sent']
+    ok = failed = 0
+    for result in assistant.get_repos_info(names, concurrency=args.concurrency, use_graphql=args.graphql):
+        print(json.dumps(result), flush=True)
+        if 'error' in result:
+            failed += 1
+        else:
+            ok += 1
+    print(f"Fetched {ok} repositories, {failed} failed in {time.time() - start:.1f}s "
+          f"({assistant.get_api_stats()['requests_sent'] - requests_before} requests)", file=sys.stderr)
+    return 1 if failed else 0
+
+def run_menu(args, make_assistant=GitHubAssistant):
+    """The interactive assistant menu"""
+    assistant = make_assistant(stream_gemini=not args.no_stream,
+                               gemini_memo=GeminiMemo(ttl=args.memo_ttl) if args.memoize else None)
     if not assistant.setup_apis():
         print("Failed to set up API keys. Exiting...")
         return
@@ -77,9 +277,12 @@ def main():
         print("1. List your repositories")
         print("2. Get repository details")
         print("3. Ask Gemini a question")
-        print("4. Exit")
+        print("4. Show API cache and rate-limit stats")
+        print("5. Sync local repository index")
+        print("6. Search repositories (offline)")
+        print("7. Exit")
         
-        choice = input("\nEnter your choice (1-4): ")
+        choice = input("\nEnter your choice (1-7): ")
         
         if choice == "1":
             assistant.get_user_repos()
@@ -97,16 +300,103 @@ def main():
         
         elif choice == "3":
             question = input("Enter your question for Gemini: ")
-            answer = assistant.ask_gemini(question)
             print("\nGemini's Response:")
-            print(answer)
+            answer = assistant.ask_gemini(question, on_text=lambda text: print(text, end="", flush=True))
+            generation = assistant.last_generation
+            if generation is None:
+                print(answer)
+            elif generation.cached:
+                print(f"\n(memoized answer, {generation.total_seconds * 1000:.0f} ms)")
+            else:
+                print(f"\n({generation.first_token_label()}, total {generation.total_seconds:.1f}s)")
         
         elif choice == "4":
+            stats = assistant.get_api_stats()
+            print("\nAPI Stats:")
+            print(f"Requests sent: {stats['requests_sent']}")
+            print(f"Cache hits: {stats['fresh_hits']} fresh, {stats['revalidated']} revalidated (304), "
+                  f"{stats['misses']} misses (hit ratio {stats['hit_ratio']:.0%})")
+            if stats['rate_limit_remaining'] is not None:
+                reset = time.strftime('%H:%M:%S', time.localtime(stats['rate_limit_reset']))
+                print(f"Rate limit remaining: {stats['rate_limit_remaining']} (resets at {reset})")
+            if 'cache' in stats:
+                print(f"Cache size: {stats['cache']['entries']} entries, {stats['cache']['bytes']} bytes")
+        
+        elif choice == "5":
+            full = input("Full resync? (y/N): ").strip().lower() == "y"
+            start = time.time()
+            result = assistant.sync_repo_index(full=full)
+            if result:
+                kind = "Full sync" if result['full'] else "Incremental sync"
+                print(f"{kind}: {result['fetched']} repositories fetched, "
+                      f"{result['total']} indexed ({time.time() - start:.1f}s)")
+        
+        elif choice == "6":
+            text = input("Search text (blank for all): ").strip()
+            language = input("Language (blank for any): ").strip() or None
+            min_stars = input("Minimum stars (blank for any): ").strip()
+            sort = input(f"Sort by ({'/'.join(SORT_ORDERS)}) [stars]: ").strip() or "stars"
+            if sort not in SORT_ORDERS or (min_stars and not min_stars.isdigit()):
+                print("Invalid search options.")
+                continue
+            start = time.perf_counter()
+            results = assistant.search_repos(text, language, int(min_stars) if min_stars else None, sort)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            print(f"\n{len(results)} repositories ({elapsed_ms:.1f} ms):")
+            for idx, repo in enumerate(results, 1):
+                print(f"{idx}. {repo['full_name']} - {repo['description'] or 'No description'} "
+                      f"[{repo['language'] or '-'}, {repo['stargazers_count']} stars, "
+                      f"{repo['forks_count']} forks, pushed {repo['pushed_at']}]")
+            if not results and not assistant.get_repo_index().stats()['repos']:
+                print("The index is empty; sync it first (option 5).")
+        
+        elif choice == "7":
             print("Goodbye!")
             break
         
         else:
             print("Invalid choice. Please try again.")
 
+def main(argv=None, make_assistant=GitHubAssistant):
+    """Run the assistant CLI; make_assistant creates the GitHubAssistant (the helper daemon passes warm ones)"""
+    parser = argparse.ArgumentParser(description="GitHub & Gemini Assistant")
+    subparsers = parser.add_subparsers(dest="command")
+    repos_info_parser = subparsers.add_parser("repos-info", help="Fetch details of many repositories as JSONL")
+    repos_info_parser.add_argument("file", nargs="?", default="-",
+                                   help="File with one owner/repo per line (default: stdin)")
+    repos_info_parser.add_argument("--graphql", action="store_true",
+                                   help=f"Pack up to {GRAPHQL_BATCH_SIZE} repositories into each GraphQL query")
+    repos_info_parser.add_argument("--concurrency", type=int, default=8,
+                                   help="Number of requests in flight at once (default: 8)")
+    parser.add_argument("--no-stream", action="store_true", help="Wait for complete Gemini answers instead of streaming")
+    parser.add_argument("--memoize", action="store_true", help="Reuse Gemini answers to repeated questions from disk")
+    parser.add_argument("--memo-ttl", type=float, default=DEFAULT_MEMO_TTL,
+                        help="Seconds a memoized Gemini answer stays valid (default: 7 days)")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="Record HTTP and Gemini call timings as Chrome trace-event JSON")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="Write a Prometheus text snapshot of the recorded timings")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Report import time per module and fail if startup exceeds the budget")
+    parser.add_argument("--startup-budget", type=float, default=DEFAULT_STARTUP_BUDGET_MS,
+                        help=f"Startup budget in milliseconds for --profile-startup (default: {DEFAULT_STARTUP_BUDGET_MS})")
+    args = parser.parse_args(argv)
+
+    if args.profile_startup:
+        sys.exit(profile_startup("github_assistant", args.startup_budget))
+    if args.trace or args.metrics:
+        tracing.enable()
+    try:
+        if args.command == "repos-info":
+            status = run_repos_info(args, make_assistant)
+        else:
+            status = run_menu(args, make_assistant)
+    finally:
+        if args.trace:
+            tracing.write_chrome_trace(args.trace)
+        if args.metrics:
+            tracing.write_prometheus(args.metrics, prefix="github_assistant")
+    sys.exit(status)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
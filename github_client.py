@@ -0,0 +1,202 @@
+"""
+Shared GitHub REST client for GitHubAssistant.
+
+One requests.Session is reused for every call, so connections are pooled
+and kept alive instead of paying for a TLS handshake per request. List
+endpoints are followed through their `Link: rel="next"` headers and
+yielded item by item as each page arrives. The API URL is configurable so
+the client can be pointed at a local stub server.
+
+With a ResponseCache attached, GET responses are served from the cache
+while fresh and revalidated with conditional requests afterwards. The
+`X-RateLimit-Remaining` / `X-RateLimit-Reset` headers of every response
+are tracked so requests are spread out before the quota runs dry instead
+of failing with 403s.
+"""
+
+import hashlib
+import sys
+import threading
+import time
+
+from startup import lazy_import
+from tracing import span
+
+# requests is only loaded once the first API call is made
+requests = lazy_import('requests')
+
+DEFAULT_API_URL = "https://api.github.com"
+DEFAULT_PER_PAGE = 100  # the maximum GitHub allows
+DEFAULT_RATE_LIMIT_RESERVE = 50
+
+
+class GitHubClient:
+    """GitHub REST client with connection pooling, keep-alive and Link-header pagination"""
+
+    def __init__(self, token=None, api_url=DEFAULT_API_URL, per_page=DEFAULT_PER_PAGE, pool_size=10, timeout=30,
+                 cache=None, cache_ttl=60, rate_limit_reserve=DEFAULT_RATE_LIMIT_RESERVE):
+        self.api_url = api_url.rstrip('/')
+        self.per_page = per_page
+        self.timeout = timeout
+        self.request_count = 0
+
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({"Accept": "application/vnd.github.v3+json"})
+        if token:
+            self.session.headers["Authorization"] = f"token {token}"
+
+        # Cache entries are namespaced per token so users never see each other's responses
+        self.cache = cache
+        self.cache_ttl = cache_ttl
+        self._cache_namespace = hashlib.sha256((token or '').encode('utf-8')).hexdigest()[:16]
+
+        self.rate_limit_reserve = rate_limit_reserve
+        self.rate_limit_remaining = None
+        self.rate_limit_reset = None
+        self._counters = {'fresh_hits': 0, 'revalidated': 0, 'misses': 0}
+        self._lock = threading.Lock()
+
+    @property
+    def account_id(self):
+        """Identifies the API endpoint and token this client talks to, without revealing the token"""
+        return f"{self.api_url} {self._cache_namespace}"
+
+    def _url(self, path):
+        return path if path.startswith(('http://', 'https://')) else f"{self.api_url}/{path.lstrip('/')}"
+
+    def _count(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _record_rate_limit(self, response):
+        remaining = response.headers.get('X-RateLimit-Remaining')
+        reset = response.headers.get('X-RateLimit-Reset')
+        if remaining is not None and reset is not None:
+            with self._lock:
+                self.rate_limit_remaining = int(remaining)
+                self.rate_limit_reset = int(reset)
+
+    def _throttle(self):
+        """Spread the remaining quota over the time left until it resets once it runs low"""
+        with self._lock:
+            remaining, reset = self.rate_limit_remaining, self.rate_limit_reset
+        if remaining is None or remaining > self.rate_limit_reserve:
+            return
+        wait = max(0.0, reset - time.time())
+        delay = wait if remaining <= 0 else wait / remaining
+        if delay > 1:
+            print(f"GitHub rate limit nearly exhausted ({remaining} left); waiting {delay:.0f}s...", file=sys.stderr)
+        time.sleep(delay)
+
+    def _cached_response(self, url, entry):
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response._content = entry['body']
+        response.headers = requests.structures.CaseInsensitiveDict()
+        if entry['link']:
+            response.headers['Link'] = entry['link']
+        return response
+
+    def get(self, path, params=None):
+        """GET an API path (or absolute URL) and return the response, raising on HTTP errors"""
+        url = requests.Request('GET', self._url(path), params=params).prepare().url
+        key = f"{self._cache_namespace} {url}"
+        with span('GET', 'http', url=url) as trace:
+            response = self._get(url, key, trace)
+            trace.set(status=response.status_code, bytes=len(response.content))
+            return response
+
+    def _get(self, url, key, trace):
+        entry = self.cache.get(key) if self.cache else None
+        if entry and time.time() - entry['fetched_at'] < self.cache_ttl:
+            self._count('fresh_hits')
+            trace.set(cache='fresh')
+            return self._cached_response(url, entry)
+
+        headers = {}
+        if entry and entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+
+        self._throttle()
+        with self._lock:
+            self.request_count += 1
+        response = self.session.get(url, headers=headers, timeout=self.timeout)
+        self._record_rate_limit(response)
+
+        if response.status_code == 304 and entry:
+            self._count('revalidated')
+            trace.set(cache='revalidated')
+            self.cache.touch(key)
+            return self._cached_response(url, entry)
+
+        trace.set(status=response.status_code)
+        response.raise_for_status()
+        self._count('misses')
+        if self.cache:
+            self.cache.put(
+                key, response.content,
+                etag=response.headers.get('ETag'),
+                last_modified=response.headers.get('Last-Modified'),
+                link=response.headers.get('Link')
+            )
+        return response
+
+    def get_json(self, path, params=None):
+        """GET an API path and return the decoded JSON body"""
+        return self.get(path, params).json()
+
+    def post_json(self, path, payload):
+        """POST a JSON payload (never cached) and return the decoded JSON body"""
+        self._throttle()
+        with self._lock:
+            self.request_count += 1
+        with span('POST', 'http', url=self._url(path)) as trace:
+            response = self.session.post(self._url(path), json=payload, timeout=self.timeout)
+            self._record_rate_limit(response)
+            trace.set(status=response.status_code, bytes=len(response.content))
+            response.raise_for_status()
+            return response.json()
+
+    def graphql(self, query):
+        """Run a GraphQL query and return the decoded response ({'data': ..., 'errors': ...})"""
+        # REST lives at /api/v3 on GitHub Enterprise, GraphQL next to it at /api/graphql
+        base = self.api_url[:-len('/v3')] if self.api_url.endswith('/v3') else self.api_url
+        return self.post_json(f"{base}/graphql", {'query': query})
+
+    def paginate(self, path, params=None, per_page=None):
+        """Yield the items of a list endpoint, following Link headers page by page"""
+        params = dict(params or {})
+        params['per_page'] = per_page or self.per_page
+        url = path
+        while url:
+            response = self.get(url, params)
+            yield from response.json()
+            url = response.links.get('next', {}).get('url')
+            params = None  # the next URL already carries the query string
+
+    def stats(self):
+        """Request counts, cache hit ratio and the remaining rate-limit quota"""
+        with self._lock:
+            counters = dict(self._counters)
+            remaining, reset = self.rate_limit_remaining, self.rate_limit_reset
+        lookups = sum(counters.values())
+        hits = counters['fresh_hits'] + counters['revalidated']
+        stats = {
+            'requests_sent': self.request_count,
+            **counters,
+            'hit_ratio': hits / lookups if lookups else 0.0,
+            'rate_limit_remaining': remaining,
+            'rate_limit_reset': reset
+        }
+        if self.cache:
+            stats['cache'] = self.cache.stats()
+        return stats
+
+    def close(self):
+        self.session.close()
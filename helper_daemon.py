@@ -0,0 +1,607 @@
+#!/usr/bin/env python3
+"""
+Long-lived helper daemon that keeps git_helper and github_assistant warm.
+
+Every CLI invocation pays for interpreter start-up, imports, loading API
+keys, `genai.configure` and new TLS connections again. `helper_daemon.py
+start` runs a background process that pays for them once and serves
+commands over a Unix domain socket. The protocol is JSON-RPC 2.0 with one
+JSON message per line:
+
+    -> {"jsonrpc": "2.0", "id": 1, "method": "run",
+        "params": {"program": "git_helper", "argv": ["branches"], "cwd": "/src/app", "env": {...}}}
+    <- {"jsonrpc": "2.0", "method": "output", "params": {"stream": "stdout", "text": "..."}}
+    <- {"jsonrpc": "2.0", "id": "input-1", "method": "input", "params": {"all": false}}
+    -> {"jsonrpc": "2.0", "id": "input-1", "result": "2\\n"}
+    <- {"jsonrpc": "2.0", "id": 1, "result": {"exit_code": 0, "seconds": 0.008}}
+
+`status` and `shutdown` are the other methods. The thin client
+(`helper_daemon.py git ...` and `helper_daemon.py github ...`) imports only
+the standard library. It forwards its argv, working directory and the
+environment variables the CLIs read (FORWARDED_ENV and git's GIT_*), prints
+the output as it arrives and answers prompts from its own stdin. When no
+daemon is listening it runs the command itself.
+
+The default socket lives in a per-user directory with mode 0700. Both sides
+refuse a peer running as another user: the client checks the owner of the
+socket file and, where the platform has SO_PEERCRED, the uid of the process
+it connected to, so a socket planted by someone else never receives tokens.
+
+Commands run one at a time in the client's working directory and
+environment, because both CLIs resolve relative paths and print to
+sys.stdout. GitHelpers share one SubprocessBackend per repository, so its
+cat-file processes stay up, and the Gemini model of the last API key used.
+GitHubAssistants are kept per configuration along with their pooled HTTP
+session, response cache and repository index.
+"""
+
+import argparse
+import collections
+import io
+import json
+import os
+import socket
+import stat
+import struct
+import sys
+import threading
+import time
+
+PROGRAMS = {'git': 'git_helper', 'github': 'github_assistant'}
+DEFAULT_IDLE_TIMEOUT = 30 * 60
+START_TIMEOUT = 10
+# Repositories whose git backend stays warm; the least recently used one is closed first
+MAX_BACKENDS = 16
+# Environment variables sent to the daemon for a command, besides git's own GIT_* variables
+FORWARDED_ENV = ('GITHUB_TOKEN', 'GITHUB_API_URL', 'HOME', 'XDG_CACHE_HOME', 'XDG_CONFIG_HOME')
+
+
+def _default_socket_dir():
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR') or os.environ.get('TMPDIR') or '/tmp'
+    return os.path.join(runtime_dir, f"githelper-{os.getuid()}")
+
+
+def default_socket_path():
+    """The socket in the per-user directory, overridable with GITHELPER_SOCKET"""
+    return os.environ.get('GITHELPER_SOCKET') or os.path.join(_default_socket_dir(), 'daemon.sock')
+
+
+def _prepare_socket_dir(socket_path):
+    """Create the default socket directory with mode 0700, refusing one that another user controls"""
+    directory = os.path.dirname(socket_path)
+    if directory != _default_socket_dir():
+        return
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    info = os.lstat(directory)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError(f"{directory} must be a directory owned by you with mode 0700")
+
+
+def _forwarded(name):
+    return name in FORWARDED_ENV or name.startswith('GIT_')
+
+
+def _check_peer(sock):
+    """Raise PermissionError unless the process on the other end runs as this user"""
+    if not hasattr(socket, 'SO_PEERCRED'):
+        return
+    credentials = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize('3i'))
+    _, uid, _ = struct.unpack('3i', credentials)
+    if uid != os.getuid():
+        raise PermissionError(f"the peer on the helper daemon socket runs as uid {uid}")
+
+
+class Connection:
+    """Newline-delimited JSON messages over a stream socket"""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self._reader = sock.makefile('rb')
+        self._lock = threading.Lock()
+
+    def send(self, message):
+        data = json.dumps(message).encode('utf-8') + b'\n'
+        with self._lock:
+            self.sock.sendall(data)
+
+    def receive(self):
+        """The next message, or None once the other side has closed the connection"""
+        line = self._reader.readline()
+        return json.loads(line) if line else None
+
+    def close(self):
+        self._reader.close()
+        self.sock.close()
+
+
+def connect(socket_path):
+    """A Connection to the daemon, or None if none is listening.
+
+    Raises PermissionError if the socket belongs to another user.
+    """
+    try:
+        owner = os.stat(socket_path).st_uid
+    except OSError:
+        return None
+    if owner != os.getuid():
+        raise PermissionError(f"{socket_path} belongs to another user")
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+    except OSError:
+        sock.close()
+        return None
+    try:
+        _check_peer(sock)
+    except PermissionError:
+        sock.close()
+        raise
+    return Connection(sock)
+
+
+def call(connection, method, params=None):
+    """Send one request and return its result, relaying output and prompts of a running command"""
+    connection.send({'jsonrpc': '2.0', 'id': 1, 'method': method, 'params': params or {}})
+    while True:
+        message = connection.receive()
+        if message is None:
+            raise ConnectionError("the helper daemon closed the connection")
+        if message.get('method') == 'output':
+            stream = sys.stderr if message['params']['stream'] == 'stderr' else sys.stdout
+            stream.write(message['params']['text'])
+            stream.flush()
+        elif message.get('method') == 'input':
+            text = sys.stdin.read() if message['params'].get('all') else sys.stdin.readline()
+            connection.send({'jsonrpc': '2.0', 'id': message['id'], 'result': text})
+        elif message.get('id') == 1:
+            if 'error' in message:
+                raise RuntimeError(message['error']['message'])
+            return message['result']
+
+
+class _Session:
+    """The client of the running command: its output and input go over the connection"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.closed = False
+        self._inputs = 0
+
+    def write(self, stream, text):
+        if self.closed:
+            return
+        try:
+            self.connection.send({'jsonrpc': '2.0', 'method': 'output', 'params': {'stream': stream, 'text': text}})
+        except OSError:
+            # The client went away; the command still runs to the end, prompts now see end of file
+            self.closed = True
+
+    def read(self, all=False):
+        if self.closed:
+            return ''
+        self._inputs += 1
+        request_id = f"input-{self._inputs}"
+        try:
+            self.connection.send({'jsonrpc': '2.0', 'id': request_id, 'method': 'input', 'params': {'all': all}})
+            reply = self.connection.receive()
+        except (OSError, ValueError):
+            reply = None
+        if not reply or reply.get('id') != request_id:
+            self.closed = True
+            return ''
+        return reply.get('result') or ''
+
+
+class _RoutedOutput(io.TextIOBase):
+    """sys.stdout or sys.stderr of the daemon: the running command's client, else the daemon's own stream"""
+
+    encoding = 'utf-8'
+
+    def __init__(self, daemon, name, fallback):
+        self.daemon = daemon
+        self.name = name
+        self.fallback = fallback
+        self._buffer = []
+        self._lock = threading.Lock()
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        if self.daemon.session is None:
+            return self.fallback.write(text)
+        with self._lock:
+            self._buffer.append(text)
+        # Line buffered, and flushed by input() before every prompt
+        if '\n' in text:
+            self.flush()
+        return len(text)
+
+    def flush(self):
+        session = self.daemon.session
+        if session is None:
+            self.fallback.flush()
+            return
+        with self._lock:
+            text = ''.join(self._buffer)
+            self._buffer = []
+        if text:
+            session.write(self.name, text)
+
+
+class _RoutedInput(io.TextIOBase):
+    """sys.stdin of the daemon: reads from the running command's client, else sees end of file"""
+
+    encoding = 'utf-8'
+
+    def __init__(self, daemon):
+        self.daemon = daemon
+
+    def readable(self):
+        return True
+
+    def readline(self, size=-1):
+        session = self.daemon.session
+        return session.read() if session else ''
+
+    def read(self, size=-1):
+        session = self.daemon.session
+        return session.read(all=True) if session else ''
+
+
+def _repository_root(path):
+    """The top level of the working tree containing path, or path itself outside a repository"""
+    import subprocess
+    result = subprocess.run(['git', 'rev-parse', '--show-toplevel'], cwd=path, capture_output=True, text=True)
+    return result.stdout.strip() if result.returncode == 0 and result.stdout.strip() else path
+
+
+class WarmInstances:
+    """Factories for GitHelper and GitHubAssistant that hand out warm collaborators"""
+
+    def __init__(self):
+        self.backends = collections.OrderedDict()  # repository path -> SubprocessBackend
+        self.assistants = {}  # constructor arguments -> GitHubAssistant
+        # genai.configure is global, so only the model of the key it was last configured with is reused
+        self.gemini_key = None
+        self.gemini_model = None
+        self._used = []
+
+    def git_helper(self, **kwargs):
+        """A GitHelper for the current directory's repository on its warm backend"""
+        from git_backend import SubprocessBackend
+        from git_helper import GitHelper
+        # Keyed by the top level, so commands run from different subdirectories share one backend
+        repo_path = _repository_root(os.getcwd())
+        backend = self.backends.pop(repo_path, None) or SubprocessBackend(repo_path, relay_output=True)
+        self.backends[repo_path] = backend
+        while len(self.backends) > MAX_BACKENDS:
+            self.backends.popitem(last=False)[1].close()
+        # The merge summary reports the git processes of this command only
+        backend.process_count = 0
+        helper = GitHelper(backend=backend, repo_path=repo_path, **kwargs)
+        if self.gemini_model is not None and helper.gemini_api_key == self.gemini_key:
+            helper.model = self.gemini_model
+        self._used.append(helper)
+        return helper
+
+    def github_assistant(self, stream_gemini=True, gemini_memo=None, **kwargs):
+        """The GitHubAssistant kept for these arguments, with this command's Gemini settings"""
+        from github_assistant import GitHubAssistant
+        key = (os.environ.get('GITHUB_API_URL'),) + tuple(sorted(kwargs.items()))
+        assistant = self.assistants.get(key)
+        if assistant is None:
+            assistant = self.assistants[key] = GitHubAssistant(**kwargs)
+        assistant.stream_gemini = stream_gemini
+        assistant.gemini_memo = gemini_memo
+        if assistant.gemini_key != self.gemini_key:
+            assistant.model = None
+        self._used.append(assistant)
+        return assistant
+
+    def settle(self):
+        """After a command: remember the Gemini model it configured"""
+        for instance in self._used:
+            model = instance._model
+            if model is not None and model is not self.gemini_model:
+                self.gemini_key = getattr(instance, 'gemini_api_key', None) or getattr(instance, 'gemini_key', None)
+                self.gemini_model = model
+        self._used = []
+
+    def close(self):
+        for backend in self.backends.values():
+            backend.close()
+        self.backends.clear()
+
+
+def _listen(socket_path):
+    """Bind the daemon socket, replacing a stale one; only the owner may connect"""
+    _prepare_socket_dir(socket_path)
+    if os.path.lexists(socket_path):
+        existing = connect(socket_path)
+        if existing is not None:
+            existing.close()
+            raise OSError(f"a helper daemon is already listening on {socket_path}")
+        os.unlink(socket_path)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o177)
+    try:
+        listener.bind(socket_path)
+    finally:
+        os.umask(old_umask)
+    listener.listen(16)
+    return listener
+
+
+def _preload():
+    """Import both CLIs and the libraries they load lazily, so the first command is warm too"""
+    import git_helper
+    import github_assistant
+    for module in (git_helper.genai, github_assistant.requests):
+        try:
+            getattr(module, '__name__')
+        except ImportError:
+            pass
+
+
+class HelperDaemon:
+    """Serves JSON-RPC requests on a Unix socket and runs one command at a time"""
+
+    def __init__(self, socket_path, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        self.socket_path = socket_path
+        self.idle_timeout = idle_timeout
+        self.instances = WarmInstances()
+        self.session = None
+        self.started = time.time()
+        self.requests = 0
+        self._last_active = time.monotonic()
+        self._run_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def serve(self):
+        """Accept connections until shutdown is requested or the daemon has been idle too long"""
+        import signal
+        listener = _listen(self.socket_path)
+        _preload()
+        signal.signal(signal.SIGTERM, lambda signum, frame: self._stop.set())
+        streams = sys.stdin, sys.stdout, sys.stderr
+        sys.stdin = _RoutedInput(self)
+        sys.stdout = _RoutedOutput(self, 'stdout', streams[1])
+        sys.stderr = _RoutedOutput(self, 'stderr', streams[2])
+        print(f"Helper daemon {os.getpid()} listening on {self.socket_path}", flush=True)
+        listener.settimeout(1.0)
+        try:
+            while not self._stop.is_set():
+                if (self.idle_timeout and not self._run_lock.locked()
+                        and time.monotonic() - self._last_active > self.idle_timeout):
+                    print(f"Idle for {self.idle_timeout:g}s, exiting", flush=True)
+                    break
+                try:
+                    sock, _ = listener.accept()
+                except socket.timeout:
+                    continue
+                sock.settimeout(None)
+                try:
+                    _check_peer(sock)
+                except PermissionError as e:
+                    print(f"Refused a connection: {e}", flush=True)
+                    sock.close()
+                    continue
+                threading.Thread(target=self._handle, args=(Connection(sock),), daemon=True).start()
+        finally:
+            listener.close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            self.instances.close()
+            sys.stdin, sys.stdout, sys.stderr = streams
+
+    def _handle(self, connection):
+        try:
+            while True:
+                try:
+                    request = connection.receive()
+                except ValueError:
+                    connection.send({'jsonrpc': '2.0', 'id': None,
+                                     'error': {'code': -32700, 'message': "Parse error"}})
+                    continue
+                if request is None:
+                    break
+                connection.send(self._dispatch(connection, request))
+        except OSError:
+            pass
+        finally:
+            connection.close()
+
+    def _dispatch(self, connection, request):
+        method = request.get('method')
+        params = request.get('params') or {}
+        response = {'jsonrpc': '2.0', 'id': request.get('id')}
+        try:
+            if method == 'run':
+                response['result'] = self.run(connection, **params)
+            elif method == 'status':
+                response['result'] = self.status()
+            elif method == 'shutdown':
+                self._stop.set()
+                response['result'] = True
+            else:
+                response['error'] = {'code': -32601, 'message': f"Method not found: {method}"}
+        except (TypeError, ValueError) as e:
+            response['error'] = {'code': -32602, 'message': f"Invalid params: {e}"}
+        return response
+
+    def run(self, connection, program, argv, cwd, env=None):
+        """Run one CLI command for a client; returns its exit code and duration"""
+        if program not in PROGRAMS.values():
+            raise ValueError(f"unknown program {program!r}")
+        import tracing
+        with self._run_lock:
+            self.requests += 1
+            start = time.perf_counter()
+            saved_cwd, saved_env, saved_argv = os.getcwd(), dict(os.environ), sys.argv
+            self.session = _Session(connection)
+            try:
+                if env is not None:
+                    # Only the client's variables the CLIs read replace the daemon's own
+                    for name in [name for name in os.environ if _forwarded(name)]:
+                        del os.environ[name]
+                    os.environ.update({name: value for name, value in env.items() if _forwarded(name)})
+                sys.argv = [f"{program}.py"] + list(argv)
+                exit_code = self._call(program, list(argv), cwd)
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                self.session = None
+                self.instances.settle()
+                # --trace and --metrics apply to a single command
+                tracing.tracer.enabled = False
+                tracing.tracer.reset()
+                os.environ.clear()
+                os.environ.update(saved_env)
+                os.chdir(saved_cwd)
+                sys.argv = saved_argv
+                self._last_active = time.monotonic()
+            return {'exit_code': exit_code, 'seconds': time.perf_counter() - start}
+
+    def _call(self, program, argv, cwd):
+        """Run a CLI's main() and turn how it ended into an exit code"""
+        import traceback
+        try:
+            os.chdir(cwd)
+            if program == 'git_helper':
+                import git_helper
+                git_helper.main(argv, make_helper=self.instances.git_helper)
+            else:
+                import github_assistant
+                github_assistant.main(argv, make_assistant=self.instances.github_assistant)
+        except SystemExit as e:
+            if e.code is None or isinstance(e.code, int):
+                return e.code or 0
+            print(e.code, file=sys.stderr)
+            return 1
+        except Exception:
+            traceback.print_exc()
+            return 1
+        return 0
+
+    def status(self):
+        return {
+            'pid': os.getpid(),
+            'socket': self.socket_path,
+            'uptime': time.time() - self.started,
+            'requests': self.requests,
+            'busy': self._run_lock.locked(),
+            'repositories': list(self.instances.backends),
+            'assistants': len(self.instances.assistants),
+            'gemini_model': self.instances.gemini_model is not None,
+        }
+
+
+def daemon_status(socket_path):
+    """The status of the daemon listening on socket_path, or None"""
+    connection = connect(socket_path)
+    if connection is None:
+        return None
+    try:
+        return call(connection, 'status')
+    except (OSError, ValueError, RuntimeError):
+        return None
+    finally:
+        connection.close()
+
+
+def start_daemon(socket_path, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+    """Start a daemon in the background unless one is running; returns its status or None"""
+    import subprocess
+    status = daemon_status(socket_path)
+    if status is not None:
+        return status
+    _prepare_socket_dir(socket_path)
+    with open(socket_path + '.log', 'a') as log:
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), '--socket', socket_path, 'serve',
+                          '--idle-timeout', str(idle_timeout)],
+                         cwd='/', stdin=subprocess.DEVNULL, stdout=log, stderr=log, start_new_session=True)
+    deadline = time.monotonic() + START_TIMEOUT
+    while time.monotonic() < deadline:
+        status = daemon_status(socket_path)
+        if status is not None:
+            return status
+        time.sleep(0.05)
+    return None
+
+
+def forward(socket_path, program, argv):
+    """Run a CLI command through the daemon, or in a fresh interpreter when none is running"""
+    connection = connect(socket_path)
+    if connection is None:
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), f"{program}.py")
+        os.execv(sys.executable, [sys.executable, script] + argv)
+    try:
+        result = call(connection, 'run', {'program': program, 'argv': argv, 'cwd': os.getcwd(),
+                                          'env': {name: value for name, value in os.environ.items()
+                                                  if _forwarded(name)}})
+    finally:
+        connection.close()
+    return result['exit_code']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Keep git_helper and github_assistant warm in a background daemon')
+    parser.add_argument('--socket', default=default_socket_path(),
+                        help='Unix socket of the daemon (default: $GITHELPER_SOCKET or a per-user path)')
+    subparsers = parser.add_subparsers(dest='command')
+    for name, program in PROGRAMS.items():
+        subparsers.add_parser(name, help=f"Run a {program}.py command through the daemon", add_help=False,
+                              usage=f"%(prog)s [{program}.py arguments]")
+    for name, help_text in (('serve', 'Run the daemon in the foreground'), ('start', 'Start the daemon in the background')):
+        lifecycle_parser = subparsers.add_parser(name, help=help_text)
+        lifecycle_parser.add_argument('--idle-timeout', type=float, default=DEFAULT_IDLE_TIMEOUT,
+                                      help='Exit after this many seconds without a command; 0 never exits (default: 30 min)')
+    subparsers.add_parser('stop', help='Stop the daemon')
+    subparsers.add_parser('status', help='Show what the daemon keeps warm')
+
+    # Everything after git/github belongs to the forwarded command, options included
+    argv = sys.argv[1:] if argv is None else list(argv)
+    split = next((i for i, arg in enumerate(argv) if arg in PROGRAMS and argv[i - 1:i] != ['--socket']), None)
+    forwarded = argv[split + 1:] if split is not None else []
+    args = parser.parse_args(argv[:split + 1] if split is not None else argv)
+
+    try:
+        if args.command in PROGRAMS:
+            sys.exit(forward(args.socket, PROGRAMS[args.command], forwarded))
+        elif args.command == 'serve':
+            HelperDaemon(args.socket, args.idle_timeout).serve()
+        elif args.command == 'start':
+            status = start_daemon(args.socket, args.idle_timeout)
+            if status is None:
+                print(f"The helper daemon did not start; see {args.socket}.log", file=sys.stderr)
+                sys.exit(1)
+            print(f"Helper daemon {status['pid']} listening on {args.socket}")
+        elif args.command == 'stop':
+            connection = connect(args.socket)
+            if connection is None:
+                print("No helper daemon is running.")
+                return
+            try:
+                call(connection, 'shutdown')
+            finally:
+                connection.close()
+            print("Helper daemon stopped.")
+        elif args.command == 'status':
+            status = daemon_status(args.socket)
+            if status is None:
+                print("No helper daemon is running.")
+                sys.exit(1)
+            print(f"Helper daemon {status['pid']} on {status['socket']}, up {status['uptime']:.0f}s, "
+                  f"{status['requests']} commands served{' (busy)' if status['busy'] else ''}")
+            print(f"Warm repositories: {', '.join(status['repositories']) or 'none'}")
+            print(f"GitHub assistants: {status['assistants']}, Gemini model: {'warm' if status['gemini_model'] else 'not loaded'}")
+        else:
+            parser.print_help()
+    except OSError as e:
+        # A socket or socket directory of another user, or a daemon that is already listening
+        parser.error(str(e))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Persistent HTTP response cache for GitHub API calls.
+
+Response bodies are stored in SQLite together with their `ETag`,
+`Last-Modified` and `Link` headers. Entries younger than the TTL are served
+without touching the network; older ones are revalidated with
+`If-None-Match` / `If-Modified-Since`, and GitHub does not count 304
+answers against the rate limit. The cache is bounded in size and evicts
+least recently used entries.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache')),
+    'github-assistant', 'http-cache.sqlite'
+)
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024
+
+
+class ResponseCache:
+    """Size-bounded LRU store of response bodies and validators"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, link TEXT,"
+            " body BLOB, size INTEGER, fetched_at REAL, last_used REAL)"
+        )
+        self._db.commit()
+
+    def get(self, key):
+        """Return the cached entry for a key as a dict, or None"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, last_modified, link, body, fetched_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+        etag, last_modified, link, body, fetched_at = row
+        return {'etag': etag, 'last_modified': last_modified, 'link': link, 'body': body, 'fetched_at': fetched_at}
+
+    def put(self, key, body, etag=None, last_modified=None, link=None):
+        """Store a response body and its validators, evicting old entries if the cache is full"""
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, etag, last_modified, link, body, len(body), now, now)
+            )
+            self._evict()
+            self._db.commit()
+
+    def touch(self, key):
+        """Mark an entry as freshly revalidated"""
+        now = time.time()
+        with self._lock:
+            self._db.execute("UPDATE responses SET fetched_at = ?, last_used = ? WHERE key = ?", (now, now, key))
+            self._db.commit()
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY last_used").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+
+    def stats(self):
+        """Number of entries and bytes stored"""
+        with self._lock:
+            entries, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {'entries': entries, 'bytes': size, 'max_bytes': self.max_bytes}
+
+    def close(self):
+        self._db.close()
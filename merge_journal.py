@@ -0,0 +1,109 @@
+"""
+Durable journal of multi-branch merges, so interrupted runs can resume.
+
+A merge step is written to the journal as soon as it is committed. Each
+entry records the commit the merge started from, the commits merged in,
+the resulting commit and how each conflicted file was resolved. Steps are
+identified by their input SHAs only. When a run is resumed, a step is
+reused exactly when both of its inputs are unchanged. The first branch
+that moved or failed is merged again, and so is every step after it,
+because their parents change. There is one journal per base branch and
+set of branches, stored in .git/githelper/journals.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+JOURNAL_DIR = 'journals'
+
+
+def journal_path(state_dir, base_branch, branches):
+    """Path of the journal of merging a set of branches into a base branch"""
+    payload = json.dumps([base_branch, sorted(branches)])
+    name = hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(state_dir, JOURNAL_DIR, f"{name}.json")
+
+
+def step_key(parent, merged):
+    """Key of a merge step: the commit merged onto and the commits merged in"""
+    return ' '.join([parent] + list(merged))
+
+
+class MergeJournal:
+    """The steps of one merge-multi run, written to disk after every step.
+
+    With resume, the steps of the previous run are loaded and can be
+    reused through lookup(), and its temp branch is reused as well.
+    """
+
+    def __init__(self, path, base_branch, branches, temp_branch, resume=False):
+        self.path = path
+        self._lock = threading.Lock()
+        self._previous = {}
+        self.reused = 0
+        self.data = {
+            'base_branch': base_branch,
+            'branches': list(branches),
+            'temp_branch': temp_branch,
+            'started': time.time(),
+            'steps': []
+        }
+        if resume:
+            try:
+                with open(path, 'r') as f:
+                    previous = json.load(f)
+                self._previous = {step_key(step['parent'], step['merged']): step for step in previous['steps']}
+                self.data['temp_branch'] = previous['temp_branch']
+            except (OSError, ValueError, KeyError):
+                pass
+        if not self._previous:
+            # Record the temp branch right away, so a run interrupted in its first merge can be resumed
+            self._save()
+
+    @property
+    def temp_branch(self):
+        return self.data['temp_branch']
+
+    @property
+    def resumable_steps(self):
+        """Number of steps recorded by the previous run"""
+        return len(self._previous)
+
+    def lookup(self, parent, merged):
+        """The previous run's step with these inputs, or None"""
+        return self._previous.get(step_key(parent, merged))
+
+    def knows_commit(self, commit):
+        """True if a step of the previous run was merged onto or produced this commit"""
+        return any(commit in (step['parent'], step['commit']) for step in self._previous.values())
+
+    def reuse(self, step):
+        """Carry a step of the previous run over into this run"""
+        self.reused += 1
+        self.record(step['branch'], step['parent'], step['merged'], step['commit'], step['result'],
+                    step.get('resolutions'))
+
+    def record(self, branch, parent, merged, commit, result, resolutions=None):
+        """Add a finished step and write the journal"""
+        step = {
+            'branch': branch,
+            'parent': parent,
+            'merged': list(merged),
+            'commit': commit,
+            'result': result,
+            'resolutions': resolutions or {},
+            'time': time.time()
+        }
+        with self._lock:
+            self.data['steps'].append(step)
+            self._save()
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.data, f, indent=1)
+        os.replace(tmp_path, self.path)
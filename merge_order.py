@@ -0,0 +1,111 @@
+"""
+Conflict-minimizing merge order for multi_branch_merge.
+
+Each branch is diffed once against its merge base with the base branch. An
+inverted path index (path -> branches touching it) then gives the pairwise
+file overlap of every branch pair without re-diffing, which keeps
+scheduling fast even with dozens of branches.
+
+Branches that share no paths with any other branch are merged first (and
+can go in a single octopus merge). The remaining branches are grouped into
+connected components of the overlap graph; groups with the least overlap
+are merged first, and within a group each next branch is the one that
+overlaps most with what has already been merged, so related changes are
+resolved back to back instead of cascading across the whole run.
+"""
+
+
+def build_overlap_index(path_sets):
+    """Count the shared paths of every pair of branches using an inverted path index"""
+    index = {}
+    for branch, paths in path_sets.items():
+        for path in paths:
+            index.setdefault(path, []).append(branch)
+
+    overlaps = {}
+    for owners in index.values():
+        for i, a in enumerate(owners):
+            for b in owners[i + 1:]:
+                overlaps[(a, b)] = overlaps.get((a, b), 0) + 1
+    return overlaps
+
+
+def _order_group(component, neighbours, position):
+    """Order a group of overlapping branches, always merging the closest branch next"""
+    weight = {b: sum(neighbours[b].values()) for b in component}
+    first = max(component, key=lambda b: (weight[b], -position[b]))
+    ordered = [first]
+    attached = dict(neighbours[first])  # overlap of each branch with the merged set
+    remaining = set(component) - {first}
+
+    while remaining:
+        nxt = max(remaining, key=lambda b: (attached.get(b, 0), -position[b]))
+        ordered.append(nxt)
+        remaining.discard(nxt)
+        for other, shared in neighbours[nxt].items():
+            attached[other] = attached.get(other, 0) + shared
+    return ordered
+
+
+def plan_merge_order(path_sets):
+    """Pick a merge order from each branch's set of changed paths.
+
+    `path_sets` maps branch name -> set of changed paths, in the order the user
+    gave the branches (used to break ties). Returns a dict with the merge
+    `order`, the fully `disjoint` branches, the overlapping `groups` and the
+    pairwise `overlaps`.
+    """
+    branches = list(path_sets)
+    position = {b: i for i, b in enumerate(branches)}
+    overlaps = build_overlap_index(path_sets)
+
+    neighbours = {b: {} for b in branches}
+    for (a, b), shared in overlaps.items():
+        neighbours[a][b] = shared
+        neighbours[b][a] = shared
+
+    disjoint = [b for b in branches if not neighbours[b]]
+
+    groups = []
+    seen = set()
+    for start in branches:
+        if start in seen or not neighbours[start]:
+            continue
+        component = []
+        stack = [start]
+        seen.add(start)
+        while stack:
+            node = stack.pop()
+            component.append(node)
+            for other in neighbours[node]:
+                if other not in seen:
+                    seen.add(other)
+                    stack.append(other)
+        groups.append(_order_group(component, neighbours, position))
+
+    def group_weight(group):
+        members = set(group)
+        return sum(shared for (a, b), shared in overlaps.items() if a in members and b in members)
+
+    groups.sort(key=lambda g: (group_weight(g), position[g[0]]))
+
+    return {
+        'order': disjoint + [b for group in groups for b in group],
+        'disjoint': disjoint,
+        'groups': groups,
+        'overlaps': overlaps
+    }
+
+
+def format_merge_plan(plan):
+    """Describe a merge plan for the console"""
+    lines = ["Merge order (auto):"]
+    if plan['disjoint']:
+        lines.append(f"  Disjoint branches: {', '.join(plan['disjoint'])}")
+    for i, group in enumerate(plan['groups'], 1):
+        steps = [group[0]]
+        for prev, branch in zip(group, group[1:]):
+            shared = plan['overlaps'].get((prev, branch)) or plan['overlaps'].get((branch, prev)) or 0
+            steps.append(f"{branch} ({shared} shared with {prev})" if shared else branch)
+        lines.append(f"  Group {i}: {' -> '.join(steps)}")
+    return '\n'.join(lines)
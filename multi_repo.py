@@ -0,0 +1,240 @@
+"""
+Run the same multi-branch merge across many repositories at once.
+
+A manifest lists the repositories and the branches to merge into each:
+
+    {
+      "base": "main",
+      "branches": ["release/api", "release/ui"],
+      "repos": [
+        "services/auth",
+        {"path": "services/billing", "base": "develop", "branches": ["release/api"]}
+      ]
+    }
+
+Relative paths are resolved against the manifest's directory. Every
+repository is merged by its own GitHelper in a worker process, so caches,
+journals and temp branches stay per repository, and the total time follows
+the slowest repository rather than the sum. The output of each merge,
+including git's, goes to a log in the repository's .git/githelper
+directory.
+
+Nothing a worker would ask the user reaches the terminal directly. In
+'queue' mode every question is sent to the parent process, which asks them
+one at a time and shows which repository asked, along with the merge output
+leading up to it. In 'defer' mode nothing is asked: conflicts that cannot be
+resolved automatically leave their branch unmerged. They can be finished
+later with `merge-multi --resume` in that repository.
+"""
+
+import concurrent.futures
+import contextlib
+import json
+import os
+import queue
+import sys
+import time
+import traceback
+
+from resolution_policy import ResolutionPolicy
+
+LOG_FILE = 'merge-multi-repos.log'
+PROMPT_MODES = ('defer', 'queue')
+# Unresolved files listed per repository in the text summary; the JSON report has them all
+MAX_LISTED = 5
+
+
+def load_manifest(path):
+    """Load a manifest into a list of {name, path, base, branches} (raises OSError or ValueError)"""
+    with open(path, 'r') as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or not isinstance(data.get('repos'), list):
+        raise ValueError("a manifest must be an object with a list of repos")
+
+    root = os.path.dirname(os.path.abspath(path))
+    repos = []
+    names = set()
+    for entry in data['repos']:
+        if isinstance(entry, str):
+            entry = {'path': entry}
+        if not isinstance(entry, dict) or not entry.get('path'):
+            raise ValueError(f"a repo must be a path or an object with a path, not {entry!r}")
+        repo_path = os.path.join(root, os.path.expanduser(entry['path']))
+        branches = entry.get('branches', data.get('branches'))
+        if not branches:
+            raise ValueError(f"no branches to merge in {entry['path']}")
+        name = entry.get('name') or os.path.basename(os.path.normpath(repo_path))
+        while name in names:
+            name += "'"
+        names.add(name)
+        repos.append({
+            'name': name,
+            'path': repo_path,
+            'base': entry.get('base', data.get('base')),
+            'branches': list(branches),
+        })
+    return repos
+
+
+def _queued_prompt(name, log_path, prompts, answers):
+    """A prompt_handler that asks the parent process, sending the log written since the last question"""
+    offset = 0
+
+    def ask(prompt=''):
+        nonlocal offset
+        sys.stdout.flush()
+        with open(log_path, 'rb') as f:
+            f.seek(offset)
+            context = f.read().decode('utf-8', 'replace')
+        prompts.put((name, context, prompt))
+        answer = answers.get()
+        if answer is None:
+            # The terminal reached end of file; fail like input() would instead of asking forever
+            raise EOFError
+        # Keep the question and its answer in the log, where the terminal would have shown them
+        print(f"{prompt}{answer}", flush=True)
+        offset = os.path.getsize(log_path)
+        return answer
+
+    return ask
+
+
+@contextlib.contextmanager
+def _redirect_output(log_path):
+    """Send this process's stdout and stderr, including that of git children, to a log file"""
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved = os.dup(1), os.dup(2)
+    # Line buffered, so Python's output and git's stay in order
+    with open(log_path, 'w', buffering=1) as log:
+        os.dup2(log.fileno(), 1)
+        os.dup2(log.fileno(), 2)
+        try:
+            with contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+                yield
+        finally:
+            log.flush()
+            os.dup2(saved[0], 1)
+            os.dup2(saved[1], 2)
+            os.close(saved[0])
+            os.close(saved[1])
+
+
+def merge_repo(repo, options, prompts=None, answers=None):
+    """Run multi_branch_merge in one repository and return its summary (runs in a worker process)"""
+    from git_helper import GitHelper
+
+    start = time.perf_counter()
+    summary = {'repo': repo['name'], 'path': repo['path'], 'status': 'failed', 'results': {}, 'temp_branch': None,
+               'unresolved': [], 'git_processes': 0, 'ai_prompt_tokens': 0, 'log': None}
+    try:
+        policy = ResolutionPolicy(**options['policy']) if options['policy'] else None
+        helper = GitHelper(gemini_api_key=options['gemini_api_key'], repo_path=repo['path'],
+                           resolution_policy=policy, **options['helper'])
+        state_dir = None
+        if os.path.isdir(repo['path']):
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                state_dir = helper.get_state_dir()
+        if not state_dir:
+            summary['error'] = "not a git repository"
+            return summary
+        summary['log'] = os.path.join(state_dir, LOG_FILE)
+        with _redirect_output(summary['log']):
+            if prompts is not None:
+                helper.prompt_handler = _queued_prompt(repo['name'], summary['log'], prompts, answers)
+            success = helper.multi_branch_merge(repo['branches'], repo['base'], options['use_ai'], **options['merge'])
+        if helper.last_merge:
+            summary['results'] = helper.last_merge['results']
+            summary['temp_branch'] = helper.last_merge['temp_branch']
+        if policy:
+            summary['unresolved'] = [f"{entry['path']} ({entry['merge']})" for entry in policy.report.files
+                                     if entry['status'] == 'failed']
+        summary['git_processes'] = helper.backend.process_count
+        summary['ai_prompt_tokens'] = helper.ai_prompt_tokens
+        summary['status'] = 'merged' if success else 'deferred' if summary['unresolved'] else 'failed'
+    except Exception:
+        summary['error'] = traceback.format_exc().strip().splitlines()[-1]
+    finally:
+        summary['seconds'] = time.perf_counter() - start
+    return summary
+
+
+def _serve_prompt(prompts, answers, timeout):
+    """Ask one queued question on this terminal, if one arrives within timeout"""
+    try:
+        name, context, prompt = prompts.get(timeout=timeout)
+    except queue.Empty:
+        return
+    print(f"\n===== {name} =====")
+    if context.strip():
+        print(context.rstrip())
+    try:
+        answer = input(prompt)
+    except EOFError:
+        answer = None
+    answers[name].put(answer)
+
+
+def merge_repos(repos, options, jobs=None, prompt_mode='defer'):
+    """Merge every repository of a manifest in a pool of worker processes.
+
+    options holds what every worker needs: 'gemini_api_key', 'use_ai', 'policy' (rules
+    and default of a ResolutionPolicy, or None), 'helper' (GitHelper keyword arguments)
+    and 'merge' (multi_branch_merge keyword arguments). In defer mode, without a policy,
+    conflicts go to the AI when use_ai is set and are otherwise left unresolved.
+    Returns the summaries in manifest order.
+    """
+    options = dict(options)
+    if prompt_mode == 'defer' and not options['policy']:
+        options['policy'] = {'rules': [{'strategy': 'ai'}] if options['use_ai'] else [], 'default': 'fail'}
+
+    manager = None
+    prompts, answers = None, {}
+    if prompt_mode == 'queue':
+        import multiprocessing
+        manager = multiprocessing.Manager()
+        prompts = manager.Queue()
+        answers = {repo['name']: manager.Queue() for repo in repos}
+
+    summaries = {}
+    try:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = {pool.submit(merge_repo, repo, options, prompts, answers.get(repo['name'])): repo['name']
+                       for repo in repos}
+            pending = set(futures)
+            while pending:
+                done, pending = concurrent.futures.wait(pending, timeout=0 if prompts else None,
+                                                        return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    summary = future.result()
+                    summaries[futures[future]] = summary
+                    print(f"[{summary['repo']}] {summary['status']} in {summary['seconds']:.1f}s", file=sys.stderr)
+                if prompts is not None and pending:
+                    _serve_prompt(prompts, answers, timeout=0.1)
+    finally:
+        if manager is not None:
+            manager.shutdown()
+    return [summaries[repo['name']] for repo in repos]
+
+
+def format_repo_summary(summaries, wall_seconds):
+    """Render the per-repository outcomes and the time saved by running them in parallel"""
+    width = max([len(summary['repo']) for summary in summaries] + [10])
+    lines = [f"{'repository':<{width}} {'status':<9} {'merged':>7} {'time':>7}"]
+    for summary in summaries:
+        merged = sum(result.startswith('Merged') for result in summary['results'].values())
+        lines.append(f"{summary['repo']:<{width}} {summary['status']:<9} "
+                     f"{merged:>3}/{len(summary['results']):<3} {summary['seconds']:>6.1f}s")
+        if summary.get('error'):
+            lines.append(f"    {summary['error']}")
+        for unresolved in summary['unresolved'][:MAX_LISTED]:
+            lines.append(f"    unresolved: {unresolved}")
+        if len(summary['unresolved']) > MAX_LISTED:
+            lines.append(f"    ... and {len(summary['unresolved']) - MAX_LISTED} more")
+        if summary['status'] != 'merged' and summary['log']:
+            lines.append(f"    log: {summary['log']}")
+    total = sum(summary['seconds'] for summary in summaries)
+    ok = sum(summary['status'] == 'merged' for summary in summaries)
+    lines.append(f"\n{ok}/{len(summaries)} repositories merged in {wall_seconds:.1f}s "
+                 f"({total:.1f}s of merging in total)")
+    return '\n'.join(lines)
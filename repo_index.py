@@ -0,0 +1,143 @@
+"""
+Local SQLite index of the user's repositories for offline search.
+
+Repositories are stored with the fields the assistant shows (name,
+description, stars, forks, language, pushed_at), and an FTS5 table over the
+name, description and language answers text searches in milliseconds
+without touching the network. Syncing is incremental: `/user/repos` is
+listed with `sort=updated` and `since` set to the newest `updated_at`
+already indexed, so a refresh only pulls repositories that changed. A
+full sync also drops repositories that were deleted or lost access to.
+"""
+
+import os
+import sqlite3
+import threading
+
+from http_cache import DEFAULT_CACHE_PATH
+
+DEFAULT_INDEX_PATH = os.path.join(os.path.dirname(DEFAULT_CACHE_PATH), 'repo-index.sqlite')
+
+FIELDS = ('full_name', 'name', 'description', 'stargazers_count', 'forks_count', 'language', 'pushed_at', 'updated_at')
+
+# Sort option -> ORDER BY clause
+SORT_ORDERS = {
+    'stars': 'stargazers_count DESC',
+    'forks': 'forks_count DESC',
+    'pushed': 'pushed_at DESC',
+    'name': 'full_name COLLATE NOCASE',
+}
+
+
+def _fts_query(text):
+    """Turn free text into an FTS5 query matching every word as a prefix"""
+    words = text.split()
+    return ' '.join('"{}"*'.format(word.replace('"', '""')) for word in words)
+
+
+class RepoIndex:
+    """SQLite + FTS5 store of repository metadata with incremental sync"""
+
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        self.path = path
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS repos ("
+            " full_name TEXT PRIMARY KEY, name TEXT, description TEXT, stargazers_count INTEGER,"
+            " forks_count INTEGER, language TEXT, pushed_at TEXT, updated_at TEXT);"
+            "CREATE VIRTUAL TABLE IF NOT EXISTS repos_fts USING fts5(full_name UNINDEXED, name, description, language);"
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);"
+        )
+        self._db.commit()
+
+    def _meta(self, key):
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self._db.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, value))
+
+    def _upsert(self, repo):
+        row = tuple(repo.get(field) for field in FIELDS)
+        self._db.execute("INSERT OR REPLACE INTO repos VALUES (?, ?, ?, ?, ?, ?, ?, ?)", row)
+        self._db.execute("DELETE FROM repos_fts WHERE full_name = ?", (repo['full_name'],))
+        self._db.execute(
+            "INSERT INTO repos_fts VALUES (?, ?, ?, ?)",
+            (repo['full_name'], repo['name'], repo.get('description') or '', repo.get('language') or '')
+        )
+
+    def _clear(self):
+        self._db.execute("DELETE FROM repos")
+        self._db.execute("DELETE FROM repos_fts")
+        self._db.execute("DELETE FROM meta")
+
+    def upsert(self, repos):
+        """Add or update repositories (REST repository objects)"""
+        with self._lock:
+            for repo in repos:
+                self._upsert(repo)
+            self._db.commit()
+
+    def sync(self, client, full=False):
+        """Bring the index up to date with the user's repositories.
+
+        Incremental unless full is set, the index is empty, or it was built
+        for another account. Returns {'fetched': n, 'total': n, 'full': bool}.
+        """
+        with self._lock:
+            watermark = self._meta('last_updated_at')
+            full = full or watermark is None or self._meta('account') != client.account_id
+
+        params = {'sort': 'updated', 'direction': 'desc'}
+        if not full:
+            params['since'] = watermark
+
+        fetched = []
+        for repo in client.paginate("/user/repos", params):
+            # Newest first, so stop once repositories are older than the last sync
+            if not full and repo['updated_at'] < watermark:
+                break
+            fetched.append(repo)
+
+        with self._lock:
+            if full:
+                self._clear()
+                self._set_meta('account', client.account_id)
+            for repo in fetched:
+                self._upsert(repo)
+            newest = max([repo['updated_at'] for repo in fetched] + ([] if full else [watermark]), default=None)
+            if newest:
+                self._set_meta('last_updated_at', newest)
+            self._db.commit()
+            total = self._db.execute("SELECT COUNT(*) FROM repos").fetchone()[0]
+        return {'fetched': len(fetched), 'total': total, 'full': full}
+
+    def search(self, text=None, language=None, min_stars=None, sort='stars', limit=50):
+        """Return indexed repositories (as dicts) matching the text and filters, best first"""
+        clauses, args = [], []
+        if text and text.strip():
+            clauses.append("full_name IN (SELECT full_name FROM repos_fts WHERE repos_fts MATCH ?)")
+            args.append(_fts_query(text))
+        if language:
+            clauses.append("language = ? COLLATE NOCASE")
+            args.append(language)
+        if min_stars:
+            clauses.append("stargazers_count >= ?")
+            args.append(min_stars)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        query = f"SELECT {', '.join(FIELDS)} FROM repos {where} ORDER BY {SORT_ORDERS[sort]} LIMIT ?"
+        with self._lock:
+            rows = self._db.execute(query, args + [limit]).fetchall()
+        return [dict(zip(FIELDS, row)) for row in rows]
+
+    def stats(self):
+        """Number of indexed repositories and the newest update seen"""
+        with self._lock:
+            count = self._db.execute("SELECT COUNT(*) FROM repos").fetchone()[0]
+            return {'repos': count, 'last_updated_at': self._meta('last_updated_at')}
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,132 @@
+"""
+Persistent, content-addressed cache of conflict resolutions (like git rerere).
+
+Each conflict hunk is keyed by a hash of its normalized ours/theirs/base
+sections, so the same conflict met again after a rebase or a re-run is
+resolved from the cache without prompting or calling Gemini. Whole-file AI
+resolutions are cached by the blob ids of the conflict's three sides, or by
+a hash of the conflicted file. The cache lives in
+.git/githelper, is bounded in size and evicts least recently used entries.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+CACHE_FILE = 'resolution-cache.json'
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+
+
+def _normalize(lines):
+    # Trailing whitespace doesn't change what a resolution means, but a CR line ending is kept,
+    # so a resolution learned in a CRLF file is never replayed into an LF file
+    return [line.rstrip() + ('\r' if line.rstrip('\n').endswith('\r') else '') for line in lines or []]
+
+
+def hunk_key(ours, theirs, base=None):
+    """Cache key of a conflict hunk given its ours/theirs/base lines"""
+    payload = json.dumps([_normalize(ours), _normalize(theirs), _normalize(base)])
+    return 'hunk:' + hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def file_key(file_content):
+    """Cache key of a whole conflicted file"""
+    return 'file:' + hashlib.sha256(file_content.encode('utf-8')).hexdigest()
+
+
+def record_key(record):
+    """Cache key of a conflict from the index, given by the object ids of its three sides"""
+    oids = [entry.oid if entry else '' for entry in (record.base, record.ours, record.theirs)]
+    return 'blobs:' + hashlib.sha256(':'.join(oids).encode('utf-8')).hexdigest()
+
+
+class ResolutionCache:
+    """Size-bounded LRU cache of resolutions stored as JSON"""
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._data = {'entries': {}, 'hits': 0, 'misses': 0}
+        try:
+            with open(path, 'r') as f:
+                self._data.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data['entries']
+
+    def get(self, key, *alternatives):
+        """Return the cached entry for a key (resolution, source, ...) or None.
+
+        Alternative keys of the same conflict are tried in order after key; the
+        lookup counts as a single hit or miss.
+        """
+        with self._lock:
+            entries = self._data['entries']
+            entry = next((entries[k] for k in (key,) + alternatives if k in entries), None)
+            if entry is None:
+                self._data['misses'] += 1
+                return None
+            self._data['hits'] += 1
+            entry['hits'] = entry.get('hits', 0) + 1
+            entry['last_used'] = time.time()
+            return entry
+
+    def put(self, key, resolution, source):
+        """Store a resolution (a list of lines or a whole file) and where it came from"""
+        now = time.time()
+        with self._lock:
+            self._data['entries'][key] = {
+                'resolution': resolution,
+                'source': source,
+                'created': now,
+                'last_used': now,
+                'hits': 0,
+                'size': len(json.dumps(resolution))
+            }
+
+    def _evict(self):
+        entries = self._data['entries']
+        total = sum(entry['size'] for entry in entries.values())
+        for key in sorted(entries, key=lambda k: entries[k]['last_used']):
+            if total <= self.max_bytes:
+                break
+            total -= entries.pop(key)['size']
+
+    def save(self):
+        """Write the cache to disk, evicting least recently used entries beyond max_bytes"""
+        with self._lock:
+            self._evict()
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(self._data, f)
+            os.replace(tmp_path, self.path)
+
+    def clear(self):
+        """Remove every cached resolution"""
+        with self._lock:
+            self._data = {'entries': {}, 'hits': 0, 'misses': 0}
+        self.save()
+
+    def stats(self):
+        """Entry count, size, hit/miss counters and entries per source"""
+        with self._lock:
+            entries = self._data['entries']
+            sources = {}
+            for entry in entries.values():
+                sources[entry['source']] = sources.get(entry['source'], 0) + 1
+            lookups = self._data['hits'] + self._data['misses']
+            return {
+                'entries': len(entries),
+                'bytes': sum(entry['size'] for entry in entries.values()),
+                'max_bytes': self.max_bytes,
+                'hits': self._data['hits'],
+                'misses': self._data['misses'],
+                'hit_ratio': self._data['hits'] / lookups if lookups else 0.0,
+                'sources': sources
+            }
@@ -0,0 +1,145 @@
+"""
+Policy-driven conflict resolution for unattended merges.
+
+A policy file maps path globs and conflict kinds to strategies, so that
+merge-multi can run in CI without prompting:
+
+    {
+      "rules": [
+        {"paths": ["*.lock", "package-lock.json"], "strategy": "union"},
+        {"paths": ["docs/*"], "kinds": ["content"], "strategy": "theirs"},
+        {"kinds": ["binary", "mode"], "strategy": "ours"},
+        {"paths": ["src/*"], "strategy": "ai"}
+      ],
+      "default": "fail"
+    }
+
+The first matching rule wins. Globs without a slash match the file name in
+any directory, like .gitattributes; other globs match the whole path. Kinds
+are the conflict kinds of the conflict index, plus 'binary' for content and
+add/add conflicts of binary files. Every decision goes into a PolicyReport,
+which can be written as JSON.
+"""
+
+import fnmatch
+import json
+import threading
+import time
+
+STRATEGIES = ('ours', 'theirs', 'union', 'ai', 'cache-only', 'fail')
+
+# Strategies applied hunk by hunk to text conflicts: hunk -> resolved lines
+HUNK_STRATEGIES = {
+    'ours': lambda hunk: hunk['ours'],
+    'theirs': lambda hunk: hunk['theirs'],
+    'union': lambda hunk: hunk['ours'] + hunk['theirs'],
+}
+
+
+def conflict_kind(record):
+    """Kind of a ConflictRecord as matched by policy rules"""
+    if record.kind in ('content', 'add/add') and record.is_binary:
+        return 'binary'
+    return record.kind
+
+
+def _glob_matches(pattern, path):
+    if '/' not in pattern:
+        path = path.rsplit('/', 1)[-1]
+    return fnmatch.fnmatchcase(path, pattern)
+
+
+class ResolutionPolicy:
+    """Ordered rules mapping (path, kind) to a resolution strategy"""
+
+    def __init__(self, rules, default='fail', source=None):
+        for rule in rules:
+            if not isinstance(rule, dict):
+                raise ValueError(f"a rule must be an object, not {rule!r}")
+            if rule.get('strategy') not in STRATEGIES:
+                raise ValueError(f"unknown strategy {rule.get('strategy')!r} (expected one of {', '.join(STRATEGIES)})")
+        if default not in STRATEGIES:
+            raise ValueError(f"unknown default strategy {default!r}")
+        self.rules = rules
+        self.default = default
+        self.source = source
+        self.report = PolicyReport()
+
+    @classmethod
+    def load(cls, path):
+        """Load a policy from a JSON file (raises OSError or ValueError)"""
+        with open(path, 'r') as f:
+            data = json.load(f)
+        if not isinstance(data, dict) or not isinstance(data.get('rules', []), list):
+            raise ValueError("a policy must be an object with a list of rules")
+        return cls(data.get('rules', []), data.get('default', 'fail'), source=path)
+
+    def strategy_for(self, path, kind):
+        """Return (strategy, index of the matching rule or None for the default)"""
+        for index, rule in enumerate(self.rules):
+            if 'kinds' in rule and kind not in rule['kinds']:
+                continue
+            if 'paths' in rule and not any(_glob_matches(pattern, path) for pattern in rule['paths']):
+                continue
+            return rule['strategy'], index
+        return self.default, None
+
+
+class PolicyReport:
+    """What the policy did to every conflicted file, across all merges of a run"""
+
+    def __init__(self):
+        self.files = []
+        self._lock = threading.Lock()
+        self._started = time.time()
+
+    def add(self, merge, path, kind, strategy, rule, resolved, hunks=0, seconds=0.0, detail=None):
+        entry = {
+            'merge': merge,
+            'path': path,
+            'kind': kind,
+            'strategy': strategy,
+            'rule': rule,
+            'status': 'resolved' if resolved else 'failed',
+            'hunks': hunks,
+            'seconds': seconds,
+        }
+        if detail:
+            entry['detail'] = detail
+        with self._lock:
+            self.files.append(entry)
+
+    def summary(self):
+        """Counts per status and strategy, plus hunk throughput of the hunk-wise strategies"""
+        with self._lock:
+            files = list(self.files)
+        strategies = {}
+        for entry in files:
+            counts = strategies.setdefault(entry['strategy'], {'resolved': 0, 'failed': 0})
+            counts[entry['status']] += 1
+        hunk_entries = [entry for entry in files if entry['strategy'] in HUNK_STRATEGIES]
+        hunks = sum(entry['hunks'] for entry in hunk_entries)
+        seconds = sum(entry['seconds'] for entry in hunk_entries)
+        return {
+            'files': len(files),
+            'resolved': sum(entry['status'] == 'resolved' for entry in files),
+            'failed': sum(entry['status'] == 'failed' for entry in files),
+            'strategies': strategies,
+            'hunks': hunks,
+            'hunks_per_second': hunks / seconds if seconds else 0.0,
+        }
+
+    def write(self, path, policy_source=None):
+        """Write the report as JSON"""
+        with self._lock:
+            files = list(self.files)
+        report = {
+            'policy': policy_source,
+            'started': self._started,
+            'finished': time.time(),
+            'summary': self.summary(),
+            'files': files,
+        }
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
@@ -0,0 +1,90 @@
+"""
+Fast command-line startup: lazy imports and import-time profiling.
+
+The Gemini SDK takes most of a second to import and the HTTP stack a good
+fraction of that, while most git_helper commands only shell out to git.
+`lazy_import` returns a module whose code only runs on first attribute
+access, so these libraries are loaded when AI or GitHub calls are made.
+`profile_startup` imports a module in a fresh interpreter under
+`python -X importtime` and reports where the time goes. It fails when
+the import takes longer than a budget, so startup regressions are caught.
+"""
+
+import importlib.util
+import os
+import subprocess
+import sys
+
+DEFAULT_STARTUP_BUDGET_MS = 150
+
+
+class _MissingModule:
+    """Stands in for a module that isn't installed and raises only when it is actually used"""
+
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attr):
+        raise ModuleNotFoundError(f"No module named {self._name!r}", name=self._name)
+
+
+def lazy_import(name):
+    """Import a module lazily: it is loaded on first attribute access instead of now"""
+    if name in sys.modules:
+        return sys.modules[name]
+    try:
+        spec = importlib.util.find_spec(name)
+    except ModuleNotFoundError:
+        spec = None
+    if spec is None:
+        return _MissingModule(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+def parse_importtime(stderr):
+    """Parse `-X importtime` output into (module, self_us, cumulative_us, depth) tuples"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return entries
+
+
+def profile_startup(module, budget_ms=DEFAULT_STARTUP_BUDGET_MS, top=15):
+    """Print the slowest imports of a module measured in a fresh interpreter.
+
+    Returns 0 if importing the module stays within budget_ms, 1 otherwise.
+    """
+    # The tools run from inside the repository being merged, so point the child at this directory
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [os.path.dirname(os.path.abspath(__file__)),
+                                                      env.get('PYTHONPATH')]))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            capture_output=True, text=True, env=env)
+    if result.returncode != 0:
+        print(result.stderr, file=sys.stderr)
+        return 1
+    entries = parse_importtime(result.stderr)
+    # Entries are printed after their children; keep the module and what it pulled in, not site & co.
+    end = next((i for i, entry in enumerate(entries) if entry[0] == module and entry[3] == 0), len(entries) - 1)
+    start = max((i + 1 for i, entry in enumerate(entries[:end]) if entry[3] == 0), default=0)
+    entries = entries[start:end + 1]
+    total_ms = entries[-1][2] / 1000 if entries else 0.0
+
+    print(f"Import time of {module}: {total_ms:.1f} ms (budget {budget_ms} ms)")
+    print(f"{'cumulative':>12} {'self':>10}  module")
+    for name, self_us, cumulative_us, depth in sorted(entries, key=lambda e: e[2], reverse=True)[:top]:
+        print(f"{cumulative_us / 1000:>10.1f}ms {self_us / 1000:>8.1f}ms  {'  ' * depth}{name}")
+
+    if total_ms > budget_ms:
+        print(f"Startup is over budget by {total_ms - budget_ms:.1f} ms")
+        return 1
+    return 0
@@ -0,0 +1,174 @@
+"""
+Lightweight tracing for git, GitHub and Gemini calls.
+
+Code wraps interesting operations in `span(name, category, **attrs)`,
+for example git processes, HTTP requests, Gemini calls and per-branch merge
+steps. Tracing is off by default. When it is off, `span` returns a shared
+no-op object, so an instrumented call costs one function call and a flag
+check. Once enabled, every span records its start, duration, thread and
+attributes such as bytes, tokens and exit status. The recording can be
+exported as Chrome trace-event JSON, for chrome://tracing or Perfetto, or
+as a Prometheus text snapshot aggregated per span.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+
+
+class Span:
+    """A timed operation; attributes can be added while it runs with set()"""
+
+    __slots__ = ('tracer', 'name', 'category', 'attrs', 'start_ns')
+
+    def __init__(self, tracer, name, category, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.attrs = attrs
+        self.start_ns = 0
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end_ns = time.perf_counter_ns()
+        if exc_type is not None:
+            self.attrs['error'] = exc_type.__name__
+        self.tracer._record(self, end_ns)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, **attrs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """Collects finished spans while enabled"""
+
+    def __init__(self):
+        self.enabled = False
+        self.events = []
+        self._lock = threading.Lock()
+        self._origin_ns = time.perf_counter_ns()
+
+    def span(self, name, category, **attrs):
+        if not self.enabled:
+            return _NOOP_SPAN
+        return Span(self, name, category, attrs)
+
+    def _record(self, span, end_ns):
+        event = (span.name, span.category, span.start_ns - self._origin_ns, end_ns - span.start_ns,
+                 threading.get_ident(), threading.current_thread().name, span.attrs)
+        with self._lock:
+            self.events.append(event)
+
+    def reset(self):
+        with self._lock:
+            self.events = []
+            self._origin_ns = time.perf_counter_ns()
+
+    def chrome_trace(self):
+        """The recorded spans as a Chrome trace-event document"""
+        pid = os.getpid()
+        with self._lock:
+            events = list(self.events)
+        trace_events = []
+        threads = {}
+        for name, category, start_ns, duration_ns, tid, thread_name, attrs in events:
+            threads[tid] = thread_name
+            trace_events.append({
+                'name': name, 'cat': category, 'ph': 'X', 'pid': pid, 'tid': tid,
+                'ts': start_ns / 1000, 'dur': duration_ns / 1000, 'args': attrs
+            })
+        for tid, thread_name in threads.items():
+            trace_events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid,
+                                 'args': {'name': thread_name}})
+        return {'traceEvents': trace_events, 'displayTimeUnit': 'ms'}
+
+    def prometheus_text(self, prefix='githelper'):
+        """Prometheus text snapshot: count, total and max seconds plus summed numeric attributes per span"""
+        with self._lock:
+            events = list(self.events)
+        series = {}
+        for name, category, _, duration_ns, _, _, attrs in events:
+            entry = series.setdefault((category, name), {'count': 0, 'seconds': 0.0, 'max': 0.0, 'errors': 0, 'sums': {}})
+            seconds = duration_ns / 1e9
+            entry['count'] += 1
+            entry['seconds'] += seconds
+            entry['max'] = max(entry['max'], seconds)
+            entry['errors'] += 'error' in attrs
+            for key, value in attrs.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool) and key != 'exit_status':
+                    entry['sums'][key] = entry['sums'].get(key, 0) + value
+
+        lines = []
+
+        def metric(metric_name, kind, help_text, values):
+            lines.append(f"# HELP {prefix}_{metric_name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{metric_name} {kind}")
+            for (category, name), value in values:
+                labels = f'category="{_escape(category)}",span="{_escape(name)}"'
+                lines.append(f"{prefix}_{metric_name}{{{labels}}} {value:g}")
+
+        items = sorted(series.items())
+        metric('span_count', 'counter', 'Number of finished spans', [(k, v['count']) for k, v in items])
+        metric('span_seconds_total', 'counter', 'Total time spent in spans', [(k, v['seconds']) for k, v in items])
+        metric('span_seconds_max', 'gauge', 'Longest single span', [(k, v['max']) for k, v in items])
+        metric('span_errors_total', 'counter', 'Spans that ended with an exception', [(k, v['errors']) for k, v in items])
+        attr_names = sorted({key for _, v in items for key in v['sums']})
+        for attr in attr_names:
+            metric(f"{_metric_name(attr)}_total", 'counter', f"Sum of the {attr} span attribute",
+                   [(k, v['sums'][attr]) for k, v in items if attr in v['sums']])
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _metric_name(attr):
+    return re.sub(r'[^a-zA-Z0-9_]', '_', attr)
+
+
+tracer = Tracer()
+
+
+def enable():
+    """Start recording spans"""
+    tracer.enabled = True
+
+
+def span(name, category, **attrs):
+    """Context manager timing an operation; a no-op unless tracing is enabled"""
+    return tracer.span(name, category, **attrs)
+
+
+def write_chrome_trace(path):
+    """Write the recorded spans as Chrome trace-event JSON"""
+    with open(path, 'w') as f:
+        json.dump(tracer.chrome_trace(), f)
+
+
+def write_prometheus(path, prefix='githelper'):
+    """Write the Prometheus text snapshot of the recorded spans"""
+    with open(path, 'w') as f:
+        f.write(tracer.prometheus_text(prefix))